@@ -0,0 +1,30 @@
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException
+
+from app.services.category_stats import category_stats_reconciler
+from app.services.warmup import cache_warmer
+
+router = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+@router.get("/cache/warmup")
+async def get_cache_warmup() -> Dict[str, Any]:
+    """State of the latest cache warm-up run"""
+    return cache_warmer.status()
+
+@router.post("/cache/warmup", status_code=202)
+async def trigger_cache_warmup() -> Dict[str, Any]:
+    """
+    Rerun cache warm-up in the background
+
+    Useful after a Redis failover or flush. Returns 409 while a run is
+    already in progress.
+    """
+    if not cache_warmer.start():
+        raise HTTPException(status_code=409, detail="Cache warm-up already running")
+    return cache_warmer.status()
+
+@router.post("/category-stats/reconcile")
+async def reconcile_category_stats() -> Dict[str, Any]:
+    """Recompute category stats from the products table now"""
+    return {"corrected": await category_stats_reconciler.reconcile_once()}
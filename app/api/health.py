@@ -0,0 +1,58 @@
+import asyncio
+from typing import Any, Dict
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.core import database
+from app.services.warmup import cache_warmer
+from app.utils.rabbitmq import rabbitmq
+from app.utils.redis_cache import cache
+from config.settings import settings
+
+router = APIRouter()
+
+async def _database_ok() -> bool:
+    try:
+        async with database.AsyncSessionLocal() as session:
+            await asyncio.wait_for(
+                session.execute(text("SELECT 1")), settings.HEALTH_CHECK_TIMEOUT_SECONDS
+            )
+        return True
+    except Exception:
+        return False
+
+@router.get("/health/live", include_in_schema=False)
+async def liveness() -> Dict[str, Any]:
+    """The process is up; restarting it would not help with anything else"""
+    return {"status": "ok"}
+
+@router.get("/health/ready", include_in_schema=False)
+async def readiness() -> JSONResponse:
+    """
+    Whether to send traffic here
+
+    Returns 503 until the database answers and cache warm-up has finished.
+    Redis or RabbitMQ being down only makes the status "degraded": requests
+    are then served without the cache and events wait in the outbox.
+    """
+    database_ok = await _database_ok()
+    # Doubles as the breaker's probe once its reset interval has passed
+    redis_ok = await cache.ping()
+    checks = {
+        "database": "ok" if database_ok else "down",
+        "redis": "ok" if redis_ok else f"down (breaker {cache.breaker.state})",
+        "rabbitmq": "ok" if rabbitmq.connected else "down",
+        "warmup": cache_warmer.status()["state"],
+    }
+    if not database_ok or not cache_warmer.ready:
+        status = "unavailable"
+    elif redis_ok and rabbitmq.connected:
+        status = "ok"
+    else:
+        status = "degraded"
+    return JSONResponse(
+        status_code=503 if status == "unavailable" else 200,
+        content={"status": status, "checks": checks}
+    )
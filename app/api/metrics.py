@@ -0,0 +1,10 @@
+from fastapi import APIRouter, Response
+
+from app.utils import metrics
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """Prometheus scrape endpoint"""
+    return Response(content=metrics.latest(), media_type=metrics.CONTENT_TYPE_LATEST)
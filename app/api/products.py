@@ -1,14 +1,143 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
 
-from app.core.database import get_db
-from app.schemas.product import ProductCreate, Product, CategoryCreate, Category
+from app.core import database
+from app.core.database import get_db, get_read_db, with_new_session
+from app.schemas.product import (
+    ProductCreate,
+    Product,
+    CategoryCreate,
+    Category,
+    CategoryStats,
+    CategoryWithStats,
+    ProductFilter,
+    ProductBatchRequest,
+    ProductBatchResponse,
+    BulkImportResult,
+    ProductBulkUpdate,
+    BulkUpdateResult,
+    StockAdjustment,
+    StockLevel,
+    StockReservation,
+    StockReservationResult
+)
+from app.services.outbox import outbox_relay
 from app.services.product import ProductService
+from app.services.stock import stock_aggregator
+from app.utils.cache_keys import page_entry, page_key, product_entry, product_keys
+from app.utils.pagination import decode_cursor
 from app.utils.redis_cache import cache
-from app.utils.rabbitmq import publish_event
+from app.utils.response_cache import (
+    MEDIA_TYPE,
+    accepts_gzip,
+    cached_response,
+    encode_body,
+    pack,
+    plain_body
+)
+from app.utils.serialization import dumps
+from app.utils.streaming import encode_ndjson, gzip_chunks, parse_csv, parse_ndjson
+from config.settings import settings
 
-router = APIRouter()
+router = APIRouter(prefix="/api/v1/products", tags=["products"])
+
+def _cursor_id(after: Optional[str]) -> Optional[int]:
+    """Extract keyset position from an opaque cursor"""
+    return _cursor(after)[0]
+
+def _cursor_value(sort_field: str, value: Any) -> Any:
+    """Sort value of a cursor as the column compares it; raises on bad input"""
+    if sort_field == "price":
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError("price must be a number")
+        return float(value)
+    if sort_field == "created_at":
+        return datetime.fromisoformat(value)
+    return None
+
+def _cursor(after: Optional[str], sort_field: str = "id") -> Tuple[Optional[int], Any]:
+    """Extract (id, sort value) keyset position from an opaque cursor"""
+    if after is None:
+        return None, None
+    try:
+        values = decode_cursor(after)
+        after_id = values["id"]
+        if isinstance(after_id, bool) or not isinstance(after_id, int):
+            raise TypeError("id must be an integer")
+        return after_id, _cursor_value(sort_field, values.get("v"))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def _invalidate_products(*product_ids: int):
+    """Drop changed products, every cached product list page and category stats"""
+    keys = await product_keys(list(product_ids)) if product_ids else {}
+    await cache.invalidate(keys.values(), ("products", "categories"))
+
+async def _invalidate_stock(changes: Dict[int, Tuple[int, int]]):
+    """
+    Drop the cached products whose stock changed, given (before, after)
+
+    Listing pages only go when a product ran out or came back, which
+    changes in_stock filters and category stats; otherwise their
+    quantities may lag by up to PRODUCTS_CACHE_TTL_SECONDS, sparing hot
+    SKUs a flush on every sale.
+    """
+    keys = await product_keys(list(changes))
+    crossed = any((before > 0) != (after > 0) for before, after in changes.values())
+    await cache.invalidate(keys.values(), ("products", "categories") if crossed else ())
+
+async def _adjust_stock(db: Session, product_id: int, delta: int) -> StockLevel:
+    if settings.STOCK_AGGREGATION_ENABLED:
+        quantity = await stock_aggregator.adjust(product_id, delta)
+    else:
+        quantity = (await ProductService(db).adjust_stock(product_id, [delta]))[0]
+    if quantity is None:
+        raise HTTPException(status_code=409, detail="Insufficient stock")
+    outbox_relay.notify()
+    await _invalidate_stock({product_id: (quantity - delta, quantity)})
+    return StockLevel(id=product_id, quantity=quantity)
+
+def _filler(key: str, load, db: Session):
+    """
+    Loader for a cache miss on key
+
+    Concurrent misses share one load, which may outlive the request that
+    started it, so it opens a session of its own rather than using db. It
+    reads from the primary when db does (read-your-writes) or shortly after
+    a write to the key's namespace: what it loads is shared by every client
+    until it expires, and a lagging replica would pin the old rows under
+    the new key.
+    """
+    async def run():
+        primary = db.bind is not database.read_engine or (
+            database.read_engine is not database.engine
+            and await cache.written_recently(key)
+        )
+        return await with_new_session(load, read_only=not primary)()
+    return run
+
+async def _cached_page(request: Request, db: Session, key: str, load, **options) -> Response:
+    """
+    Serve a cached listing page, or 304 when the client already has it
+
+    The ETag stored with the page hashes its body, so it is compared after
+    the lookup: stock changes may update a page without a new key. While
+    the key's generation is unknown, pages go out without an ETag.
+    """
+    entry = await cache.get_or_set(
+        key, _filler(key, load, db), raw=True,
+        refresh=with_new_session(load, read_only=True), **options
+    )
+    if not cache.is_versioned(key):
+        return cached_response(entry, request.headers.get("accept-encoding"), tagged=False)
+    return cached_response(
+        entry, request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match")
+    )
 
 @router.post("/categories/", response_model=Category)
 async def create_category(
@@ -17,25 +146,53 @@ async def create_category(
 ):
     service = ProductService(db)
     db_category = await service.create_category(category)
-    await publish_event("category.created", db_category.dict())
+    outbox_relay.notify()
+    await cache.bump_generation("categories")
     return db_category
 
-@router.get("/categories/", response_model=List[Category])
+@router.get("/categories/", response_model=List[CategoryWithStats])
 async def get_categories(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    after: Optional[str] = None,
+    db: Session = Depends(get_read_db)
 ):
-    cache_key = f"categories:skip={skip}:limit={limit}"
-    cached_result = await cache.get(cache_key)
-    if cached_result:
-        return cached_result
+    """
+    List categories with their stats
 
-    service = ProductService(db)
-    categories = await service.get_categories(skip=skip, limit=limit)
-    
-    await cache.set(cache_key, categories)
-    return categories
+    Stats (product, active and in-stock counts, min/max price) are read
+    from the incrementally maintained category_stats table, not computed
+    per request.
+    """
+    after_id = _cursor_id(after)
+
+    async def load(session: Session):
+        service = ProductService(session)
+        db_categories = await service.get_categories(
+            skip=skip, limit=limit, after_id=after_id, with_stats=True
+        )
+        return page_entry(db_categories, List[CategoryWithStats], limit)
+
+    return await _cached_page(request, db, await page_key("categories", skip, limit, after), load)
+
+@router.get("/categories/{category_id}/stats", response_model=CategoryStats)
+async def get_category_stats(
+    category_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """Product, active and in-stock counts and price range of a category"""
+    async def load(session: Session):
+        stats = await ProductService(session).get_category_stats(category_id)
+        return CategoryStats.model_validate(stats) if stats else None
+
+    key = await cache.versioned_key("categories", f"stats:{category_id}")
+    stats = await cache.get_or_set(
+        key, _filler(key, load, db), refresh=with_new_session(load, read_only=True)
+    )
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Category not found")
+    return stats
 
 @router.post("/products/", response_model=Product)
 async def create_product(
@@ -44,40 +201,310 @@ async def create_product(
 ):
     service = ProductService(db)
     db_product = await service.create_product(product)
-    await publish_event("product.created", db_product.dict())
+    outbox_relay.notify()
+    await _invalidate_products()
     return db_product
 
 @router.get("/products/", response_model=List[Product])
 async def get_products(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
+    after: Optional[str] = None,
+    include_total: bool = False,
+    filters: ProductFilter = Depends(),
+    db: Session = Depends(get_read_db)
+):
+    """
+    List products
+
+    Filter by category_id, min_price/max_price, is_active and in_stock, and
+    sort by id, price or created_at (prefix with "-" for descending). Pass
+    the X-Next-Cursor header of the previous page as ``after`` to page by
+    keyset instead of ``skip``; the cursor is absent on the last page. With
+    include_total, X-Total-Count carries the number of matching products,
+    cached for up to COUNT_CACHE_EXPIRE_SECONDS until a product changes.
+    Large pages are cached gzipped and served as is to clients sending
+    ``Accept-Encoding: gzip``. Pages carry an ETag; sending it back in
+    If-None-Match gets a 304 until a product changes.
+    """
+    after_id, after_value = _cursor(after, filters.sort_field)
+    suffix = filters.cache_suffix()
+
+    async def load(session: Session):
+        service = ProductService(session)
+        db_products = await service.get_products(
+            skip=skip,
+            limit=limit,
+            after_id=after_id,
+            filters=filters,
+            after_value=after_value
+        )
+        return page_entry(db_products, List[Product], limit, filters.sort_field)
+
+    response = await _cached_page(
+        request, db, await page_key("products", skip, limit, after, suffix), load
+    )
+
+    if include_total and response.status_code == 200:
+        async def count(session: Session):
+            return await ProductService(session).count_products(filters)
+
+        # Shared by every sort order, and recounted once a write bumps the
+        # products generation
+        key = await cache.versioned_key(
+            "products", f"count:{filters.cache_suffix(include_sort=False)}"
+        )
+        total = await cache.get_or_set(
+            key,
+            _filler(key, count, db),
+            expire=settings.COUNT_CACHE_EXPIRE_SECONDS,
+            refresh=with_new_session(count, read_only=True)
+        )
+        response.headers["X-Total-Count"] = str(total)
+    return response
+
+@router.post("/products/import", response_model=BulkImportResult)
+async def import_products(
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Bulk import products from the request body
+
+    Send ``text/csv`` with a header line or newline-delimited JSON
+    (``application/x-ndjson``). The body is parsed as it streams in and
+    inserted in batches of BULK_IMPORT_BATCH_SIZE; one product.bulk_imported
+    event is queued per batch.
+    """
+    content_type = request.headers.get("content-type", "")
+    parse = parse_csv if content_type.startswith("text/csv") else parse_ndjson
+
+    service = ProductService(db)
+    result = BulkImportResult()
+    async for ids, errors in service.import_products(
+        parse(request.stream()),
+        batch_size=settings.BULK_IMPORT_BATCH_SIZE
+    ):
+        result.imported += len(ids)
+        result.failed += len(errors)
+        room = settings.BULK_IMPORT_MAX_ERRORS - len(result.errors)
+        result.errors.extend(errors[:max(room, 0)])
+        if ids:
+            outbox_relay.notify()
+            await _invalidate_products()
+    return result
+
+@router.patch("/products/bulk", response_model=BulkUpdateResult)
+async def update_products(
+    update: ProductBulkUpdate,
     db: Session = Depends(get_db)
 ):
-    cache_key = f"products:skip={skip}:limit={limit}"
-    cached_result = await cache.get(cache_key)
-    if cached_result:
-        return cached_result
+    """
+    Partially update many products, e.g. nightly repricing
 
+    Each item names a product by ``id`` or ``sku`` and carries only the
+    fields to change. Items are applied in chunks of BULK_UPDATE_BATCH_SIZE
+    with set-based UPDATEs, one commit, one pipelined cache invalidation and
+    one product.bulk_updated event per chunk. Unknown products or categories
+    are reported by item index without failing the rest.
+    """
     service = ProductService(db)
-    products = await service.get_products(skip=skip, limit=limit)
-    
-    await cache.set(cache_key, products)
-    return products
+    result = BulkUpdateResult()
+    async for ids, errors in service.update_products(
+        update.items,
+        batch_size=settings.BULK_UPDATE_BATCH_SIZE
+    ):
+        result.updated += len(ids)
+        result.failed += len(errors)
+        result.errors.extend(errors)
+        if ids:
+            outbox_relay.notify()
+            await _invalidate_products(*ids)
+    return result
+
+@router.post("/products/batch", response_model=ProductBatchResponse)
+async def get_products_batch(
+    batch: ProductBatchRequest,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Look up many products at once
+
+    Hits are served with one MGET, misses are loaded with one IN query and
+    written back in one pipeline. Items keep the order of the requested ids.
+    """
+    ids = list(dict.fromkeys(batch.ids))
+    keys = await product_keys(ids)
+    found = await cache.get_many(list(keys.values()), raw=True)
+
+    missed = [product_id for product_id in ids if keys[product_id] not in found]
+    if missed:
+        service = ProductService(db)
+        backfill = {
+            keys[p.id]: product_entry(p, keys[p.id])
+            for p in await service.get_products_by_ids(missed)
+        }
+        await cache.set_many(backfill, raw=True)
+        found.update(backfill)
+
+    # Splice the cached bodies together instead of re-encoding products
+    items = b",".join(plain_body(found[keys[i]]) for i in ids if keys[i] in found)
+    missing = [i for i in ids if keys[i] not in found]
+    return Response(
+        content=b'{"items":[' + items + b'],"missing":' + dumps(missing) + b"}",
+        media_type=MEDIA_TYPE
+    )
+
+@router.post("/products/stock/reserve", response_model=StockReservationResult)
+async def reserve_stock(
+    reservation: StockReservation,
+    db: Session = Depends(get_db)
+):
+    """
+    Take stock for a whole order in one transaction
+
+    Either every item is taken or none is: 409 lists the products short of
+    stock and 404 the unknown ones. Repeated products are summed.
+    """
+    items: Dict[int, int] = {}
+    for item in reservation.items:
+        items[item.product_id] = items.get(item.product_id, 0) + item.quantity
+    levels = await ProductService(db).reserve_stock(items)
+    outbox_relay.notify()
+    await _invalidate_stock({
+        product_id: (quantity + items[product_id], quantity)
+        for product_id, quantity in levels.items()
+    })
+    return StockReservationResult(items=[
+        StockLevel(id=product_id, quantity=quantity)
+        for product_id, quantity in levels.items()
+    ])
+
+@router.get("/products/export")
+async def export_products(
+    request: Request,
+    category_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Stream the catalog as NDJSON
+
+    Gzip-compressed when the client sends ``Accept-Encoding: gzip``.
+    """
+    service = ProductService(db)
+    body = encode_ndjson(service.stream_products(
+        category_id=category_id,
+        is_active=is_active,
+        fetch_size=settings.EXPORT_FETCH_SIZE
+    ))
+    headers = {}
+    if accepts_gzip(request.headers.get("accept-encoding")):
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        body, media_type="application/x-ndjson", headers=headers
+    )
+
+@router.get("/products/search", response_model=List[Product])
+async def search_products(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    """Search products by SKU, name and description, best matches first"""
+    q = q.strip()
+    if not q:
+        return Response(content=b"[]", media_type=MEDIA_TYPE)
+
+    async def load(session: Session):
+        service = ProductService(session)
+        results = await service.search_products(q, limit=limit)
+        return pack(encode_body(results, List[Product]))
+
+    # Shares the products generation, so any product write drops results
+    cache_key = await cache.versioned_key("products", f"search:q={quote(q)}:limit={limit}")
+    return await _cached_page(
+        request, db, cache_key, load, expire=settings.SEARCH_CACHE_EXPIRE_SECONDS
+    )
 
 @router.get("/products/{product_id}", response_model=Product)
 async def get_product(
+    request: Request,
     product_id: int,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get one product
+
+    The response carries an ETag derived from the product's updated_at;
+    with a matching If-None-Match the answer is a 304 read from the cached
+    entry's headers, without inflating its body.
+    """
+    keys = await product_keys([product_id])
+
+    async def load(session: Session):
+        service = ProductService(session)
+        db_product = await service.get_product(product_id)
+        return product_entry(db_product, keys[product_id]) if db_product else None
+
+    entry = await cache.get_or_set(
+        keys[product_id], _filler(keys[product_id], load, db), raw=True,
+        refresh=with_new_session(load, read_only=True)
+    )
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return cached_response(
+        entry,
+        request.headers.get("accept-encoding"),
+        if_none_match=request.headers.get("if-none-match")
+    )
+
+@router.put("/products/{product_id}", response_model=Product)
+async def update_product(
+    product_id: int,
+    product: ProductCreate,
     db: Session = Depends(get_db)
 ):
-    cache_key = f"product:{product_id}"
-    cached_result = await cache.get(cache_key)
-    if cached_result:
-        return cached_result
+    service = ProductService(db)
+    db_product = await service.update_product(product_id, product)
+    outbox_relay.notify()
+    await _invalidate_products(product_id)
+    return db_product
+
+@router.post("/products/{product_id}/stock/decrement", response_model=StockLevel)
+async def decrement_stock(
+    product_id: int,
+    adjustment: StockAdjustment,
+    db: Session = Depends(get_db)
+):
+    """
+    Take stock atomically, 409 when fewer than the quantity are left
+
+    Runs a single conditional UPDATE instead of a read-modify-write, so
+    concurrent decrements never oversell or lose updates. With
+    STOCK_AGGREGATION_ENABLED, concurrent changes to one product are
+    merged into one UPDATE.
+    """
+    return await _adjust_stock(db, product_id, -adjustment.quantity)
 
+@router.post("/products/{product_id}/stock/increment", response_model=StockLevel)
+async def increment_stock(
+    product_id: int,
+    adjustment: StockAdjustment,
+    db: Session = Depends(get_db)
+):
+    """Return stock atomically, e.g. for cancelled orders"""
+    return await _adjust_stock(db, product_id, adjustment.quantity)
+
+@router.delete("/products/{product_id}", status_code=204)
+async def delete_product(
+    product_id: int,
+    db: Session = Depends(get_db)
+):
     service = ProductService(db)
-    product = await service.get_product(product_id)
-    if product is None:
-        raise HTTPException(status_code=404, detail="Product not found")
-    
-    await cache.set(cache_key, product)
-    return product
\ No newline at end of file
+    await service.delete_product(product_id)
+    outbox_relay.notify()
+    await _invalidate_products(product_id)
\ No newline at end of file
@@ -1,29 +1,140 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import time
+from typing import Any, Awaitable, Callable
+from fastapi import Request, Response
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.utils import metrics, sql_profiler
 from config.settings import settings
 
-# Create async engine
-engine = create_async_engine(
-    settings.get_db_url,
-    echo=settings.SQL_ECHO,
-    pool_pre_ping=True
-)
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.child(metrics.DB_POOL_WAIT, self.logging_name or "primary").observe(
+                time.perf_counter() - started
+            )
 
-# Create async session factory
-AsyncSessionLocal = sessionmaker(
-    engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autoflush=False
+def create_engine(
+    url: str,
+    role: str = "primary",
+    pool_size: int = settings.DB_POOL_SIZE,
+    max_overflow: int = settings.DB_MAX_OVERFLOW
+) -> AsyncEngine:
+    """Create an async engine with pool limits and timeouts from settings"""
+    connect_args = {"timeout": settings.DB_CONNECT_TIMEOUT_SECONDS}
+    if make_url(url).get_backend_name() == "postgresql" and settings.DB_COMMAND_TIMEOUT_SECONDS:
+        connect_args["command_timeout"] = settings.DB_COMMAND_TIMEOUT_SECONDS
+    engine = create_async_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        pool_pre_ping=True,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_logging_name=role,
+        connect_args=connect_args
+    )
+    metrics.register_pool(engine.pool, role)
+    if settings.SQL_PROFILING_ENABLED:
+        sql_profiler.instrument(engine)
+    return engine
+
+def _session_factory(bind: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        bind,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
+
+# Create async engines: writes go to the primary, pure reads to the
+# replica when one is configured
+engine = create_engine(settings.get_db_url)
+read_engine = (
+    create_engine(
+        settings.get_read_db_url,
+        role="replica",
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW
+    )
+    if settings.get_read_db_url
+    else engine
 )
 
+# Create async session factories
+AsyncSessionLocal = _session_factory(engine)
+AsyncReadSessionLocal = _session_factory(read_engine)
+
 # Create declarative base
 Base = declarative_base()
 
-async def get_db() -> AsyncSession:
-    """Dependency for getting async database session"""
+def _reads_from_primary(request: Request) -> bool:
+    """Whether the client wrote recently enough to need its own writes back"""
+    until = request.cookies.get(settings.READ_YOUR_WRITES_COOKIE)
+    try:
+        return until is not None and float(until) > time.time()
+    except ValueError:
+        return False
+
+async def get_db(response: Response) -> AsyncSession:
+    """
+    Dependency for getting async database session on the primary
+
+    Use for requests that write. With a replica and READ_YOUR_WRITES_SECONDS,
+    the client gets a cookie routing its reads to the primary for that long,
+    so it is not served data from before its own write.
+    """
+    if read_engine is not engine and settings.READ_YOUR_WRITES_SECONDS > 0:
+        response.set_cookie(
+            settings.READ_YOUR_WRITES_COOKIE,
+            str(time.time() + settings.READ_YOUR_WRITES_SECONDS),
+            max_age=int(settings.READ_YOUR_WRITES_SECONDS) + 1,
+            httponly=True,
+            samesite="lax"
+        )
     async with AsyncSessionLocal() as session:
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Dependency for getting async database session for pure reads
+
+    Served by the replica unless none is configured or the client is inside
+    its read-your-writes window. Other clients may not see a write until
+    the replica has it; cache misses right after a write read from the
+    primary instead, as their result is shared (see cache.written_recently).
+    """
+    factory = AsyncSessionLocal if _reads_from_primary(request) else AsyncReadSessionLocal
+    async with factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def with_new_session(
+    func: Callable[[AsyncSession], Awaitable[Any]],
+    read_only: bool = False
+) -> Callable[[], Awaitable[Any]]:
+    """
+    Turn func(session) into a loader that opens a session of its own
+
+    For work that outlives the request, such as background cache refreshes,
+    which must not touch the request's session. With read_only, the session
+    comes from the replica pool.
+    """
+    async def run():
+        factory = AsyncReadSessionLocal if read_only else AsyncSessionLocal
+        async with factory() as session:
+            return await func(session)
+    return run
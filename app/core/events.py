@@ -1,17 +1,28 @@
 import logging
+from app.services.category_stats import category_stats_reconciler
+from app.services.invalidation import invalidation_consumer
+from app.services.outbox import outbox_relay
+from app.services.stock import stock_aggregator
+from app.services.warmup import cache_warmer
 from app.utils.redis_cache import cache
 from app.utils.rabbitmq import rabbitmq
+from config.settings import settings
 
 logger = logging.getLogger(__name__)
 
 async def init_redis() -> None:
-    """Initialize Redis connection"""
-    try:
-        await cache.init()
+    """
+    Initialize Redis connection
+
+    Startup goes ahead while Redis is down: requests bypass the cache until
+    its circuit breaker lets a probe through and Redis answers again.
+    """
+    await cache.init()
+    await cache.start_invalidation_listener()
+    if await cache.ping():
         logger.info("Redis connection established")
-    except Exception as e:
-        logger.error(f"Failed to initialize Redis: {e}")
-        raise
+    else:
+        logger.warning("Redis unavailable, starting without the cache")
 
 async def close_redis() -> None:
     """Close Redis connection"""
@@ -23,13 +34,19 @@ async def close_redis() -> None:
         raise
 
 async def init_rabbitmq() -> None:
-    """Initialize RabbitMQ connection"""
+    """
+    Initialize RabbitMQ connection
+
+    If the broker is down, startup goes ahead and connecting is retried in
+    the background; events wait in the outbox meanwhile and consumers start
+    once connected.
+    """
     try:
         await rabbitmq.connect()
         logger.info("RabbitMQ connection established")
     except Exception as e:
-        logger.error(f"Failed to initialize RabbitMQ: {e}")
-        raise
+        logger.warning(f"RabbitMQ unavailable, retrying in the background: {e}")
+        rabbitmq.reconnect_in_background(on_connected=start_consumers)
 
 async def close_rabbitmq() -> None:
     """Close RabbitMQ connection"""
@@ -38,4 +55,45 @@ async def close_rabbitmq() -> None:
         logger.info("RabbitMQ connection closed")
     except Exception as e:
         logger.error(f"Failed to close RabbitMQ connection: {e}")
-        raise
\ No newline at end of file
+        raise
+
+async def start_outbox_relay() -> None:
+    """Start relaying outbox events to RabbitMQ"""
+    await outbox_relay.start()
+    logger.info("Outbox relay started")
+
+async def stop_outbox_relay() -> None:
+    """Stop the outbox relay"""
+    await outbox_relay.stop()
+    logger.info("Outbox relay stopped")
+
+async def start_consumers() -> None:
+    """Start consuming events, e.g. cache invalidations from other writers"""
+    if settings.CONSUMERS_ENABLED and rabbitmq.connected:
+        await invalidation_consumer.start()
+        logger.info("Event consumers started")
+
+async def stop_consumers() -> None:
+    """Stop consuming and ack the events already handled"""
+    await invalidation_consumer.stop()
+
+async def start_stats_reconciler() -> None:
+    """Periodically correct drift in the category stats"""
+    await category_stats_reconciler.start()
+
+async def stop_stats_reconciler() -> None:
+    await category_stats_reconciler.stop()
+
+async def start_cache_warmup() -> None:
+    """Warm the cache in the background; startup does not wait for it"""
+    if settings.WARMUP_ENABLED:
+        cache_warmer.start()
+        logger.info("Cache warm-up started")
+
+async def stop_cache_warmup() -> None:
+    """Cancel a warm-up that is still running"""
+    await cache_warmer.stop()
+
+async def stop_stock_aggregator() -> None:
+    """Apply the stock adjustments still waiting for their batch"""
+    await stock_aggregator.stop()
@@ -0,0 +1,27 @@
+import logging
+
+from config.settings import settings
+
+try:
+    from pythonjsonlogger.json import JsonFormatter
+except ImportError:  # python-json-logger < 3.1
+    from pythonjsonlogger.jsonlogger import JsonFormatter
+
+_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+def configure_logging():
+    """
+    Send application logs to stderr at LOG_LEVEL
+
+    With LOG_JSON each record is one JSON object, fields passed as
+    ``extra`` included, e.g. the per-request SQL profile. Safe to call
+    more than once.
+    """
+    root = logging.getLogger()
+    if any(getattr(handler, "_app_handler", False) for handler in root.handlers):
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter(_FORMAT) if settings.LOG_JSON else logging.Formatter(_FORMAT))
+    handler._app_handler = True
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
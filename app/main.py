@@ -4,9 +4,22 @@ from app.core.events import (
     init_redis,
     close_redis,
     init_rabbitmq,
-    close_rabbitmq
+    close_rabbitmq,
+    start_outbox_relay,
+    stop_outbox_relay,
+    start_consumers,
+    stop_consumers,
+    start_stats_reconciler,
+    stop_stats_reconciler,
+    start_cache_warmup,
+    stop_cache_warmup,
+    stop_stock_aggregator
 )
-from app.api import products
+from app.api import admin, health, metrics, products
+from app.core.logging_config import configure_logging
+from app.utils.metrics import PrometheusMiddleware
+from app.utils.sql_profiler import SQLProfilingMiddleware
+from config.settings import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,15 +27,25 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_redis()
     await init_rabbitmq()
+    await start_outbox_relay()
+    await start_consumers()
+    await start_stats_reconciler()
+    await start_cache_warmup()
     
     yield
     
     # Shutdown
+    await stop_stock_aggregator()
+    await stop_cache_warmup()
+    await stop_stats_reconciler()
+    await stop_consumers()
+    await stop_outbox_relay()
     await close_redis()
     await close_rabbitmq()
 
 def create_application() -> FastAPI:
     """Create FastAPI application"""
+    configure_logging()
     app = FastAPI(
         title="Product Service",
         description="Product Service API",
@@ -30,12 +53,17 @@ def create_application() -> FastAPI:
         lifespan=lifespan
     )
 
-    # Include routers
-    app.include_router(
-        products.router,
-        prefix="/api/v1/products",
-        tags=["products"]
-    )
+    if settings.METRICS_ENABLED:
+        app.add_middleware(PrometheusMiddleware)
+        app.include_router(metrics.router)
+    if settings.SQL_PROFILING_ENABLED:
+        app.add_middleware(SQLProfilingMiddleware)
+
+    # Include routers. Prefixes are set on the routers themselves, so each
+    # route's path is its full template (metrics label requests by it)
+    app.include_router(health.router)
+    app.include_router(products.router)
+    app.include_router(admin.router)
 
     return app
 
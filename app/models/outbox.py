@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+class OutboxEvent(Base):
+    """Event waiting to be relayed to RabbitMQ, written in the same transaction as the change"""
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True)
+    routing_key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class OutboxDeadLetter(Base):
+    """Outbox event given up on after OUTBOX_MAX_ATTEMPTS failed publishes"""
+    __tablename__ = "outbox_dead_letters"
+
+    id = Column(Integer, primary_key=True)
+    event_id = Column(Integer, nullable=False)
+    routing_key = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    attempts = Column(Integer, nullable=False)
+    error = Column(Text)
+    created_at = Column(DateTime(timezone=True))
+    failed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,9 +1,18 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import (
+    Column, Integer, String, Float, Boolean, ForeignKey, DateTime, DDL, Index, event, null
+)
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
 
+# Trigram operators back fuzzy and substring product search on PostgreSQL
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class Category(Base):
     __tablename__ = "categories"
 
@@ -11,9 +20,16 @@ class Category(Base):
     name = Column(String, unique=True, index=True)
     description = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # An explicit NULL on insert; otherwise eager_defaults re-selects the
+    # column after every INSERT
+    updated_at = Column(DateTime(timezone=True), default=null(), onupdate=func.now())
 
     products = relationship("Product", back_populates="category")
+    # Loaded explicitly with selectinload where listings embed it
+    stats = relationship("CategoryStats", uselist=False, lazy="raise")
+
+    # Fetch server-generated columns with RETURNING instead of a refresh
+    __mapper_args__ = {"eager_defaults": True}
 
 class Product(Base):
     __tablename__ = "products"
@@ -27,6 +43,50 @@ class Product(Base):
     category_id = Column(Integer, ForeignKey("categories.id"))
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # An explicit NULL on insert; otherwise eager_defaults re-selects the
+    # column after every INSERT
+    updated_at = Column(DateTime(timezone=True), default=null(), onupdate=func.now())
+
+    category = relationship("Category", back_populates="products")
+
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Listing filters and keyset sorts, always tie-broken by id
+        Index("ix_products_category_price", "category_id", "price", "id"),
+        Index("ix_products_category_created", "category_id", "created_at", "id"),
+        Index("ix_products_price", "price", "id"),
+        Index("ix_products_created", "created_at", "id"),
+        # Search indexes; other dialects fall back to plain LIKE scans
+        Index(
+            "ix_products_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_products_description_trgm", "description",
+            postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_products_sku_pattern", "sku",
+            postgresql_ops={"sku": "text_pattern_ops"}
+        ).ddl_if(dialect="postgresql"),
+    )
+
+class CategoryStats(Base):
+    """
+    Per-category aggregates, updated incrementally by ProductService writes
+
+    Counts move by deltas in the writing transaction; min/max price are
+    re-read from the (category_id, price) index for touched categories.
+    A periodic reconciliation corrects any drift.
+    """
+    __tablename__ = "category_stats"
 
-    category = relationship("Category", back_populates="products")
\ No newline at end of file
+    category_id = Column(
+        Integer, ForeignKey("categories.id", ondelete="CASCADE"), primary_key=True
+    )
+    product_count = Column(Integer, nullable=False, default=0)
+    active_count = Column(Integer, nullable=False, default=0)
+    in_stock_count = Column(Integer, nullable=False, default=0)
+    min_price = Column(Float, nullable=True)
+    max_price = Column(Float, nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
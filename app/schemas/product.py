@@ -1,6 +1,8 @@
-from typing import Optional
+from typing import Any, Dict, List, Literal, Optional
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from config.settings import settings
 
 # Category schemas
 class CategoryBase(BaseModel):
@@ -17,6 +19,18 @@ class Category(CategoryBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class CategoryStats(BaseModel):
+    product_count: int = 0
+    active_count: int = 0
+    in_stock_count: int = 0
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class CategoryWithStats(Category):
+    stats: Optional[CategoryStats] = None
+
 # Product schemas
 class ProductBase(BaseModel):
     name: str
@@ -30,9 +44,111 @@ class ProductBase(BaseModel):
 class ProductCreate(ProductBase):
     pass
 
+class ProductFilter(BaseModel):
+    category_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    is_active: Optional[bool] = None
+    in_stock: Optional[bool] = None
+    sort: Literal["id", "price", "-price", "created_at", "-created_at"] = "id"
+
+    @property
+    def sort_field(self) -> str:
+        return self.sort.lstrip("-")
+
+    def cache_suffix(self, include_sort: bool = True) -> str:
+        """
+        Stable key fragment: same filters give the same key in any order
+
+        Without include_sort, every sort order of a filter set shares it,
+        e.g. for counts.
+        """
+        exclude = None if include_sort else {"sort"}
+        return ":".join(
+            f"{name}={value}"
+            for name, value in sorted(self.model_dump(exclude_none=True, exclude=exclude).items())
+        )
+
 class Product(ProductBase):
     id: int
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+# Batch schemas
+class ProductBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=settings.BATCH_MAX_IDS)
+
+class ProductBatchResponse(BaseModel):
+    items: List[Product]
+    missing: List[int] = []
+
+# Stock schemas
+class StockAdjustment(BaseModel):
+    quantity: int = Field(..., gt=0)
+
+class StockLevel(BaseModel):
+    id: int
+    quantity: int
+
+class StockReservationItem(BaseModel):
+    product_id: int
+    quantity: int = Field(..., gt=0)
+
+class StockReservation(BaseModel):
+    items: List[StockReservationItem] = Field(..., min_length=1, max_length=settings.BATCH_MAX_IDS)
+
+class StockReservationResult(BaseModel):
+    items: List[StockLevel]
+
+
+# Bulk import schemas
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: List[BulkImportError] = []
+
+# Bulk update schemas
+class ProductPatch(BaseModel):
+    """Partial update of one product, found by id or SKU; unset fields are kept"""
+    id: Optional[int] = None
+    sku: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    quantity: Optional[int] = None
+    category_id: Optional[int] = None
+    is_active: Optional[bool] = None
+
+    @model_validator(mode="after")
+    def check_fields(self) -> "ProductPatch":
+        if (self.id is None) == (self.sku is None):
+            raise ValueError("Give either id or sku")
+        changes = self.changes()
+        if not changes:
+            raise ValueError("Nothing to update")
+        nulls = sorted(k for k, v in changes.items() if v is None and k != "description")
+        if nulls:
+            raise ValueError(f"Cannot be null: {', '.join(nulls)}")
+        return self
+
+    def changes(self) -> Dict[str, Any]:
+        """The columns to set"""
+        return self.model_dump(exclude_unset=True, exclude={"id", "sku"})
+
+class ProductBulkUpdate(BaseModel):
+    items: List[ProductPatch] = Field(..., min_length=1, max_length=settings.BULK_UPDATE_MAX_ITEMS)
+
+class BulkUpdateError(BaseModel):
+    index: int
+    error: str
+
+class BulkUpdateResult(BaseModel):
+    updated: int = 0
+    failed: int = 0
+    errors: List[BulkUpdateError] = []
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.core import database
+from app.services.product import ProductService
+from app.utils.redis_cache import cache
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class CategoryStatsReconciler:
+    """
+    Background task recomputing category stats from scratch periodically
+
+    Incremental updates can drift, e.g. after manual SQL or a write path
+    that bypasses ProductService; each pass corrects the stored rows with
+    one GROUP BY, creates missing ones and drops cached category pages
+    when anything changed. The first pass runs right at startup.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        interval: float = settings.CATEGORY_STATS_RECONCILE_INTERVAL_SECONDS
+    ):
+        self._session_factory = session_factory
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def session_factory(self):
+        return self._session_factory or database.AsyncSessionLocal
+
+    async def start(self):
+        if not self._task and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reconcile_once(self) -> int:
+        """Run one pass, returning how many categories were corrected"""
+        async with self.session_factory() as session:
+            corrected = await ProductService(session).reconcile_category_stats()
+        if corrected:
+            logger.info(f"Corrected stats of {corrected} categories")
+            await cache.bump_generation("categories")
+        return corrected
+
+    async def _run(self):
+        while True:
+            try:
+                await self.reconcile_once()
+            except Exception as e:
+                logger.error(f"Category stats reconciliation failed: {e}")
+            await asyncio.sleep(self.interval)
+
+# Create a global reconciler instance
+category_stats_reconciler = CategoryStatsReconciler()
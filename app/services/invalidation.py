@@ -0,0 +1,83 @@
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.utils.cache_keys import product_keys
+from app.utils.consumer import BatchConsumer, Event
+from app.utils.redis_cache import cache
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Product events that change what listing pages show
+LISTING_EVENTS = {
+    "product.created",
+    "product.updated",
+    "product.deleted",
+    "product.bulk_imported",
+    "product.bulk_updated",
+}
+
+def _is_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _affected(routing_key: str, data: Dict[str, Any]) -> Optional[Tuple[Set[int], Set[str]]]:
+    """Product ids and namespaces an event invalidates, None if it is malformed"""
+    if routing_key.startswith("category."):
+        return set(), {"categories"}
+    if not routing_key.startswith("product."):
+        return set(), set()
+    # Batched events (stock reservations, bulk updates) list items
+    items = data.get("items") or []
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        return None
+    ids = [item.get("id") for item in items]
+    if "id" in data:
+        ids.append(data["id"])
+    if not all(_is_id(product_id) for product_id in ids):
+        return None
+    namespaces: Set[str] = set()
+    if routing_key in LISTING_EVENTS:
+        namespaces.update(("products", "categories"))
+    elif routing_key == "product.stock_changed":
+        quantity, delta = data.get("quantity"), data.get("delta")
+        if not _is_id(quantity) or not _is_id(delta):
+            return None
+        # Listings and stats only change when the product ran out or came
+        # back
+        if (quantity - delta > 0) != (quantity > 0):
+            namespaces.update(("products", "categories"))
+    return set(ids), namespaces
+
+async def invalidate_for_events(events: List[Event]):
+    """
+    Turn a batch of product.*/category.* events into cache invalidations
+
+    Writers already invalidate right after their commit; this second pass
+    lands after the event was relayed, dropping entries that a reader on a
+    lagging replica cached in between. A whole batch costs one pipelined
+    round trip (one DEL, at most one generation bump per namespace) and
+    one broadcast to the local tier of every replica. Malformed events are
+    logged and skipped one by one.
+    """
+    product_ids: Set[int] = set()
+    namespaces: Set[str] = set()
+    for routing_key, data in events:
+        affected = _affected(routing_key, data if isinstance(data, dict) else {})
+        if affected is None:
+            logger.warning(f"Skipping malformed {routing_key} event: {data!r}")
+            continue
+        product_ids.update(affected[0])
+        namespaces.update(affected[1])
+
+    keys = await product_keys(sorted(product_ids)) if product_ids else {}
+    await cache.invalidate(keys.values(), sorted(namespaces))
+    logger.debug(
+        f"Invalidated {len(product_ids)} products and {sorted(namespaces)} "
+        f"for {len(events)} events"
+    )
+
+invalidation_consumer = BatchConsumer(
+    ["product.*", "category.*"],
+    invalidate_for_events,
+    queue_name=settings.CACHE_INVALIDATION_QUEUE
+)
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select
+
+from app.core import database
+from app.models.outbox import OutboxDeadLetter, OutboxEvent
+from app.utils.rabbitmq import publish_events
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def _subject(event: OutboxEvent) -> Tuple[str, Any]:
+    """(entity type, id) an event is about; id is None for many entities"""
+    entity = event.routing_key.split(".", 1)[0]
+    if isinstance(event.payload, dict) and "id" in event.payload:
+        return entity, event.payload["id"]
+    return entity, None
+
+def _partition(event: OutboxEvent):
+    """Keep events about the same entity on one channel so they stay ordered"""
+    entity, entity_id = _subject(event)
+    return f"{entity}:{entity_id}" if entity_id is not None else entity
+
+def _rounds(events: List[OutboxEvent]) -> Iterator[List[OutboxEvent]]:
+    """
+    Split a batch into rounds that may be published concurrently
+
+    Events about many entities (bulk imports and updates, reservations)
+    must not overtake earlier per-entity events or be overtaken by later
+    ones, so each of them is a round of its own.
+    """
+    current: List[OutboxEvent] = []
+    for event in events:
+        if _subject(event)[1] is None:
+            if current:
+                yield current
+            yield [event]
+            current = []
+        else:
+            current.append(event)
+    if current:
+        yield current
+
+def _held_back(event: OutboxEvent, blocked: Dict[str, Set[Any]]) -> bool:
+    """Whether an earlier event this one must follow failed in this batch"""
+    entity, entity_id = _subject(event)
+    ids = blocked.get(entity)
+    return bool(ids) and (entity_id is None or None in ids or entity_id in ids)
+
+class OutboxRelay:
+    """
+    Background task draining the outbox table to RabbitMQ
+
+    Each batch is published concurrently over the channel pool and events
+    are deleted once the broker confirmed them. Failed events stay in the
+    table for the next round, so delivery is at-least-once. Events about
+    the same entity share a channel; when one fails, every later event
+    about that entity stays in the table too and goes out again after it,
+    so consumers may see an event twice but always see the last one last.
+    Events about many entities are published on their own, in order with
+    the rest. An event failing max_attempts times is moved to the dead
+    letter table, so it stops holding back the events behind it.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL_SECONDS,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def session_factory(self):
+        return self._session_factory or database.AsyncSessionLocal
+
+    def notify(self):
+        """Wake the relay right away instead of waiting for the next poll"""
+        self._wakeup.set()
+
+    async def start(self):
+        if not self._task:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def drain_once(self) -> int:
+        """Publish one batch of pending events, returning how many went out"""
+        async with self.session_factory() as session:
+            events = (await session.execute(
+                select(OutboxEvent)
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+
+            if not events:
+                return 0
+
+            published, dead = [], []
+            blocked: Dict[str, Set[Any]] = {}
+            for round_ in _rounds(events):
+                pending = [event for event in round_ if not _held_back(event, blocked)]
+                if not pending:
+                    continue
+                results = await publish_events([
+                    (event.routing_key, event.payload, _partition(event))
+                    for event in pending
+                ])
+                # In id order: an event that went out after a failed one
+                # about the same entity is kept and sent again after it
+                for event, error in zip(pending, results):
+                    if error is None and not _held_back(event, blocked):
+                        published.append(event.id)
+                        continue
+                    if error is not None:
+                        event.attempts += 1
+                        if event.attempts >= self.max_attempts:
+                            self._dead_letter(session, event, error)
+                            dead.append(event.id)
+                            continue
+                    entity, entity_id = _subject(event)
+                    blocked.setdefault(entity, set()).add(entity_id)
+
+            if published or dead:
+                await session.execute(
+                    delete(OutboxEvent).where(OutboxEvent.id.in_(published + dead))
+                )
+            await session.commit()
+            return len(published)
+
+    @staticmethod
+    def _dead_letter(session, event: OutboxEvent, error: Exception):
+        logger.error(
+            f"Giving up on outbox event {event.id} ({event.routing_key}) "
+            f"after {event.attempts} attempts: {error}"
+        )
+        session.add(OutboxDeadLetter(
+            event_id=event.id,
+            routing_key=event.routing_key,
+            payload=event.payload,
+            attempts=event.attempts,
+            error=str(error),
+            created_at=event.created_at
+        ))
+
+    async def _run(self):
+        while True:
+            try:
+                published = await self.drain_once()
+            except Exception as e:
+                logger.error(f"Outbox relay iteration failed: {e}")
+                published = 0
+            if published < self.batch_size:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+# Create a global relay instance
+outbox_relay = OutboxRelay()
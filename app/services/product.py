@@ -1,13 +1,186 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import case, column, func, insert, or_, select, tuple_, update, values
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Set, Tuple
 from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
 
-from app.models.product import Product, Category
-from app.schemas.product import ProductCreate, CategoryCreate
+from app.models.outbox import OutboxEvent
+from app.models.product import Product, Category, CategoryStats
+from app.schemas import product as schemas
+from app.schemas.product import (
+    ProductCreate,
+    CategoryCreate,
+    BulkImportError,
+    ProductFilter,
+    ProductPatch,
+    BulkUpdateError
+)
+from app.utils.streaming import batched
+
+PRODUCT_SORT_COLUMNS = {
+    "id": Product.id,
+    "price": Product.price,
+    "created_at": Product.created_at,
+}
+
+def _filter_products(query, filters: ProductFilter):
+    if filters.category_id is not None:
+        query = query.where(Product.category_id == filters.category_id)
+    if filters.min_price is not None:
+        query = query.where(Product.price >= filters.min_price)
+    if filters.max_price is not None:
+        query = query.where(Product.price <= filters.max_price)
+    if filters.is_active is not None:
+        query = query.where(Product.is_active == filters.is_active)
+    if filters.in_stock is not None:
+        query = query.where(
+            Product.quantity > 0 if filters.in_stock else Product.quantity <= 0
+        )
+    return query
+
+def _stats_columns():
+    """Aggregates of products per category, as computed from scratch"""
+    return (
+        func.count(Product.id).label("product_count"),
+        func.coalesce(func.sum(case((Product.is_active.is_(True), 1), else_=0)), 0)
+            .label("active_count"),
+        func.coalesce(func.sum(case((Product.quantity > 0, 1), else_=0)), 0)
+            .label("in_stock_count"),
+        func.min(Product.price).label("min_price"),
+        func.max(Product.price).label("max_price"),
+    )
 
 class ProductService:
     def __init__(self, db: Session):
         self.db = db
+        # Pending category stats changes: counts by delta, prices re-read
+        self._stats_deltas: Dict[int, List[int]] = {}
+        self._repriced: Set[int] = set()
+
+    def _add_event(self, routing_key: str, data: Any):
+        """Queue an event in the outbox; it is committed with the change"""
+        self.db.add(OutboxEvent(
+            routing_key=routing_key,
+            payload=jsonable_encoder(data)
+        ))
+
+    def _count(
+        self,
+        category_id: int,
+        sign: int,
+        is_active: Optional[bool] = True,
+        quantity: Optional[int] = 0,
+        reprice: bool = True
+    ):
+        """Record a product entering (+1) or leaving (-1) a category's stats"""
+        delta = self._stats_deltas.setdefault(category_id, [0, 0, 0])
+        delta[0] += sign
+        delta[1] += sign * bool(is_active)
+        delta[2] += sign * ((quantity or 0) > 0)
+        if reprice:
+            self._repriced.add(category_id)
+
+    def _count_update(self, before: Tuple, after: Tuple):
+        """Record a product changing, given its (category, active, quantity, price)"""
+        if before != after:
+            reprice = before[0] != after[0] or before[3] != after[3]
+            self._count(before[0], -1, before[1], before[2], reprice)
+            self._count(after[0], 1, after[1], after[2], reprice)
+
+    def _count_stock(self, category_id: int, before: int, after: int):
+        """Record a quantity change, which only matters when it crosses zero"""
+        if (before > 0) != (after > 0):
+            delta = self._stats_deltas.setdefault(category_id, [0, 0, 0])
+            delta[2] += 1 if after > 0 else -1
+
+    async def _flush_stats(self):
+        """
+        Apply recorded stats changes in the current transaction
+
+        Counts move by delta with one UPDATE per category, in id order so
+        concurrent writers lock rows consistently; min/max price come from
+        the (category_id, price) index. That subquery sees the statement's
+        snapshot, so two concurrent repricings in one category can each miss
+        the other's change and leave min/max off until the next write there
+        or the next reconciliation. Categories without a stats row yet are
+        left to reconciliation.
+        """
+        deltas, self._stats_deltas = self._stats_deltas, {}
+        repriced, self._repriced = self._repriced, set()
+        for category_id in sorted(set(deltas) | repriced):
+            values: Dict[str, Any] = {}
+            count, active, in_stock = deltas.get(category_id, (0, 0, 0))
+            if count:
+                values["product_count"] = CategoryStats.product_count + count
+            if active:
+                values["active_count"] = CategoryStats.active_count + active
+            if in_stock:
+                values["in_stock_count"] = CategoryStats.in_stock_count + in_stock
+            if category_id in repriced:
+                prices = select(Product.price).where(Product.category_id == category_id)
+                values["min_price"] = prices.with_only_columns(func.min(Product.price)).scalar_subquery()
+                values["max_price"] = prices.with_only_columns(func.max(Product.price)).scalar_subquery()
+            if values:
+                await self.db.execute(
+                    update(CategoryStats)
+                    .where(CategoryStats.category_id == category_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+
+    async def _computed_stats(self, category_ids: Optional[List[int]] = None) -> Dict[int, Dict[str, Any]]:
+        """Category stats straight from products with one GROUP BY"""
+        query = (
+            select(Category.id, *_stats_columns())
+            .select_from(Category)
+            .outerjoin(Product, Product.category_id == Category.id)
+            .group_by(Category.id)
+        )
+        if category_ids is not None:
+            query = query.where(Category.id.in_(category_ids))
+        rows = (await self.db.execute(query)).mappings()
+        return {row["id"]: {k: v for k, v in row.items() if k != "id"} for row in rows}
+
+    async def get_category_stats(self, category_id: int) -> Optional[CategoryStats]:
+        """Stored stats of a category, computed on the fly if not stored yet"""
+        stats = await self.db.get(CategoryStats, category_id)
+        if stats is None:
+            computed = await self._computed_stats([category_id])
+            if category_id in computed:
+                stats = CategoryStats(category_id=category_id, **computed[category_id])
+        return stats
+
+    async def reconcile_category_stats(self) -> int:
+        """
+        Recompute every category's stats with one GROUP BY and fix drift
+
+        The stats rows are locked in id order before counting, so writers
+        that commit meanwhile wait and then apply their deltas on top of the
+        corrected values instead of being overwritten by older totals.
+        Creates missing rows as well. Returns how many rows were corrected.
+        """
+        stored = {
+            row.category_id: row
+            for row in (await self.db.execute(
+                select(CategoryStats).order_by(CategoryStats.category_id).with_for_update()
+            )).scalars()
+        }
+        computed = await self._computed_stats()
+        corrected = 0
+        for category_id, values in computed.items():
+            row = stored.get(category_id)
+            if row is None:
+                self.db.add(CategoryStats(category_id=category_id, **values))
+            elif any(getattr(row, name) != value for name, value in values.items()):
+                for name, value in values.items():
+                    setattr(row, name, value)
+            else:
+                continue
+            corrected += 1
+        await self.db.commit()
+        return corrected
 
     async def create_category(self, category: CategoryCreate) -> Category:
         db_category = Category(
@@ -15,19 +188,42 @@ class ProductService:
             description=category.description
         )
         self.db.add(db_category)
+        await self.db.flush()
+        self.db.add(CategoryStats(
+            category_id=db_category.id, product_count=0, active_count=0, in_stock_count=0
+        ))
+        self._add_event(
+            "category.created", schemas.Category.model_validate(db_category)
+        )
         await self.db.commit()
-        await self.db.refresh(db_category)
         return db_category
 
     async def get_category(self, category_id: int) -> Optional[Category]:
-        return await self.db.query(Category).filter(Category.id == category_id).first()
+        return await self.db.get(Category, category_id)
 
     async def get_categories(
         self, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        with_stats: bool = False
     ) -> List[Category]:
-        return await self.db.query(Category).offset(skip).limit(limit).all()
+        """
+        List categories ordered by id
+
+        When after_id is given, seeks past it on the primary key instead of
+        using OFFSET, so deep pages cost the same as the first one. With
+        with_stats, each category's stored stats are loaded too.
+        """
+        query = select(Category).order_by(Category.id).limit(limit)
+        if with_stats:
+            query = query.options(selectinload(Category.stats))
+        if after_id is not None:
+            query = query.where(Category.id > after_id)
+        else:
+            query = query.offset(skip)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
 
     async def create_product(self, product: ProductCreate) -> Product:
         # Verify category exists
@@ -45,19 +241,240 @@ class ProductService:
             is_active=product.is_active
         )
         self.db.add(db_product)
+        await self.db.flush()
+        self._count(db_product.category_id, 1, db_product.is_active, db_product.quantity)
+        await self._flush_stats()
+        self._add_event(
+            "product.created", schemas.Product.model_validate(db_product)
+        )
         await self.db.commit()
-        await self.db.refresh(db_product)
         return db_product
 
+    async def import_products(
+        self,
+        rows: AsyncIterator[Tuple[int, Any]],
+        batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[List[int], List[BulkImportError]]]:
+        """
+        Insert products from a stream of (row number, data) pairs
+
+        Rows are validated one by one, then each batch checks categories and
+        SKUs with one query apiece and is inserted with a single executemany
+        and commit, together with one product.bulk_imported outbox event.
+        Yields (inserted ids, row errors) per batch; a row that
+        fails never aborts the import.
+        """
+        async for batch in batched(rows, batch_size):
+            errors: List[BulkImportError] = []
+            valid: List[Tuple[int, ProductCreate]] = []
+            for row, data in batch:
+                if isinstance(data, Exception):
+                    errors.append(BulkImportError(row=row, error=str(data)))
+                    continue
+                try:
+                    valid.append((row, ProductCreate.model_validate(data)))
+                except ValidationError as e:
+                    message = "; ".join(
+                        f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                        for err in e.errors()
+                    )
+                    errors.append(BulkImportError(row=row, error=message))
+
+            if not valid:
+                yield [], errors
+                continue
+
+            category_ids = {p.category_id for _, p in valid}
+            known_categories = set((await self.db.execute(
+                select(Category.id).where(Category.id.in_(category_ids))
+            )).scalars())
+            taken_skus = set((await self.db.execute(
+                select(Product.sku).where(Product.sku.in_({p.sku for _, p in valid}))
+            )).scalars())
+
+            values = []
+            for row, product in valid:
+                if product.category_id not in known_categories:
+                    errors.append(BulkImportError(row=row, error="Category not found"))
+                elif product.sku in taken_skus:
+                    errors.append(BulkImportError(row=row, error="SKU already exists"))
+                else:
+                    taken_skus.add(product.sku)
+                    values.append((row, product.model_dump()))
+            errors.sort(key=lambda e: e.row)
+
+            if not values:
+                yield [], errors
+                continue
+
+            try:
+                result = await self.db.execute(
+                    insert(Product).returning(Product.id),
+                    [data for _, data in values]
+                )
+                ids = list(result.scalars())
+                for _, data in values:
+                    self._count(data["category_id"], 1, data["is_active"], data["quantity"])
+                await self._flush_stats()
+                self._add_event("product.bulk_imported", {"ids": ids})
+                await self.db.commit()
+            except IntegrityError as e:
+                # Lost a race with a concurrent writer; report the whole chunk
+                await self.db.rollback()
+                errors.extend(
+                    BulkImportError(row=row, error=f"Insert failed: {e.orig}")
+                    for row, _ in values
+                )
+                ids = []
+            yield ids, errors
+
     async def get_product(self, product_id: int) -> Optional[Product]:
-        return await self.db.query(Product).filter(Product.id == product_id).first()
+        return await self.db.get(Product, product_id)
+
+    async def get_products_by_ids(self, product_ids: List[int]) -> List[Product]:
+        """Load several products with a single IN query"""
+        if not product_ids:
+            return []
+        result = await self.db.execute(
+            select(Product).where(Product.id.in_(product_ids))
+        )
+        return list(result.scalars().all())
+
+    async def count_products(self, filters: Optional[ProductFilter] = None) -> int:
+        result = await self.db.execute(
+            _filter_products(select(func.count(Product.id)), filters or ProductFilter())
+        )
+        return result.scalar_one()
+
+    async def search_products(self, q: str, limit: int = 20) -> List[Product]:
+        """
+        Search products by SKU, name and description, best matches first
+
+        Ranking: exact SKU, SKU prefix, name prefix, then name similarity.
+        On PostgreSQL name matching is fuzzy (pg_trgm) and served by trigram
+        indexes; other dialects fall back to case-insensitive substring
+        matching without typo tolerance.
+        """
+        rank = case(
+            (Product.sku == q, 4.0),
+            (Product.sku.startswith(q, autoescape=True), 3.0),
+            (Product.name.istartswith(q, autoescape=True), 2.0),
+            else_=0.0
+        )
+        conditions = [
+            Product.sku == q,
+            Product.sku.startswith(q, autoescape=True),
+            Product.name.icontains(q, autoescape=True),
+            Product.description.icontains(q, autoescape=True),
+        ]
+        if self.db.get_bind().dialect.name == "postgresql":
+            rank = rank + func.similarity(Product.name, q)
+            conditions.append(Product.name.op("%")(q))
+        else:
+            rank = rank + case(
+                (Product.name.icontains(q, autoescape=True), 1.0), else_=0.0
+            )
+
+        result = await self.db.execute(
+            select(Product)
+            .where(or_(*conditions))
+            .order_by(rank.desc(), Product.id)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
 
     async def get_products(
         self, 
         skip: int = 0, 
-        limit: int = 100
+        limit: int = 100,
+        after_id: Optional[int] = None,
+        filters: Optional[ProductFilter] = None,
+        after_value: Any = None
     ) -> List[Product]:
-        return await self.db.query(Product).offset(skip).limit(limit).all()
+        """
+        List products matching filters in the requested order
+
+        Results are always tie-broken by id. When after_id (plus after_value,
+        the sort column value of that row, for non-id sorts) is given, seeks
+        past that row with a row-value comparison instead of using OFFSET,
+        so deep pages cost the same as the first one.
+        """
+        filters = filters or ProductFilter()
+        column = PRODUCT_SORT_COLUMNS[filters.sort_field]
+        descending = filters.sort.startswith("-")
+
+        query = _filter_products(select(Product), filters).limit(limit)
+        if descending:
+            query = query.order_by(column.desc(), Product.id.desc())
+        else:
+            query = query.order_by(column, Product.id)
+
+        if after_id is not None:
+            if column is Product.id:
+                position, bound = Product.id, after_id
+            else:
+                position, bound = tuple_(column, Product.id), (after_value, after_id)
+            query = query.where(position < bound if descending else position > bound)
+        else:
+            query = query.offset(skip)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def get_first_pages(
+        self,
+        category_ids: List[int],
+        limit: int = 100
+    ) -> Dict[int, List[Product]]:
+        """
+        First page (ordered by id) of several categories in a single query
+
+        Ranks products within each category with a window function, so the
+        cost does not grow with the number of round trips.
+        """
+        pages: Dict[int, List[Product]] = {category_id: [] for category_id in category_ids}
+        if not category_ids:
+            return pages
+        position = func.row_number().over(
+            partition_by=Product.category_id, order_by=Product.id
+        ).label("position")
+        ranked = (
+            select(Product.id, position)
+            .where(Product.category_id.in_(category_ids))
+            .subquery()
+        )
+        result = await self.db.execute(
+            select(Product)
+            .join(ranked, Product.id == ranked.c.id)
+            .where(ranked.c.position <= limit)
+            .order_by(Product.category_id, Product.id)
+        )
+        for product in result.scalars():
+            pages[product.category_id].append(product)
+        return pages
+
+    async def stream_products(
+        self,
+        category_id: Optional[int] = None,
+        is_active: Optional[bool] = None,
+        fetch_size: int = 2000
+    ) -> AsyncIterator[Mapping[str, Any]]:
+        """
+        Stream product rows as plain mappings ordered by id
+
+        Uses a server-side cursor, so memory stays flat regardless of catalog
+        size, and skips ORM entity construction for every row.
+        """
+        query = select(*Product.__table__.columns).order_by(Product.id)
+        if category_id is not None:
+            query = query.where(Product.category_id == category_id)
+        if is_active is not None:
+            query = query.where(Product.is_active == is_active)
+
+        result = await self.db.stream(
+            query.execution_options(yield_per=fetch_size)
+        )
+        async for row in result.mappings():
+            yield row
 
     async def update_product(
         self, 
@@ -74,18 +491,238 @@ class ProductService:
             if not category:
                 raise HTTPException(status_code=404, detail="Category not found")
 
-        for key, value in product_data.dict().items():
+        before = (db_product.category_id, db_product.is_active, db_product.quantity, db_product.price)
+        for key, value in product_data.model_dump().items():
             setattr(db_product, key, value)
 
+        after = (db_product.category_id, db_product.is_active, db_product.quantity, db_product.price)
+        self._count_update(before, after)
+        await self.db.flush()
+        await self._flush_stats()
+        self._add_event(
+            "product.updated", schemas.Product.model_validate(db_product)
+        )
         await self.db.commit()
-        await self.db.refresh(db_product)
         return db_product
 
+    async def update_products(
+        self,
+        patches: List[ProductPatch],
+        batch_size: int = 1000
+    ) -> AsyncIterator[Tuple[List[int], List[BulkUpdateError]]]:
+        """
+        Apply partial updates to many products, chunk by chunk
+
+        Each chunk locks its products (found by id or SKU) with one SELECT
+        in id order, checks categories with one query, then writes one
+        set-based UPDATE per combination of changed columns: UPDATE ...
+        FROM (VALUES ...) on PostgreSQL, an executemany by primary key
+        elsewhere. One commit and one product.bulk_updated outbox event per
+        chunk. Yields (updated ids, errors) per chunk, errors pointing at
+        positions in patches; patches of the same product merge in order.
+        """
+        for start in range(0, len(patches), batch_size):
+            chunk = list(enumerate(patches[start:start + batch_size], start))
+            errors: List[BulkUpdateError] = []
+
+            rows = (await self.db.execute(
+                select(
+                    Product.id, Product.sku, Product.category_id,
+                    Product.is_active, Product.quantity, Product.price
+                )
+                .where(or_(
+                    Product.id.in_({p.id for _, p in chunk if p.id is not None}),
+                    Product.sku.in_({p.sku for _, p in chunk if p.sku is not None})
+                ))
+                .order_by(Product.id)
+                .with_for_update()
+            )).all()
+            by_id = {row.id: row for row in rows}
+            by_sku = {row.sku: row for row in rows}
+            category_ids = {p.category_id for _, p in chunk if p.category_id is not None}
+            known_categories = set((await self.db.execute(
+                select(Category.id).where(Category.id.in_(category_ids))
+            )).scalars()) if category_ids else set()
+
+            changes: Dict[int, Dict[str, Any]] = {}
+            applied: List[int] = []
+            for index, patch in chunk:
+                row = by_id.get(patch.id) if patch.id is not None else by_sku.get(patch.sku)
+                if row is None:
+                    errors.append(BulkUpdateError(index=index, error="Product not found"))
+                elif patch.category_id is not None and patch.category_id not in known_categories:
+                    errors.append(BulkUpdateError(index=index, error="Category not found"))
+                else:
+                    changes.setdefault(row.id, {}).update(patch.changes())
+                    applied.append(index)
+
+            if not changes:
+                yield [], errors
+                continue
+
+            ids = sorted(changes)
+            groups: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for product_id in ids:
+                row, changed = by_id[product_id], changes[product_id]
+                groups.setdefault(tuple(sorted(changed)), []).append({"id": product_id, **changed})
+                before = (row.category_id, row.is_active, row.quantity, row.price)
+                self._count_update(before, tuple(
+                    changed.get(name, value)
+                    for name, value in zip(("category_id", "is_active", "quantity", "price"), before)
+                ))
+            try:
+                for columns, params in groups.items():
+                    await self._update_many(columns, params)
+                await self._flush_stats()
+                self._add_event("product.bulk_updated", {
+                    "items": [{"id": product_id, **changes[product_id]} for product_id in ids]
+                })
+                await self.db.commit()
+            except IntegrityError as e:
+                # Lost a race with a concurrent writer; report the whole chunk
+                await self.db.rollback()
+                self._stats_deltas.clear()
+                self._repriced.clear()
+                errors.extend(
+                    BulkUpdateError(index=index, error=f"Update failed: {e.orig}")
+                    for index in applied
+                )
+                ids = []
+            errors.sort(key=lambda e: e.index)
+            yield ids, errors
+
+    async def _update_many(self, columns: Tuple[str, ...], params: List[Dict[str, Any]]):
+        """Set the same columns on many products, each to its own values"""
+        if self.db.get_bind().dialect.name != "postgresql":
+            # ORM bulk UPDATE by primary key: one executemany
+            await self.db.execute(update(Product), params)
+            return
+        names = ("id",) + columns
+        patch = values(
+            *(column(name, Product.__table__.c[name].type) for name in names),
+            name="patch"
+        ).data([tuple(p[name] for name in names) for p in params])
+        await self.db.execute(
+            update(Product)
+            .where(Product.id == patch.c.id)
+            .values({name: patch.c[name] for name in columns})
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _apply_stock(self, product_id: int, delta: int) -> Optional[Tuple[int, int]]:
+        """One conditional UPDATE; (new quantity, category), None when not applied"""
+        query = (
+            update(Product)
+            .where(Product.id == product_id)
+            .values(quantity=Product.quantity + delta)
+            .returning(Product.quantity, Product.category_id)
+            .execution_options(synchronize_session=False)
+        )
+        if delta < 0:
+            query = query.where(Product.quantity >= -delta)
+        row = (await self.db.execute(query)).one_or_none()
+        return tuple(row) if row else None
+
+    async def adjust_stock(self, product_id: int, deltas: List[int]) -> List[Optional[int]]:
+        """
+        Apply stock changes to one product with conditional atomic UPDATEs
+
+        Decrements only apply while enough stock is left (quantity >= n in
+        the WHERE clause), so concurrent buyers can neither oversell nor
+        lose updates, and the row is never read first. Several deltas are
+        applied as one UPDATE of their sum when it fits, increments counted
+        first; otherwise one by one. Returns the quantity after each delta,
+        None for rejected ones, and queues one product.stock_changed event.
+        """
+        # Increments first: then the deltas fit one by one iff their sum fits
+        order = sorted(range(len(deltas)), key=lambda i: deltas[i] < 0)
+        after: List[Optional[int]] = [None] * len(deltas)
+        net = sum(deltas)
+        category_id = None
+        combined = await self._apply_stock(product_id, net) if len(deltas) > 1 else None
+        if combined is not None:
+            running, category_id = combined[0] - net, combined[1]
+            for i in order:
+                running += deltas[i]
+                after[i] = running
+        else:
+            for i in order:
+                applied = await self._apply_stock(product_id, deltas[i])
+                if applied is not None:
+                    after[i], category_id = applied
+
+        applied = [i for i in order if after[i] is not None]
+        if not applied:
+            await self.db.rollback()
+            if not await self.get_product(product_id):
+                raise HTTPException(status_code=404, detail="Product not found")
+            return after
+
+        first, last = applied[0], applied[-1]
+        self._count_stock(category_id, after[first] - deltas[first], after[last])
+        await self._flush_stats()
+
+        self._add_event("product.stock_changed", {
+            "id": product_id,
+            "quantity": after[applied[-1]],
+            "delta": sum(deltas[i] for i in applied),
+        })
+        await self.db.commit()
+        return after
+
+    async def reserve_stock(self, items: Dict[int, int]) -> Dict[int, int]:
+        """
+        Take stock for a whole order, all or nothing
+
+        items maps product ids to the quantity to take. Rows are updated in
+        id order, so concurrent orders lock them in the same order and
+        cannot deadlock. Returns the new quantities; if any product is
+        missing or short, nothing is taken and 404 or 409 lists them.
+        """
+        levels: Dict[int, int] = {}
+        short: List[int] = []
+        for product_id in sorted(items):
+            applied = await self._apply_stock(product_id, -items[product_id])
+            if applied is None:
+                short.append(product_id)
+            else:
+                levels[product_id], category_id = applied
+                self._count_stock(category_id, applied[0] + items[product_id], applied[0])
+
+        if short:
+            await self.db.rollback()
+            self._stats_deltas.clear()
+            found = set((await self.db.execute(
+                select(Product.id).where(Product.id.in_(short))
+            )).scalars())
+            missing = [product_id for product_id in short if product_id not in found]
+            if missing:
+                raise HTTPException(status_code=404, detail={
+                    "message": "Products not found", "product_ids": missing
+                })
+            raise HTTPException(status_code=409, detail={
+                "message": "Insufficient stock", "product_ids": short
+            })
+
+        await self._flush_stats()
+        self._add_event("product.stock_reserved", {
+            "items": [
+                {"id": product_id, "quantity": items[product_id]}
+                for product_id in sorted(items)
+            ]
+        })
+        await self.db.commit()
+        return levels
+
     async def delete_product(self, product_id: int) -> bool:
         db_product = await self.get_product(product_id)
         if not db_product:
             raise HTTPException(status_code=404, detail="Product not found")
 
         await self.db.delete(db_product)
+        await self.db.flush()
+        self._count(db_product.category_id, -1, db_product.is_active, db_product.quantity)
+        await self._flush_stats()
+        self._add_event("product.deleted", {"id": product_id})
         await self.db.commit()
         return True
\ No newline at end of file
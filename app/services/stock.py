@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core import database
+from app.services.product import ProductService
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def _retrieve(future: asyncio.Future):
+    # A caller that went away never awaits its future; mark the error seen
+    if not future.cancelled():
+        future.exception()
+
+class StockAggregator:
+    """
+    Merges concurrent stock adjustments of one product into one transaction
+
+    Under flash-sale load every request for a hot SKU queues on the same row
+    lock. Adjustments arriving within the window of the first one are
+    applied together by ProductService.adjust_stock, usually as a single
+    UPDATE, and each caller still gets its own outcome. A batch is cut at
+    max_batch adjustments; later ones start the next batch.
+    """
+
+    def __init__(
+        self,
+        session_factory=None,
+        window: float = settings.STOCK_AGGREGATION_WINDOW_MS / 1000,
+        max_batch: int = settings.STOCK_AGGREGATION_MAX_BATCH
+    ):
+        self._session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[int, List[Tuple[int, asyncio.Future]]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def session_factory(self):
+        return self._session_factory or database.AsyncSessionLocal
+
+    async def adjust(self, product_id: int, delta: int) -> Optional[int]:
+        """Quantity after applying delta, None when there was not enough stock"""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_retrieve)
+        batch = self._pending.get(product_id)
+        if batch is None:
+            batch = self._pending[product_id] = []
+            task = asyncio.create_task(self._flush(product_id, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: self._release(product_id, batch))
+        batch.append((delta, future))
+        if len(batch) >= self.max_batch:
+            del self._pending[product_id]
+        # Shield so a caller going away does not fail the whole batch
+        return await asyncio.shield(future)
+
+    async def stop(self):
+        """Wait for the batches in flight, so no caller is left hanging"""
+        if self._tasks:
+            # Cancelling stop() cancels the flushes, which cancel their callers
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _flush(self, product_id: int, batch: List[Tuple[int, asyncio.Future]]):
+        await asyncio.sleep(self.window)
+        if self._pending.get(product_id) is batch:
+            del self._pending[product_id]
+        try:
+            async with self.session_factory() as session:
+                results = await ProductService(session).adjust_stock(
+                    product_id, [delta for delta, _ in batch]
+                )
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning(f"Stock batch of {len(batch)} for product {product_id} failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def _release(self, product_id: int, batch: List[Tuple[int, asyncio.Future]]):
+        """Cancel what a cancelled flush left unresolved, so no caller waits forever"""
+        if self._pending.get(product_id) is batch:
+            del self._pending[product_id]
+        for _, future in batch:
+            if not future.done():
+                future.cancel()
+
+stock_aggregator = StockAggregator()
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core import database
+from app.schemas.product import CategoryWithStats, Product, ProductFilter
+from app.services.product import ProductService
+from app.utils.cache_keys import page_entry, page_key, product_entry, product_keys
+from app.utils.redis_cache import cache
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class CacheWarmer:
+    """
+    Preloads the hottest cache entries so a cold cache does not hit Postgres
+
+    Warms the newest active products, the first categories page, the first
+    unfiltered products page and the first products page of each category.
+    Entries are built exactly like the routes build them, loaded with bulk
+    queries and written with pipelined SETs. Category pages are loaded in
+    chunks, at most WARMUP_CONCURRENCY at a time, each in its own session;
+    the whole run is capped at WARMUP_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self, session_factory=None):
+        self._session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+        self.state = "idle"
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.duration: Optional[float] = None
+        self.entries = 0
+        self.error: Optional[str] = None
+
+    @property
+    def session_factory(self):
+        return self._session_factory or database.AsyncReadSessionLocal
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def ready(self) -> bool:
+        """Whether warm-up is over, successful or not, or disabled"""
+        return not settings.WARMUP_ENABLED or self.state not in ("idle", "running")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "entries": self.entries,
+            "error": self.error,
+        }
+
+    def start(self) -> bool:
+        """Run warm-up in the background; returns False if already running"""
+        if self.running:
+            return False
+        self.state = "running"
+        self.started_at = datetime.now(timezone.utc)
+        self._task = asyncio.create_task(self.run())
+        return True
+
+    async def stop(self):
+        if self.running:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    async def run(self):
+        self.state = "running"
+        self.started_at = datetime.now(timezone.utc)
+        self.finished_at = self.duration = self.error = None
+        self.entries = 0
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(self._warm(), settings.WARMUP_TIMEOUT_SECONDS)
+            self.state = "done"
+        except asyncio.TimeoutError:
+            # Whatever was written before the deadline stays cached
+            self.state = "timed_out"
+            logger.warning(
+                f"Cache warm-up stopped after {settings.WARMUP_TIMEOUT_SECONDS}s"
+            )
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Cache warm-up failed: {e}")
+        self.duration = time.monotonic() - started
+        self.finished_at = datetime.now(timezone.utc)
+        logger.info(
+            f"Cache warm-up {self.state}: {self.entries} entries in {self.duration:.2f}s"
+        )
+
+    async def _store(self, entries: Dict[str, bytes], nx: bool = False):
+        await cache.set_many(entries, raw=True, nx=nx)
+        self.entries += len(entries)
+
+    async def _store_products(self, entries: Dict[str, bytes]):
+        """
+        Store single-product entries without overwriting fresher ones
+
+        Product keys are deleted on writes rather than bumped, so rows read
+        before a concurrent update would otherwise outlive it. Entries are
+        dropped while product writes are recent and never replace a value
+        filled meanwhile.
+        """
+        if not entries or await cache.written_recently(next(iter(entries))):
+            return
+        await self._store(entries, nx=True)
+
+    async def _warm(self):
+        limit = settings.WARMUP_PAGE_LIMIT
+        # Generations first, as routes do: rows read after a concurrent write
+        # bumped them must not be stored under the new generation
+        product_generation = await cache.generation("product")
+        categories_key = await page_key("categories", 0, limit, None)
+        products_key = await page_key("products", 0, limit, None, ProductFilter().cache_suffix())
+        async with self.session_factory() as session:
+            service = ProductService(session)
+            categories = await service.get_categories(
+                limit=max(settings.WARMUP_MAX_CATEGORIES, limit),
+                with_stats=True
+            )
+            products = await service.get_products(
+                limit=limit,
+                filters=ProductFilter()
+            )
+            newest = await service.get_products(
+                limit=settings.WARMUP_TOP_PRODUCTS,
+                filters=ProductFilter(is_active=True, sort="-created_at")
+            )
+
+            keys = await product_keys([p.id for p in newest], product_generation)
+            await self._store_products(
+                {keys[p.id]: product_entry(p, keys[p.id]) for p in newest}
+            )
+            await self._store({
+                categories_key: page_entry(categories[:limit], List[CategoryWithStats], limit),
+                products_key: page_entry(products, List[Product], limit),
+            })
+
+        category_ids = [c.id for c in categories[:settings.WARMUP_MAX_CATEGORIES]]
+        size = settings.WARMUP_CATEGORY_BATCH_SIZE
+        semaphore = asyncio.Semaphore(settings.WARMUP_CONCURRENCY)
+        await asyncio.gather(*(
+            self._warm_category_pages(category_ids[i:i + size], semaphore)
+            for i in range(0, len(category_ids), size)
+        ))
+
+    async def _warm_category_pages(
+        self,
+        category_ids: List[int],
+        semaphore: asyncio.Semaphore
+    ):
+        limit = settings.WARMUP_PAGE_LIMIT
+        async with semaphore:
+            generation = await cache.generation("products")
+            async with self.session_factory() as session:
+                pages = await ProductService(session).get_first_pages(category_ids, limit)
+            entries = {}
+            for category_id, items in pages.items():
+                suffix = ProductFilter(category_id=category_id).cache_suffix()
+                key = await page_key("products", 0, limit, None, suffix, generation)
+                entries[key] = page_entry(items, List[Product], limit)
+            await self._store(entries)
+
+# Create a global warmer instance
+cache_warmer = CacheWarmer()
@@ -0,0 +1,70 @@
+from typing import Any, Dict, List, Optional
+
+from app.schemas.product import Product
+from app.utils.pagination import next_cursor
+from app.utils.redis_cache import cache
+from app.utils.response_cache import body_etag, encode_body, make_etag, pack
+
+
+async def page_key(
+    namespace: str,
+    skip: int,
+    limit: int,
+    after: Optional[str],
+    suffix: str = "",
+    generation: Optional[int] = None
+) -> str:
+    """
+    Key of a cached listing page under the namespace's generation
+
+    Pass generation to build many keys without reading it for each one.
+    While the generation is unknown the key is marked unversioned and
+    bypasses the cache.
+    """
+    position = f"after={after}" if after is not None else f"skip={skip}"
+    prefix = f"{suffix}:" if suffix else ""
+    if generation is None:
+        generation = await cache.generation(namespace)
+    return f"{namespace}:{cache.generation_tag(generation)}:{prefix}{position}:limit={limit}"
+
+
+async def product_keys(
+    product_ids: List[int],
+    generation: Optional[int] = None
+) -> Dict[int, str]:
+    """Keys of cached single-product responses, see page_key for generation"""
+    if generation is None:
+        generation = await cache.generation("product")
+    tag = cache.generation_tag(generation)
+    return {product_id: f"product:{tag}:{product_id}" for product_id in product_ids}
+
+
+def page_entry(
+    items: List[Any],
+    type_: Any,
+    limit: int,
+    sort_field: str = "id"
+) -> bytes:
+    """
+    Cache entry for a listing page: encoded body plus its cursor header
+
+    The ETag hashes the body: stock changes that do not cross zero leave
+    page keys alone, so the key cannot tell two versions of a page apart.
+    """
+    body = encode_body(items, type_)
+    headers = {"ETag": body_etag(body)}
+    cursor = next_cursor(items, limit, sort_field)
+    if cursor:
+        headers["X-Next-Cursor"] = cursor
+    return pack(body, headers)
+
+
+def product_entry(product: Any, key: str) -> bytes:
+    """
+    Cache entry for one product, tagged with an ETag of its version
+
+    The key carries the product generation and updated_at changes on every
+    write, so the tag changes whenever the body can.
+    """
+    etag = make_etag(key, product.created_at, product.updated_at)
+    return pack(encode_body(product, Product), {"ETag": etag})
@@ -0,0 +1,64 @@
+import logging
+import time
+
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while
+
+    After failure_threshold consecutive failures the breaker opens and
+    allow() turns calls away without waiting on the dependency. Once
+    reset_timeout has passed, one trial call is let through (half-open):
+    success closes the breaker, failure opens it again. A trial that never
+    reports back is replaced by another after reset_timeout.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 5.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._set_state(CLOSED)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Circuit breaker {self.name} is now {state}")
+        self.state = state
+        metrics.child(metrics.CIRCUIT_BREAKER_STATE, self.name).set(_STATE_VALUES[state])
+
+    @property
+    def closed(self) -> bool:
+        return self.state == CLOSED
+
+    def allow(self) -> bool:
+        """Whether a call may go through now"""
+        if self.state == CLOSED:
+            return True
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            # Restart the clock so only this caller probes the dependency
+            self.opened_at = time.monotonic()
+            self._set_state(HALF_OPEN)
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
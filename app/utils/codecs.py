@@ -0,0 +1,151 @@
+import gzip
+import logging
+import struct
+from typing import Any, Optional, Tuple
+
+from app.utils.serialization import dumps, loads
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional codec
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional compression
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Every entry starts with [FORMAT_VERSION, codec, compression]. Entries
+# with an unknown header read as a miss, so codecs can change during a
+# rolling deploy without old and new replicas misreading each other.
+FORMAT_VERSION = 1
+HEADER_SIZE = 3
+
+CODEC_RAW = 0
+CODEC_JSON = 1
+CODEC_MSGPACK = 2
+
+COMPRESSION_NONE = 0
+COMPRESSION_GZIP = 1
+COMPRESSION_ZSTD = 2
+
+# Entries refreshed in the background are prefixed with STAMP followed by
+# (fresh until, seconds the load took) as two big-endian doubles
+STAMP = 0xFE
+_STAMP_FORMAT = struct.Struct("!dd")
+
+CODECS = {"raw": CODEC_RAW, "json": CODEC_JSON, "msgpack": CODEC_MSGPACK}
+COMPRESSIONS = {"none": COMPRESSION_NONE, "gzip": COMPRESSION_GZIP, "zstd": COMPRESSION_ZSTD}
+
+
+class CodecError(ValueError):
+    """Entry cannot be decoded by this process"""
+
+
+def resolve_codec(name: str) -> int:
+    codec = CODECS[name]
+    if codec == CODEC_MSGPACK and msgpack is None:
+        logger.warning("msgpack is not installed, caching with JSON instead")
+        return CODEC_JSON
+    return codec
+
+
+def resolve_compression(name: str) -> int:
+    compression = COMPRESSIONS[name]
+    if compression == COMPRESSION_ZSTD and zstandard is None:
+        logger.warning("zstandard is not installed, compressing with gzip instead")
+        return COMPRESSION_GZIP
+    return compression
+
+
+def compress(data: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_GZIP:
+        return gzip.compress(data, compresslevel=5, mtime=0)
+    if compression == COMPRESSION_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def decompress(data: bytes, compression: int) -> bytes:
+    if compression == COMPRESSION_GZIP:
+        return gzip.decompress(data)
+    if compression == COMPRESSION_ZSTD and zstandard is not None:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == COMPRESSION_NONE:
+        return data
+    raise CodecError(f"Unsupported compression {compression}")
+
+
+def encode(
+    value: Any,
+    codec: int = CODEC_JSON,
+    compression: int = COMPRESSION_NONE,
+    min_compress_size: int = 1024
+) -> bytes:
+    """
+    Serialize value into a version-tagged cache entry
+
+    CODEC_RAW stores bytes as given. The payload is compressed only when it
+    is at least min_compress_size bytes and compression actually shrinks it.
+    """
+    if codec == CODEC_RAW:
+        payload = value if isinstance(value, bytes) else str(value).encode()
+    elif codec == CODEC_MSGPACK:
+        payload = msgpack.packb(value, use_bin_type=True)
+    else:
+        payload = dumps(value)
+
+    used = COMPRESSION_NONE
+    if compression != COMPRESSION_NONE and len(payload) >= min_compress_size:
+        compressed = compress(payload, compression)
+        if len(compressed) < len(payload):
+            payload, used = compressed, compression
+    return bytes((FORMAT_VERSION, codec, used)) + payload
+
+
+def decode(entry: Optional[bytes]) -> Any:
+    """
+    Parse an entry produced by encode
+
+    :raises CodecError: if the entry has an unknown header or codec
+    """
+    if isinstance(entry, str):
+        entry = entry.encode()
+    if not entry or len(entry) < HEADER_SIZE or entry[0] != FORMAT_VERSION:
+        raise CodecError("Unknown cache entry format")
+    codec, compression = entry[1], entry[2]
+    try:
+        payload = decompress(entry[HEADER_SIZE:], compression)
+        if codec == CODEC_RAW:
+            return payload
+        if codec == CODEC_JSON:
+            return loads(payload)
+        if codec == CODEC_MSGPACK and msgpack is not None:
+            return msgpack.unpackb(payload, raw=False)
+    except CodecError:
+        raise
+    except Exception as e:
+        raise CodecError(f"Corrupt cache entry: {e}")
+    raise CodecError(f"Unsupported codec {codec}")
+
+
+def stamp(entry: bytes, fresh_until: float, compute_time: float) -> bytes:
+    """Prefix an encoded entry with its soft expiry and load duration"""
+    return bytes((STAMP,)) + _STAMP_FORMAT.pack(fresh_until, compute_time) + entry
+
+
+def unstamp(entry: bytes) -> Tuple[bytes, Optional[float], float]:
+    """
+    Split a possibly stamped entry into (entry, fresh until, load duration)
+
+    Unstamped entries are fresh until Redis expires them, reported as None.
+    """
+    if entry and entry[0] == STAMP:
+        end = 1 + _STAMP_FORMAT.size
+        if len(entry) < end:
+            raise CodecError("Truncated cache entry stamp")
+        fresh_until, compute_time = _STAMP_FORMAT.unpack(entry[1:end])
+        return entry[end:], fresh_until, compute_time
+    return entry, None, 0.0
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import aio_pika
+
+from app.utils.rabbitmq import rabbitmq
+from app.utils.serialization import loads
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# (routing key, event data) as published by RabbitMQ._message
+Event = Tuple[str, Any]
+Handler = Callable[[List[Event]], Awaitable[None]]
+
+def _delivery(message: aio_pika.abc.AbstractIncomingMessage) -> Tuple[Any, int]:
+    return message.channel, message.delivery_tag
+
+class BatchConsumer:
+    """
+    Consumes a queue in micro-batches with bounded concurrency
+
+    Up to prefetch_count messages are pushed ahead by the broker. They are
+    grouped into batches of batch_size, or whatever arrived within
+    batch_wait of the first one, and at most concurrency batches are
+    handled at once. Each handled batch is acknowledged with a single
+    multiple-ack up to the newest delivery whose predecessors are all
+    settled, so batches finishing out of order never ack unhandled
+    messages. A failed batch is requeued once, then rejected.
+
+    Delivery tags are per channel and restart when the connection recovers
+    with a new one, so acks are tracked by (channel, tag); deliveries of a
+    closed channel are dropped, the broker redelivers them.
+    """
+
+    def __init__(
+        self,
+        routing_keys: List[str],
+        handler: Handler,
+        queue_name: Optional[str] = None,
+        prefetch_count: int = settings.CONSUMER_PREFETCH_COUNT,
+        concurrency: int = settings.CONSUMER_CONCURRENCY,
+        batch_size: int = settings.CONSUMER_BATCH_SIZE,
+        batch_wait: float = settings.CONSUMER_BATCH_WAIT_MS / 1000,
+        broker=None
+    ):
+        self.routing_keys = routing_keys
+        self.handler = handler
+        self.queue_name = queue_name
+        self.prefetch_count = prefetch_count
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self._broker = broker
+        self._limit = asyncio.Semaphore(concurrency)
+        self._queue: Optional[aio_pika.abc.AbstractQueue] = None
+        self._consumer_tag: Optional[str] = None
+        self._buffer: List[aio_pika.abc.AbstractIncomingMessage] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Deliveries in arrival order until acked, and the settled ones by
+        # (channel, delivery tag)
+        self._unacked: Deque[aio_pika.abc.AbstractIncomingMessage] = deque()
+        self._settled: Dict[Tuple[Any, int], bool] = {}
+        # Acks of overlapping ranges must reach the broker in order
+        self._ack_lock = asyncio.Lock()
+        self.consumed = 0
+        self.failed = 0
+        self.batches = 0
+
+    @property
+    def broker(self):
+        return self._broker or rabbitmq
+
+    async def start(self):
+        if not self._queue:
+            self._queue, self._consumer_tag = await self.broker.subscribe(
+                self.routing_keys,
+                self._on_message,
+                queue_name=self.queue_name,
+                prefetch_count=self.prefetch_count
+            )
+
+    async def stop(self):
+        """Stop consuming, then finish and ack the batches already received"""
+        if not self._queue:
+            return
+        try:
+            await self._queue.cancel(self._consumer_tag)
+        except Exception as e:
+            logger.warning(f"Failed to cancel consumer {self._consumer_tag}: {e}")
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._queue.channel.close()
+        self._queue = None
+        self._consumer_tag = None
+
+    async def _on_message(self, message: aio_pika.abc.AbstractIncomingMessage):
+        self._unacked.append(message)
+        self._buffer.append(message)
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_wait, self.flush)
+
+    def flush(self):
+        """Hand the buffered messages to the handler as one batch"""
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        task = asyncio.create_task(self._handle(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, batch: List[aio_pika.abc.AbstractIncomingMessage]):
+        events: List[Event] = []
+        handled: List[aio_pika.abc.AbstractIncomingMessage] = []
+        for message in batch:
+            try:
+                events.append((message.routing_key, loads(message.body).get("data")))
+                handled.append(message)
+            except (ValueError, AttributeError) as e:
+                logger.warning(f"Rejecting malformed message {message.delivery_tag}: {e}")
+                await self._settle([message], ok=False, requeue=False)
+
+        if not handled:
+            return
+        async with self._limit:
+            try:
+                await self.handler(events)
+            except Exception as e:
+                self.failed += len(handled)
+                logger.error(f"Failed to handle a batch of {len(handled)} events: {e}")
+                await self._settle(handled, ok=False)
+                return
+        self.consumed += len(handled)
+        self.batches += 1
+        await self._settle(handled, ok=True)
+
+    async def _settle(
+        self,
+        messages: List[aio_pika.abc.AbstractIncomingMessage],
+        ok: bool,
+        requeue: Optional[bool] = None
+    ):
+        async with self._ack_lock:
+            # Deliveries of a closed channel cannot be settled any more
+            messages = [m for m in messages if not m.channel.is_closed]
+            if not ok:
+                for message in messages:
+                    # Redelivered messages failed before: drop rather than loop
+                    await message.nack(
+                        requeue=not message.redelivered if requeue is None else requeue
+                    )
+            for message in messages:
+                self._settled[_delivery(message)] = ok
+
+            # Ack the longest settled prefix at once, one multiple-ack per
+            # channel; nacked ones are already gone
+            newest = None
+            while self._unacked:
+                message = self._unacked[0]
+                if message.channel.is_closed:
+                    # Gone with its channel, the broker redelivers it
+                    self._unacked.popleft()
+                    self._settled.pop(_delivery(message), None)
+                    continue
+                if _delivery(message) not in self._settled:
+                    break
+                if newest is not None and message.channel is not newest.channel:
+                    await newest.ack(multiple=True)
+                    newest = None
+                self._unacked.popleft()
+                if self._settled.pop(_delivery(message)):
+                    newest = message
+            if newest is not None:
+                await newest.ack(multiple=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Consumer counters for monitoring"""
+        return {
+            "queue": self.queue_name,
+            "consumed": self.consumed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "unacked": len(self._unacked),
+        }
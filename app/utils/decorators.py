@@ -1,10 +1,14 @@
 from functools import wraps
-from app.utils.redis_cache import cache
+from app.utils.redis_cache import CachePolicy, cache
 
-def cached(key_prefix: str, expire: int = None):
+def cached(key_prefix: str, expire: int = None, policy: CachePolicy = None):
     """
     Decorator for caching function results
     
+    Freshness follows policy, else expire, else the settings of the key
+    family (see policy_for). Stale values are refreshed by calling func
+    again in the background with the same arguments.
+    
     Usage:
     @cached("product:{id}")
     async def get_product(id: int):
@@ -16,17 +20,12 @@ def cached(key_prefix: str, expire: int = None):
             # Generate cache key
             key = key_prefix.format(**kwargs)
             
-            # Try to get from cache
-            cached_value = await cache.get(key)
-            if cached_value is not None:
-                return cached_value
-            
-            # If not in cache, execute function
-            result = await func(*args, **kwargs)
-            
-            # Store in cache
-            await cache.set(key, result, expire=expire)
-            
-            return result
+            # Concurrent misses for the same key share one call of func
+            return await cache.get_or_set(
+                key,
+                lambda: func(*args, **kwargs),
+                expire=expire,
+                policy=policy
+            )
         return wrapper
     return decorator
\ No newline at end of file
@@ -0,0 +1,48 @@
+import base64
+from typing import Any, Dict, List, Mapping, Optional
+
+from app.utils.serialization import dumps, loads
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Encode keyset position into an opaque URL-safe cursor"""
+    raw = dumps(dict(sorted(values.items())))
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode cursor produced by encode_cursor
+
+    :raises ValueError: if cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor: expected an object")
+    return values
+
+
+def next_cursor(
+    items: List[Any],
+    limit: int,
+    sort_key: Optional[str] = None
+) -> Optional[str]:
+    """
+    Build cursor pointing after the last item of a full page
+
+    Items may be mappings or objects such as ORM rows. For listings sorted
+    by something other than id, pass the sort field so the cursor carries
+    (value, id) for a row-value seek.
+    """
+    if not items or len(items) < limit:
+        return None
+    last = items[-1]
+    get = last.get if isinstance(last, Mapping) else lambda name: getattr(last, name)
+    values = {"id": get("id")}
+    if sort_key and sort_key != "id":
+        values["v"] = get(sort_key)
+    return encode_cursor(values)
@@ -1,6 +1,11 @@
-import json
-from typing import Any, Optional
+import asyncio
+import itertools
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
 import aio_pika
+from app.utils import metrics
+from app.utils.serialization import dumps
 from config.settings import settings
 import logging
 
@@ -16,12 +21,35 @@ class RabbitMQ:
         self._channel: Optional[aio_pika.Channel] = None
         self.exchange_name = "product_events"
         self._exchange: Optional[aio_pika.Exchange] = None
+        # Publisher channels with confirms enabled, used round-robin
+        self._pool: List[aio_pika.Exchange] = []
+        self._next = itertools.count()
+        self._in_flight_limit = asyncio.Semaphore(settings.RABBITMQ_MAX_IN_FLIGHT)
+        self._reconnect: Optional[asyncio.Task] = None
+        # connect() is called by publishers and the reconnect loop alike
+        self._connect_lock = asyncio.Lock()
+        self.in_flight = 0
+        self.published = 0
+        self.failed = 0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
 
     async def connect(self):
-        """Initialize RabbitMQ connection"""
+        """
+        Initialize RabbitMQ connection
+
+        Concurrent callers wait for one attempt instead of each opening a
+        connection of their own.
+        """
+        async with self._connect_lock:
+            await self._connect()
+
+    async def _connect(self):
         if not self._connection:
             try:
-                self._connection = await aio_pika.connect_robust(self.connection_url)
+                self._connection = await aio_pika.connect_robust(
+                    self.connection_url, timeout=settings.RABBITMQ_CONNECT_TIMEOUT
+                )
                 self._channel = await self._connection.channel()
                 
                 # Declare exchange
@@ -30,21 +58,117 @@ class RabbitMQ:
                     aio_pika.ExchangeType.TOPIC,
                     durable=True
                 )
+
+                self._pool = [self._exchange]
+                for _ in range(settings.RABBITMQ_CHANNEL_POOL_SIZE - 1):
+                    channel = await self._connection.channel(publisher_confirms=True)
+                    self._pool.append(
+                        await channel.get_exchange(self.exchange_name, ensure=False)
+                    )
                 
                 logger.info("Successfully connected to RabbitMQ")
             except Exception as e:
                 logger.error(f"Failed to connect to RabbitMQ: {e}")
+                if self._connection:
+                    await self._connection.close()
+                self._connection = self._channel = self._exchange = None
+                self._pool = []
                 raise
 
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and self._exchange is not None
+
+    def reconnect_in_background(self, on_connected: Optional[Callable[[], Awaitable[Any]]] = None):
+        """
+        Keep retrying connect() with capped exponential backoff
+
+        For a broker that is down at startup; once connected, aio_pika's
+        robust connection handles later outages itself. on_connected runs
+        after the first successful connect, e.g. to start consumers.
+        """
+        if self._reconnect is None or self._reconnect.done():
+            self._reconnect = asyncio.create_task(self._reconnect_loop(on_connected))
+
+    async def _reconnect_loop(self, on_connected):
+        delay = 1.0
+        while not self.connected:
+            await asyncio.sleep(delay)
+            try:
+                await self.connect()
+            except Exception:
+                delay = min(delay * 2, settings.RABBITMQ_RECONNECT_MAX_SECONDS)
+        if on_connected:
+            await on_connected()
+
     async def close(self):
         """Close RabbitMQ connection"""
+        if self._reconnect:
+            self._reconnect.cancel()
+            self._reconnect = None
         if self._connection:
             await self._connection.close()
             self._connection = None
             self._channel = None
             self._exchange = None
+            self._pool = []
             logger.info("RabbitMQ connection closed")
 
+    def _exchange_for(self, partition: Any = None) -> aio_pika.Exchange:
+        """Pick a publisher channel; a partition key pins related events to one"""
+        if partition is None:
+            index = next(self._next)
+        else:
+            index = hash(partition)
+        return self._pool[index % len(self._pool)]
+
+    @staticmethod
+    def _message(routing_key: str, data: Any) -> aio_pika.Message:
+        return aio_pika.Message(
+            body=dumps({
+                "event": routing_key,
+                "data": data,
+                "timestamp": datetime.now(timezone.utc).isoformat()
+            }),
+            content_type="application/json",
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+        )
+
+    async def _publish(
+        self,
+        routing_key: str,
+        data: Any,
+        partition: Any = None
+    ):
+        """Publish one message and wait for the broker confirm"""
+        message = self._message(routing_key, data)
+        async with self._in_flight_limit:
+            self.in_flight += 1
+            metrics.RABBITMQ_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            try:
+                await self._exchange_for(partition).publish(
+                    message,
+                    routing_key=routing_key,
+                    timeout=settings.RABBITMQ_PUBLISH_TIMEOUT
+                )
+            except Exception:
+                self.failed += 1
+                metrics.child(metrics.RABBITMQ_PUBLISH_FAILURES, routing_key).inc()
+                raise
+            finally:
+                self.in_flight -= 1
+                metrics.RABBITMQ_IN_FLIGHT.dec()
+            self.last_latency = time.perf_counter() - started
+            self.total_latency += self.last_latency
+            self.published += 1
+            metrics.child(metrics.RABBITMQ_PUBLISH_LATENCY, routing_key).observe(self.last_latency)
+
+        if settings.RABBITMQ_LOG_PAYLOADS:
+            logger.info(f"Published event {routing_key} with data: {data}")
+        else:
+            logger.debug(f"Published event {routing_key}")
+
     async def publish_event(self, routing_key: str, data: Any):
         """
         Publish event to RabbitMQ
@@ -56,45 +180,93 @@ class RabbitMQ:
             await self.connect()
 
         try:
-            message = aio_pika.Message(
-                body=json.dumps({
-                    "event": routing_key,
-                    "data": data,
-                    "timestamp": settings.get_current_timestamp()
-                }).encode(),
-                delivery_mode=aio_pika.DeliveryMode.PERSISTENT
-            )
-
-            await self._exchange.publish(
-                message,
-                routing_key=routing_key
-            )
-            
-            logger.info(f"Published event {routing_key} with data: {data}")
+            await self._publish(routing_key, data)
         except Exception as e:
             logger.error(f"Failed to publish event {routing_key}: {e}")
             raise
 
-    async def subscribe(self, routing_key: str, callback):
+    async def publish_many(
+        self,
+        events: Iterable[Tuple[str, Any, Any]]
+    ) -> List[Optional[Exception]]:
+        """
+        Publish many events concurrently across the channel pool
+
+        Each event is a (routing_key, data, partition) tuple; events sharing
+        a partition key go through the same channel in order. Publishes are
+        pipelined, so the broker acknowledges them in batches instead of one
+        round trip each, and a failed event does not stop later ones of its
+        partition: callers needing strict order must resend those after it
+        (see OutboxRelay). Returns one entry per event: None when confirmed,
+        otherwise the exception.
+        """
+        if not self._connection or not self._exchange:
+            await self.connect()
+
+        results = await asyncio.gather(
+            *(self._publish(*event) for event in events),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            logger.error(
+                f"Failed to publish {len(errors)} of {len(results)} events: {errors[0]}"
+            )
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        """Publisher counters for monitoring"""
+        return {
+            "channels": len(self._pool),
+            "in_flight": self.in_flight,
+            "published": self.published,
+            "failed": self.failed,
+            "last_latency": self.last_latency,
+            "avg_latency": self.total_latency / self.published if self.published else 0.0,
+        }
+
+    async def subscribe(
+        self,
+        routing_key: Union[str, Iterable[str]],
+        callback,
+        queue_name: Optional[str] = None,
+        prefetch_count: int = 0
+    ) -> Tuple[aio_pika.abc.AbstractQueue, str]:
         """
         Subscribe to events from RabbitMQ
         
-        :param routing_key: Event type to subscribe to (e.g., "product.*")
+        :param routing_key: Event type(s) to subscribe to (e.g., "product.*")
         :param callback: Async function to handle received messages
+        :param queue_name: Durable queue shared by every replica; without
+            one, each subscriber gets its own exclusive queue
+        :param prefetch_count: Unacknowledged messages the broker may push
+            ahead, 0 for unlimited
+        :return: The queue and the consumer tag to cancel it with
         """
         if not self._connection:
             await self.connect()
 
+        # A channel of its own, so the prefetch limit applies to this consumer only
+        channel = await self._connection.channel()
+        if prefetch_count:
+            await channel.set_qos(prefetch_count=prefetch_count)
+
         # Declare queue
-        queue = await self._channel.declare_queue(exclusive=True)
+        if queue_name:
+            queue = await channel.declare_queue(queue_name, durable=True)
+        else:
+            queue = await channel.declare_queue(exclusive=True)
         
-        # Bind queue to exchange with routing key
-        await queue.bind(self._exchange, routing_key)
+        # Bind queue to exchange with routing keys
+        routing_keys = [routing_key] if isinstance(routing_key, str) else list(routing_key)
+        for key in routing_keys:
+            await queue.bind(self.exchange_name, key)
         
         # Start consuming messages
-        await queue.consume(callback)
+        consumer_tag = await queue.consume(callback)
         
-        logger.info(f"Subscribed to events with routing key: {routing_key}")
+        logger.info(f"Subscribed to events with routing keys: {', '.join(routing_keys)}")
+        return queue, consumer_tag
 
 # Create a global RabbitMQ instance
 rabbitmq = RabbitMQ()
@@ -102,4 +274,10 @@ rabbitmq = RabbitMQ()
 # Helper function for publishing events
 async def publish_event(routing_key: str, data: Any):
     """Helper function to publish events to RabbitMQ"""
-    await rabbitmq.publish_event(routing_key, data)
\ No newline at end of file
+    await rabbitmq.publish_event(routing_key, data)
+
+async def publish_events(
+    events: Iterable[Tuple[str, Any, Any]]
+) -> List[Optional[Exception]]:
+    """Helper function to publish a batch of events to RabbitMQ"""
+    return await rabbitmq.publish_many(events)
\ No newline at end of file
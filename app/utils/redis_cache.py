@@ -1,84 +1,799 @@
-from typing import Any, Optional
+from typing import Any, Awaitable, Callable, Coroutine, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import asyncio
+import fnmatch
 import json
+import logging
+import math
+import random
+import time
+import uuid
 from redis.asyncio import Redis
+from redis.asyncio.retry import Retry
+from redis.backoff import NoBackoff
+from redis.exceptions import RedisError
 from fastapi.encoders import jsonable_encoder
+from app.utils import codecs, metrics
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.singleflight import SingleFlight
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class CacheUnavailable(Exception):
+    """Redis is failing or its circuit breaker is open"""
+
+# Generation fragment of keys built while Redis was unavailable; such keys
+# are never read from or written to the cache
+UNKNOWN_GENERATION = "g?"
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Freshness rules for cached values
+
+    Values are fresh for ttl seconds, spread by +/- jitter (a fraction of
+    ttl) so keys written together do not expire together. They are then
+    served stale for up to stale more seconds while one background task
+    reloads them. With beta > 0, reads may also refresh a value early: the
+    closer it is to going stale and the slower it was to load, the likelier
+    (probabilistic early expiration, "XFetch").
+    """
+    ttl: int
+    stale: int = 0
+    jitter: float = 0.0
+    beta: float = 0.0
+
+    def fresh_for(self) -> float:
+        return self.ttl * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def should_refresh(self, fresh_until: float, compute_time: float) -> bool:
+        now = time.time()
+        if now >= fresh_until:
+            return True
+        if self.beta <= 0 or compute_time <= 0:
+            return False
+        # -log(u) is exponentially distributed, so refreshes spread out
+        # ahead of fresh_until instead of all firing at once
+        return now - compute_time * self.beta * math.log(1 - random.random()) >= fresh_until
+
+def policy_for(key: str, expire: Optional[int] = None) -> CachePolicy:
+    """
+    Policy for a key: an explicit expire, else the settings of its family
+
+    The family is the key prefix before the first colon, configured with
+    <FAMILY>_CACHE_TTL_SECONDS and <FAMILY>_CACHE_STALE_SECONDS. Other keys
+    fall back to CACHE_EXPIRE_IN_SECONDS without a stale window.
+    """
+    ttl, stale = expire, 0
+    if ttl is None:
+        family = key.split(":", 1)[0].upper()
+        ttl = getattr(settings, f"{family}_CACHE_TTL_SECONDS", None)
+        stale = getattr(settings, f"{family}_CACHE_STALE_SECONDS", 0)
+    if ttl is None:
+        ttl = settings.CACHE_EXPIRE_IN_SECONDS
+    return CachePolicy(
+        ttl=ttl,
+        stale=stale,
+        jitter=settings.CACHE_TTL_JITTER,
+        beta=settings.CACHE_EARLY_REFRESH_BETA
+    )
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per-entry TTL
+
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_size: int, ttl: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Any:
+        """Return cached value or _MISSING"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, expire: Optional[int] = None):
+        ttl = min(expire, self.ttl) if expire else self.ttl
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def invalidate(self, pattern: str):
+        """Drop all keys matching a glob pattern"""
+        if pattern == "*":
+            self._data.clear()
+            return
+        for key in [k for k in self._data if fnmatch.fnmatchcase(k, pattern)]:
+            del self._data[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
 class RedisCache:
+    # Key families with a generation counter
+    NAMESPACES = ("product", "products", "categories")
+
     def __init__(self):
         self.redis_url = settings.get_redis_url
         self._redis: Optional[Redis] = None
+        self._pubsub_redis: Optional[Redis] = None
+        self.local: Optional[LocalCache] = (
+            LocalCache(settings.LOCAL_CACHE_MAX_SIZE, settings.LOCAL_CACHE_TTL_SECONDS)
+            if settings.LOCAL_CACHE_ENABLED
+            else None
+        )
+        self.instance_id = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+        self._flights = SingleFlight()
+        self._tasks = set()
+        self.codec = codecs.resolve_codec(settings.CACHE_CODEC)
+        self.compression = codecs.resolve_compression(settings.CACHE_COMPRESSION)
+        self.breaker = CircuitBreaker(
+            "redis",
+            settings.REDIS_BREAKER_FAILURE_THRESHOLD,
+            settings.REDIS_BREAKER_RESET_SECONDS
+        )
+        # Set when an invalidation could not reach Redis
+        self._missed_invalidations = False
 
     async def init(self):
         """Initialize Redis connection"""
         if not self._redis:
+            # Entries are binary (codec header, msgpack, compressed payloads).
+            # Tight timeouts and no client retries: a slow Redis must not hold
+            # requests longer than going to the database would, and the
+            # circuit breaker decides when to try again
             self._redis = Redis.from_url(
                 self.redis_url,
-                decode_responses=True,
-                encoding="utf-8"
+                socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+                retry=Retry(NoBackoff(), 0)
             )
 
+    def _subscriber(self) -> Redis:
+        """
+        Client of the invalidation listener
+
+        A subscription idles between messages, so unlike request traffic it
+        gets no socket timeout; keepalives detect a dead peer instead.
+        """
+        if self._pubsub_redis is None:
+            self._pubsub_redis = Redis.from_url(
+                self.redis_url,
+                socket_timeout=None,
+                socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+                socket_keepalive=True
+            )
+        return self._pubsub_redis
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit breaker keeps requests off Redis"""
+        return self.breaker.closed
+
+    async def _call(
+        self,
+        family: str,
+        operation: str,
+        command: Callable[[Redis], Awaitable[Any]]
+    ) -> Any:
+        """
+        Run a Redis command behind the circuit breaker
+
+        Raises CacheUnavailable right away while the breaker is open, or
+        when the command fails; callers then treat reads as misses and
+        skip writes, so requests are served from the database.
+        """
+        if not self.breaker.allow():
+            raise CacheUnavailable("Redis circuit breaker is open")
+        if not self._redis:
+            await self.init()
+        try:
+            with metrics.observe_cache(family, operation):
+                result = await command(self._redis)
+        except (RedisError, OSError, asyncio.TimeoutError) as e:
+            self.breaker.record_failure()
+            raise CacheUnavailable(str(e)) from e
+        self.breaker.record_success()
+        if self._missed_invalidations:
+            # Entries kept through the outage may have missed invalidations
+            self._missed_invalidations = False
+            self._spawn(self.clear_all(), "Cache flush after Redis outage")
+        return result
+
+    async def ping(self) -> bool:
+        """Whether Redis answers, for health checks"""
+        try:
+            return bool(await self._call("health", "ping", lambda redis: redis.ping()))
+        except CacheUnavailable:
+            return False
+
     async def close(self):
         """Close Redis connection"""
+        await self.stop_invalidation_listener()
         if self._redis:
             await self._redis.close()
             self._redis = None
+        if self._pubsub_redis:
+            await self._pubsub_redis.close()
+            self._pubsub_redis = None
 
-    async def get(self, key: str) -> Any:
-        """Get value from cache"""
-        if not self._redis:
-            await self.init()
-        
-        value = await self._redis.get(key)
-        if value:
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return value
-        return None
+    def _encode(self, value: Any, raw: bool = False):
+        """Return (stored form, value handed out on later hits)"""
+        if raw:
+            # Raw payloads are stored verbatim; callers own their format
+            if isinstance(value, str):
+                value = value.encode()
+            return codecs.encode(value, codecs.CODEC_RAW), value
+        try:
+            value = jsonable_encoder(value)
+            return codecs.encode(
+                value,
+                self.codec,
+                self.compression,
+                settings.CACHE_COMPRESS_MIN_BYTES
+            ), value
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Unable to serialize value: {str(e)}")
+
+    @staticmethod
+    def _decode(value: bytes) -> Tuple[Any, Optional[float], float]:
+        """
+        Parse a stored entry into (value, fresh until, load duration)
+
+        Returns _MISSING as the value if the entry cannot be read.
+        """
+        try:
+            entry, fresh_until, compute_time = codecs.unstamp(value)
+            return codecs.decode(entry), fresh_until, compute_time
+        except codecs.CodecError as e:
+            logger.debug(f"Treating unreadable cache entry as a miss: {e}")
+            return _MISSING, None, 0.0
+
+    @staticmethod
+    def _stamp(stored: bytes, policy: CachePolicy, compute_time: float = 0.0):
+        """Return (entry, Redis TTL) for a value stored under policy"""
+        fresh_for = policy.fresh_for()
+        entry = codecs.stamp(stored, time.time() + fresh_for, compute_time)
+        return entry, math.ceil(fresh_for + policy.stale)
+
+    async def _read(self, key: str) -> Optional[Tuple[Any, Optional[float], float]]:
+        """Return (value, fresh until, load duration), or None on a miss"""
+        family = metrics.key_family(key)
+        if not self.is_versioned(key):
+            metrics.child(metrics.CACHE_REQUESTS, family, "unavailable").inc()
+            return None
+        if self.local:
+            value = self.local.get(key)
+            if value is not _MISSING:
+                # The local TTL is short enough to count as fresh
+                metrics.child(metrics.CACHE_REQUESTS, family, "local_hit").inc()
+                return value, None, 0.0
+
+        try:
+            stored = await self._call(family, "get", lambda redis: redis.get(key))
+        except CacheUnavailable:
+            metrics.child(metrics.CACHE_REQUESTS, family, "unavailable").inc()
+            return None
+        value = _MISSING
+        if stored is not None:
+            value, fresh_until, compute_time = self._decode(stored)
+        if value is _MISSING:
+            metrics.child(metrics.CACHE_REQUESTS, family, "miss").inc()
+            return None
+        metrics.child(metrics.CACHE_REQUESTS, family, "hit").inc()
+        if self.local:
+            self.local.set(key, value)
+        return value, fresh_until, compute_time
+
+    async def get(self, key: str, raw: bool = False) -> Any:
+        """
+        Get value from cache
+
+        With raw, the stored payload is returned as bytes instead of being
+        deserialized. Entries written with an unknown format read as a miss;
+        stale entries are returned as long as Redis keeps them.
+        """
+        entry = await self._read(key)
+        return entry[0] if entry is not None else None
 
     async def set(
         self,
         key: str,
         value: Any,
-        expire: int = settings.CACHE_EXPIRE_IN_SECONDS
+        expire: Optional[int] = None,
+        raw: bool = False
     ):
-        """Set value in cache"""
-        if not self._redis:
-            await self.init()
-        
+        """
+        Set value in cache; with raw, value must already be bytes or str
+
+        Without expire, the key family's policy applies (see policy_for).
+        """
+        if not self.is_versioned(key):
+            return
+        serialized_value, value = self._encode(value, raw)
+        entry, ttl = self._stamp(serialized_value, policy_for(key, expire))
         try:
-            serialized_value = (
-                json.dumps(value)
-                if not isinstance(value, (str, int, float))
-                else str(value)
+            await self._call(
+                metrics.key_family(key), "set", lambda redis: redis.set(key, entry, ex=ttl)
             )
-            await self._redis.set(key, serialized_value, ex=expire)
-        except (TypeError, ValueError) as e:
-            raise ValueError(f"Unable to serialize value: {str(e)}")
+        except CacheUnavailable:
+            return
+        if self.local:
+            self.local.set(key, value, ttl)
 
-    async def delete(self, key: str):
-        """Delete value from cache"""
-        if not self._redis:
-            await self.init()
-        
-        await self._redis.delete(key)
+    async def get_many(self, keys: List[str], raw: bool = False) -> Dict[str, Any]:
+        """Get several values in one round trip; misses are left out"""
+        keys = [key for key in keys if self.is_versioned(key)]
+        if not keys:
+            return {}
+        # One batch reads one family; label it by the first key
+        family = metrics.key_family(keys[0])
+        found: Dict[str, Any] = {}
+        remaining = keys
+        if self.local:
+            remaining = []
+            for key in keys:
+                value = self.local.get(key)
+                if value is _MISSING:
+                    remaining.append(key)
+                else:
+                    found[key] = value
+            if found:
+                metrics.child(metrics.CACHE_REQUESTS, family, "local_hit").inc(len(found))
+        if not remaining:
+            return found
+
+        try:
+            values = await self._call(family, "mget", lambda redis: redis.mget(remaining))
+        except CacheUnavailable:
+            metrics.child(metrics.CACHE_REQUESTS, family, "unavailable").inc(len(remaining))
+            return found
+        hits = 0
+        for key, value in zip(remaining, values):
+            if value is None:
+                continue
+            value = self._decode(value)[0]
+            if value is _MISSING:
+                continue
+            if self.local:
+                self.local.set(key, value)
+            found[key] = value
+            hits += 1
+        metrics.child(metrics.CACHE_REQUESTS, family, "hit").inc(hits)
+        metrics.child(metrics.CACHE_REQUESTS, family, "miss").inc(len(remaining) - hits)
+        return found
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[int] = None,
+        raw: bool = False,
+        nx: bool = False
+    ):
+        """
+        Set several values in one pipelined round trip
+
+        With nx, keys that already exist are left alone, so a value stored
+        concurrently by a fresher loader wins.
+        """
+        mapping = {key: value for key, value in mapping.items() if self.is_versioned(key)}
+        if not mapping:
+            return
+        entries = []
+        for key, value in mapping.items():
+            serialized_value, value = self._encode(value, raw)
+            entry, ttl = self._stamp(serialized_value, policy_for(key, expire))
+            entries.append((key, entry, ttl, value))
+
+        def execute(redis: Redis):
+            pipe = redis.pipeline(transaction=False)
+            for key, entry, ttl, _ in entries:
+                pipe.set(key, entry, ex=ttl, nx=nx)
+            return pipe.execute()
+
+        try:
+            stored = await self._call(metrics.key_family(next(iter(mapping))), "pipeline", execute)
+        except CacheUnavailable:
+            return
+        if self.local:
+            for (key, _, ttl, value), ok in zip(entries, stored):
+                if ok:
+                    self.local.set(key, value, ttl)
+
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        expire: Optional[int] = None,
+        raw: bool = False,
+        policy: Optional[CachePolicy] = None,
+        refresh: Optional[Callable[[], Awaitable[Any]]] = None
+    ) -> Any:
+        """
+        Get value from cache, loading and storing it on a miss
+
+        Freshness follows policy, else policy_for(key, expire). A value that
+        went stale, or is picked for early refresh, is still returned while
+        one background task reloads it with refresh (default: loader). Pass
+        a refresh that does not depend on request-scoped resources such as
+        the request's database session.
+
+        Concurrent misses for the same key in this process share one loader
+        call. With CACHE_LOCK_ENABLED, a short Redis lock extends this across
+        processes: lock holders load, everyone else polls the cache until the
+        value appears or CACHE_LOCK_WAIT_MS runs out. A loader returning None
+        is not cached.
+        """
+        policy = policy or policy_for(key, expire)
+        entry = await self._read(key)
+        if entry is not None:
+            value, fresh_until, compute_time = entry
+            if fresh_until is not None and policy.should_refresh(fresh_until, compute_time):
+                self._refresh_in_background(key, refresh or loader, policy, raw)
+            return value
+        return await self._flights.do(
+            key, lambda: self._load(key, loader, policy, raw)
+        )
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        raw: bool = False
+    ):
+        if key in self._flights:
+            return
+        metrics.child(metrics.CACHE_REFRESHES, metrics.key_family(key)).inc()
+        self._spawn(
+            self._flights.do(key, lambda: self._load(key, loader, policy, raw)),
+            f"Background refresh of {key}"
+        )
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        raw: bool = False
+    ) -> Any:
+        if not settings.CACHE_LOCK_ENABLED or not self.available or not self.is_versioned(key):
+            return await self._load_and_set(key, loader, policy, raw)
+
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self._call("lock", "acquire", lambda redis: redis.set(
+                lock_key, token, nx=True, px=settings.CACHE_LOCK_TIMEOUT_MS
+            ))
+        except CacheUnavailable:
+            return await self._load_and_set(key, loader, policy, raw)
+        if acquired:
+            try:
+                return await self._load_and_set(key, loader, policy, raw)
+            finally:
+                await self._release(lock_key, token)
+
+        # A stale value is returned right away: another process is
+        # already refreshing it
+        deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_MS / 1000
+        while time.monotonic() < deadline:
+            value = await self.get(key, raw=raw)
+            if value is not None:
+                return value
+            try:
+                if not await self._call("lock", "exists", lambda redis: redis.exists(lock_key)):
+                    break
+            except CacheUnavailable:
+                break
+            await asyncio.sleep(settings.CACHE_LOCK_POLL_INTERVAL_MS / 1000)
+        return await self._load_and_set(key, loader, policy, raw)
+
+    async def _release(self, lock_key: str, token: str):
+        try:
+            # Do not release a lock that expired and was taken over
+            if await self._call("lock", "get", lambda redis: redis.get(lock_key)) == token.encode():
+                await self._call("lock", "release", lambda redis: redis.delete(lock_key))
+        except CacheUnavailable:
+            pass
+
+    async def _load_and_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+        raw: bool = False
+    ) -> Any:
+        started = time.monotonic()
+        value = await loader()
+        if value is not None and self.is_versioned(key):
+            # Hand out the same shape a later cache hit would return
+            stored, value = self._encode(value, raw)
+            entry, ttl = self._stamp(stored, policy, time.monotonic() - started)
+            try:
+                await self._call(
+                    metrics.key_family(key), "set", lambda redis: redis.set(key, entry, ex=ttl)
+                )
+            except CacheUnavailable:
+                return value
+            if self.local:
+                self.local.set(key, value, ttl)
+        return value
+
+    async def delete(self, *keys: str):
+        """Delete values from cache"""
+        if not keys:
+            return
+        def execute(redis: Redis):
+            pipe = redis.pipeline(transaction=False)
+            pipe.delete(*keys)
+            self._mark_written(pipe, {key.split(":", 1)[0] for key in keys})
+            return pipe.execute()
+
+        try:
+            await self._call(metrics.key_family(keys[0]), "delete", execute)
+        except CacheUnavailable as e:
+            self._invalidation_failed(e)
+        await self._broadcast_invalidation(keys)
+
+    @staticmethod
+    def generation_tag(generation: Optional[int]) -> str:
+        """Key fragment for a generation, UNKNOWN_GENERATION when unknown"""
+        return f"g{generation}" if generation is not None else UNKNOWN_GENERATION
+
+    @staticmethod
+    def is_versioned(key: str) -> bool:
+        """Whether key was built while its namespace generation was known"""
+        return f":{UNKNOWN_GENERATION}:" not in key
+
+    async def generation(self, namespace: str) -> Optional[int]:
+        """
+        Current generation of a key namespace, 0 until first bumped
+
+        None while Redis cannot be read: a write may have bumped it in the
+        meantime, so no key or ETag built from it may be trusted.
+        """
+        key = f"gen:{namespace}"
+        if self.local:
+            value = self.local.get(key)
+            if value is not _MISSING:
+                return value
+        # Plain INCR counter, not a codec entry
+        try:
+            value = await self._call("gen", "get", lambda redis: redis.get(key))
+        except CacheUnavailable:
+            return None
+        value = int(value) if value is not None else 0
+        if self.local:
+            self.local.set(key, value)
+        return value
+
+    async def versioned_key(self, namespace: str, suffix: Any) -> str:
+        """Build a key that goes stale as soon as its namespace is bumped"""
+        return f"{namespace}:{self.generation_tag(await self.generation(namespace))}:{suffix}"
+
+    async def bump_generation(self, *namespaces: str):
+        """
+        Invalidate every key of the given namespaces in O(1)
+
+        Keys built by versioned_key embed the generation, so incrementing it
+        makes readers switch to fresh keys; the old ones simply expire.
+        """
+        def execute(redis: Redis):
+            pipe = redis.pipeline(transaction=False)
+            for namespace in namespaces:
+                pipe.incr(f"gen:{namespace}")
+            self._mark_written(pipe, namespaces)
+            return pipe.execute()
+
+        try:
+            await self._call("gen", "incr", execute)
+        except CacheUnavailable as e:
+            self._invalidation_failed(e)
+        await self._broadcast_invalidation([f"gen:{ns}" for ns in namespaces])
+
+    async def invalidate(self, keys: Iterable[str] = (), namespaces: Iterable[str] = ()):
+        """
+        Delete keys and bump namespaces in one pipelined round trip
+
+        Same effect as delete() followed by bump_generation(), with a single
+        broadcast to the local tiers; for writers invalidating in bulk.
+        """
+        keys, namespaces = list(keys), list(namespaces)
+        if not keys and not namespaces:
+            return
+
+        def execute(redis: Redis):
+            pipe = redis.pipeline(transaction=False)
+            if keys:
+                pipe.delete(*keys)
+            for namespace in namespaces:
+                pipe.incr(f"gen:{namespace}")
+            self._mark_written(pipe, {key.split(":", 1)[0] for key in keys} | set(namespaces))
+            return pipe.execute()
+
+        family = metrics.key_family(keys[0]) if keys else "gen"
+        try:
+            await self._call(family, "invalidate", execute)
+        except CacheUnavailable as e:
+            self._invalidation_failed(e)
+        await self._broadcast_invalidation(keys + [f"gen:{ns}" for ns in namespaces])
+
+    @staticmethod
+    def _mark_written(pipe, namespaces: Iterable[str]):
+        """Flag namespaces as written for READ_YOUR_WRITES_SECONDS"""
+        if settings.READ_YOUR_WRITES_SECONDS <= 0:
+            return
+        for namespace in namespaces:
+            pipe.set(
+                f"written:{namespace}", 1,
+                px=int(settings.READ_YOUR_WRITES_SECONDS * 1000)
+            )
+
+    async def written_recently(self, key: str) -> bool:
+        """
+        Whether the namespace of key was invalidated within the last
+        READ_YOUR_WRITES_SECONDS, so rows read before then may be outdated
+        (a replica may not have the write yet, a slow loader may predate it)
+
+        False for keys that are not cached anyway; True when Redis cannot
+        tell.
+        """
+        if settings.READ_YOUR_WRITES_SECONDS <= 0:
+            return False
+        if not self.is_versioned(key):
+            return False
+        namespace = key.split(":", 1)[0]
+        try:
+            return bool(await self._call(
+                "gen", "exists", lambda redis: redis.exists(f"written:{namespace}")
+            ))
+        except CacheUnavailable:
+            return True
+
+    def _invalidation_failed(self, error: Exception):
+        """Remember to flush everything once Redis is back"""
+        logger.warning(f"Cache invalidation skipped, Redis unavailable: {error}")
+        self._missed_invalidations = True
 
     async def clear_all(self):
         """Clear all cache"""
-        if not self._redis:
-            await self.init()
-        
-        await self._redis.flushall(asynchronous=True)
+        # Bumping is instant; the orphaned keys are swept in the background
+        # instead of blocking Redis with FLUSHALL
+        await self.bump_generation(*self.NAMESPACES)
+        for namespace in self.NAMESPACES:
+            self.cleanup_in_background(f"{namespace}:*")
+        await self._broadcast_invalidation(["*"])
 
     async def invalidate_pattern(self, pattern: str):
         """Invalidate all keys matching pattern"""
         if not self._redis:
             await self.init()
-        
-        keys = await self._redis.keys(pattern)
-        if keys:
-            await self._redis.delete(*keys)
+
+        batch = []
+        async for key in self._redis.scan_iter(match=pattern, count=settings.CACHE_SCAN_COUNT):
+            batch.append(key)
+            if len(batch) >= settings.CACHE_SCAN_COUNT:
+                await self._redis.unlink(*batch)
+                batch = []
+        if batch:
+            await self._redis.unlink(*batch)
+        await self._broadcast_invalidation([pattern])
+
+    def cleanup_in_background(self, pattern: str):
+        """Run invalidate_pattern without making the caller wait for the SCAN"""
+        self._spawn(self.invalidate_pattern(pattern), f"Background cleanup of {pattern}")
+
+    def _spawn(self, coro: Coroutine, description: str):
+        """Run coro as a background task that logs instead of raising"""
+        task = asyncio.create_task(self._guard(coro, description))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _guard(coro: Coroutine, description: str):
+        try:
+            await coro
+        except Exception as e:
+            logger.warning(f"{description} failed: {e}")
+
+    async def _broadcast_invalidation(self, patterns: Iterable[str]):
+        """Drop patterns from the local tier here and on all other replicas"""
+        if not self.local:
+            return
+        patterns = list(patterns)
+        for pattern in patterns:
+            self.local.invalidate(pattern)
+        message = json.dumps({"origin": self.instance_id, "patterns": patterns})
+        try:
+            await self._call("pubsub", "publish", lambda redis: redis.publish(
+                settings.CACHE_INVALIDATION_CHANNEL, message
+            ))
+        except CacheUnavailable as e:
+            # Peers still converge once their local TTL runs out
+            logger.warning(f"Failed to broadcast cache invalidation: {e}")
+
+    async def start_invalidation_listener(self):
+        """Subscribe to invalidations published by other replicas"""
+        if not self.local or self._listener:
+            return
+        if not self._redis:
+            await self.init()
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop_invalidation_listener(self):
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _listen(self):
+        """Apply peer invalidations, resubscribing whenever Redis goes away"""
+        while True:
+            try:
+                await self._listen_once()
+            except (RedisError, OSError) as e:
+                logger.warning(f"Cache invalidation listener lost Redis: {e}")
+            # Invalidations may have been missed meanwhile
+            self.local.invalidate("*")
+            await asyncio.sleep(settings.REDIS_BREAKER_RESET_SECONDS)
+
+    async def _listen_once(self):
+        pubsub = self._subscriber().pubsub()
+        await pubsub.subscribe(settings.CACHE_INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    payload = json.loads(message["data"])
+                except (TypeError, ValueError):
+                    continue
+                if payload.get("origin") == self.instance_id:
+                    continue
+                for pattern in payload.get("patterns", []):
+                    self.local.invalidate(pattern)
+        finally:
+            try:
+                await pubsub.unsubscribe(settings.CACHE_INVALIDATION_CHANNEL)
+            except (RedisError, OSError):
+                pass
+            await pubsub.aclose()
 
 # Create a global cache instance
-cache = RedisCache()
\ No newline at end of file
+cache = RedisCache()
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Union
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from app.utils.codecs import COMPRESSION_GZIP, COMPRESSION_NONE, compress
+from app.utils.redis_cache import cache
+from app.utils.serialization import dumps, loads
+from config.settings import settings
+
+MEDIA_TYPE = "application/json"
+
+
+@lru_cache(maxsize=None)
+def _adapter(type_: Any) -> TypeAdapter:
+    return TypeAdapter(type_)
+
+
+def encode_body(value: Any, type_: Any) -> bytes:
+    """
+    Serialize value exactly as the response model type_ would
+
+    Validation runs against type_ before dumping, so the bytes have the same
+    fields, aliases and formats FastAPI would produce for response_model.
+    """
+    adapter = _adapter(type_)
+    return adapter.dump_json(adapter.validate_python(value, from_attributes=True))
+
+
+def pack(body: bytes, headers: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Bundle a response body with the headers to replay on a cache hit
+
+    The entry is one line of header JSON followed by the body; compact JSON
+    bodies never contain a raw newline. Unless CACHE_COMPRESSION is "none",
+    bodies of at least CACHE_COMPRESS_MIN_BYTES are stored gzip-compressed
+    (the one encoding every client can take), so they can be sent as is to
+    clients accepting gzip.
+    """
+    headers = dict(headers or {})
+    if cache.compression != COMPRESSION_NONE and len(body) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        body = compress(body, COMPRESSION_GZIP)
+        headers["Content-Encoding"] = "gzip"
+    return (dumps(headers) if headers else b"") + b"\n" + body
+
+
+def unpack(entry: Union[bytes, str]) -> Tuple[bytes, Dict[str, str]]:
+    """Split an entry into its stored (possibly compressed) body and headers"""
+    if isinstance(entry, str):
+        entry = entry.encode()
+    meta, _, body = entry.partition(b"\n")
+    return body, (loads(meta) if meta else {})
+
+
+def plain_body(entry: Union[bytes, str]) -> bytes:
+    """Uncompressed body of an entry"""
+    body, headers = unpack(entry)
+    if headers.get("Content-Encoding") == "gzip":
+        return gzip.decompress(body)
+    return body
+
+
+@lru_cache(maxsize=256)
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether Accept-Encoding allows gzip, honouring q-values and "*" """
+    gzip_q = any_q = None
+    for coding in (accept_encoding or "").lower().split(","):
+        name, _, params = coding.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        name = name.strip()
+        if name in ("gzip", "x-gzip"):
+            gzip_q = q
+        elif name == "*":
+            any_q = q
+    if gzip_q is None:
+        gzip_q = any_q
+    return gzip_q is not None and gzip_q > 0
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the values a response is derived from, not its body"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12)
+    return f'"{digest.hexdigest()}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag of an uncompressed body, for responses cached as a whole"""
+    return f'"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def representation_etag(etag: str, gzipped: bool = False) -> str:
+    """
+    ETag of the body actually sent, gzipped or not
+
+    Gzip and identity bodies differ byte for byte, so a gzipped body gets
+    its own tag. Entries stored uncompressed go out as is to every client
+    and keep the plain tag.
+    """
+    if gzipped:
+        return etag[:-1] + '-gzip"'
+    return etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether If-None-Match lists etag, compared weakly as RFC 9110 requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def not_modified(etag: str, if_none_match: Optional[str] = None) -> Optional[Response]:
+    """A 304 response when the client's copy of etag is current, otherwise None"""
+    if not etag_matches(if_none_match, etag):
+        return None
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Vary": "Accept-Encoding"}
+    )
+
+
+def cached_response(
+    entry: Union[bytes, str],
+    accept_encoding: Optional[str] = None,
+    status_code: int = 200,
+    if_none_match: Optional[str] = None,
+    etag: Optional[str] = None,
+    tagged: bool = True
+) -> Response:
+    """
+    Build a response straight from a cache entry, skipping re-validation
+
+    Compressed bodies go out untouched when the client accepts gzip and
+    are inflated otherwise. The ETag is the one given or the one stored
+    in the entry; when If-None-Match lists it, a 304 is returned before
+    the body is inflated. Without tagged, no ETag is sent or compared.
+    """
+    body, headers = unpack(entry)
+    stored_etag = headers.pop("ETag", None)
+    etag = (etag or stored_etag) if tagged else None
+    compressed = headers.get("Content-Encoding") == "gzip"
+    gzipped = compressed and accepts_gzip(accept_encoding)
+    if etag:
+        etag = representation_etag(etag, gzipped)
+        unchanged = not_modified(etag, if_none_match)
+        if unchanged is not None:
+            return unchanged
+        headers["ETag"] = etag
+        headers["Vary"] = "Accept-Encoding"
+    if compressed:
+        headers["Vary"] = "Accept-Encoding"
+        if not gzipped:
+            body = gzip.decompress(body)
+            del headers["Content-Encoding"]
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type=MEDIA_TYPE,
+        headers=headers
+    )
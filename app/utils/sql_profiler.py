@@ -0,0 +1,156 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.utils.metrics import route_label
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Longest statement text kept in slow query and N+1 reports
+_STATEMENT_CHARS = 500
+
+class QueryStats:
+    """Queries issued within one profile(), e.g. one request"""
+
+    def __init__(self, parent: Optional["QueryStats"] = None):
+        self.parent = parent
+        self.count = 0
+        self.duration = 0.0
+        self.slow: List[Tuple[str, float]] = []
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, duration: float):
+        stats = self
+        while stats is not None:
+            stats.count += 1
+            stats.duration += duration
+            stats.statements[statement] += 1
+            if duration * 1000 >= settings.SQL_SLOW_QUERY_MS:
+                stats.slow.append((statement, duration))
+            stats = stats.parent
+
+    def repeated(self, threshold: Optional[int] = None) -> Dict[str, int]:
+        """Statements run at least threshold times: likely N+1 patterns"""
+        threshold = threshold or settings.SQL_REPEATED_QUERY_THRESHOLD
+        return {s: n for s, n in self.statements.items() if n >= threshold}
+
+    def summary(self) -> Dict[str, Any]:
+        """Log-friendly view of the stats"""
+        return {
+            "db_query_count": self.count,
+            "db_time_ms": round(self.duration * 1000, 2),
+            "db_slow_queries": [
+                {"statement": s[:_STATEMENT_CHARS], "ms": round(d * 1000, 2)}
+                for s, d in self.slow
+            ],
+            "db_repeated_queries": [
+                {"statement": s[:_STATEMENT_CHARS], "count": n}
+                for s, n in self.repeated().items()
+            ],
+        }
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_profile", default=None)
+
+@contextmanager
+def profile() -> Iterator[QueryStats]:
+    """
+    Count the queries run in this context
+
+    Nested profiles also count towards the enclosing ones. Tasks started
+    inside inherit the profile, so e.g. background refreshes count towards
+    the request that spawned them.
+    """
+    stats = QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Fail with the statements run if the block issues more than max_queries"""
+    with profile() as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = "\n".join(
+            f"  {n}x {s[:_STATEMENT_CHARS]}" for s, n in stats.statements.most_common()
+        )
+        raise AssertionError(
+            f"Expected at most {max_queries} queries, ran {stats.count}:\n{statements}"
+        )
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._profile_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is not None:
+        # An executemany is one round trip and counts once
+        stats.record(statement, time.perf_counter() - context._profile_started)
+
+def instrument(engine: AsyncEngine):
+    """Feed queries run on engine into the active profile, if any"""
+    sync_engine = engine.sync_engine
+    if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+class SQLProfilingMiddleware:
+    """
+    Profile the queries of every HTTP request
+
+    Logs query count, database time, slow statements (SQL_SLOW_QUERY_MS)
+    and statements repeated SQL_REPEATED_QUERY_THRESHOLD times or more,
+    the usual sign of an N+1 pattern, as structured fields. In DEBUG
+    responses also carry X-DB-Query-Count and X-DB-Time-Ms; streamed
+    responses only count the queries run before their first byte there.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        with profile() as stats:
+            async def send_wrapper(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    if settings.DEBUG:
+                        message["headers"] = list(message.get("headers", [])) + [
+                            (b"x-db-query-count", str(stats.count).encode()),
+                            (b"x-db-time-ms", f"{stats.duration * 1000:.2f}".encode()),
+                        ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                if stats.count:
+                    self._log(scope, status, stats)
+
+    @staticmethod
+    def _log(scope, status: int, stats: QueryStats):
+        fields = {
+            "method": scope["method"],
+            "route": route_label(scope),
+            "status": status,
+            **stats.summary(),
+        }
+        message = f"{fields['method']} {fields['route']}: {stats.count} queries"
+        if fields["db_slow_queries"] or fields["db_repeated_queries"]:
+            logger.warning(message, extra=fields)
+        else:
+            logger.info(message, extra=fields)
@@ -0,0 +1,133 @@
+import csv
+import zlib
+from typing import Any, AsyncIterator, List, Mapping, Tuple, TypeVar, Union
+
+from app.utils.serialization import dumps, loads
+
+T = TypeVar("T")
+
+
+def _decode_line(line: bytes) -> Union[str, ValueError]:
+    try:
+        return line.rstrip(b"\r").decode("utf-8")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Invalid UTF-8: {e}")
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Union[str, ValueError]]:
+    """
+    Split a byte stream into decoded lines without buffering the whole body
+
+    Only each new chunk is split; a partial line is kept as pieces until its
+    end arrives. A line that is not valid UTF-8 is yielded as a ValueError.
+    """
+    pending: List[bytes] = []
+    async for chunk in chunks:
+        *lines, tail = chunk.split(b"\n")
+        if lines:
+            pending.append(lines[0])
+            lines[0] = b"".join(pending)
+            pending = []
+            for line in lines:
+                yield _decode_line(line)
+        if tail:
+            pending.append(tail)
+    if pending:
+        yield _decode_line(b"".join(pending))
+
+
+async def parse_ndjson(
+    chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row number, object) pairs from newline-delimited JSON
+
+    Blank lines are skipped. A line that is not valid UTF-8 or JSON is
+    yielded as a ValueError so the caller can report it and carry on.
+    """
+    row = 0
+    async for line in iter_lines(chunks):
+        if isinstance(line, ValueError):
+            row += 1
+            yield row, line
+            continue
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            yield row, loads(line)
+        except ValueError as e:
+            yield row, ValueError(f"Invalid JSON: {e}")
+
+
+async def parse_csv(
+    chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Yield (row number, dict) pairs from CSV with a header line
+
+    Empty cells are left out so schema defaults apply. Quoted values
+    spanning several lines are not supported.
+    """
+    header = None
+    row = 0
+    async for line in iter_lines(chunks):
+        if isinstance(line, ValueError):
+            row += 1
+            yield row, line
+            continue
+        if not line.strip():
+            continue
+        values = next(csv.reader([line]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row += 1
+        if len(values) != len(header):
+            yield row, ValueError(
+                f"Expected {len(header)} columns, got {len(values)}"
+            )
+            continue
+        yield row, {k: v for k, v in zip(header, values) if v != ""}
+
+
+async def batched(items: AsyncIterator[T], size: int) -> AsyncIterator[List[T]]:
+    """Group an async iterator into lists of at most size items"""
+    batch: List[T] = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def encode_ndjson(
+    rows: AsyncIterator[Mapping[str, Any]],
+    chunk_size: int = 65536
+) -> AsyncIterator[bytes]:
+    """Serialize mappings as NDJSON, yielding roughly chunk_size byte chunks"""
+    buffer: List[bytes] = []
+    size = 0
+    async for row in rows:
+        line = dumps(dict(row)) + b"\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a byte stream into a single gzip member on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
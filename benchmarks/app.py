@@ -0,0 +1,112 @@
+"""In-process service under test: aiosqlite, fakeredis and a stubbed broker"""
+import os
+import random
+import tempfile
+from typing import Any, Dict, List
+
+import fakeredis.aioredis
+import httpx
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import database
+from app.core.database import Base, get_db, get_read_db
+from app.main import app
+from app.models.product import Category, Product
+from app.services import outbox
+from app.services.product import ProductService
+from app.utils.rabbitmq import rabbitmq
+from app.utils.redis_cache import cache
+
+
+async def _publish_event(*args, **kwargs):
+    pass
+
+
+async def _publish_events(events) -> List[Any]:
+    return [None] * len(events)
+
+
+class BenchmarkApp:
+    """
+    The FastAPI app wired to throwaway backends
+
+    Each instance uses a fresh SQLite file and fake Redis, seeded
+    deterministically, so runs on the same machine are comparable.
+    """
+
+    def __init__(self, products: int = 10000, categories: int = 50, seed: int = 42):
+        self.products = products
+        self.categories = categories
+        self.seed = seed
+        self._dir = tempfile.TemporaryDirectory(prefix="product-bench-")
+        self.engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(self._dir.name, 'bench.db')}"
+        )
+        self.session_factory = sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+
+    async def start(self) -> httpx.AsyncClient:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await self._seed()
+
+        async def override_get_db():
+            async with self.session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        self._session_locals = database.AsyncSessionLocal, database.AsyncReadSessionLocal
+        database.AsyncSessionLocal = database.AsyncReadSessionLocal = self.session_factory
+        cache._redis = fakeredis.aioredis.FakeRedis()
+        if cache.local:
+            cache.local.invalidate("*")
+        # Stubbed as in tests/conftest.py; writes only fill the outbox
+        self._publish_event = rabbitmq.publish_event
+        rabbitmq.publish_event = _publish_event
+        self._publish_events = outbox.publish_events
+        outbox.publish_events = _publish_events
+
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://benchmark"
+        )
+
+    async def stop(self):
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_read_db, None)
+        database.AsyncSessionLocal, database.AsyncReadSessionLocal = self._session_locals
+        rabbitmq.publish_event = self._publish_event
+        outbox.publish_events = self._publish_events
+        await cache._redis.aclose()
+        cache._redis = None
+        await self.engine.dispose()
+        self._dir.cleanup()
+
+    async def _seed(self):
+        rng = random.Random(self.seed)
+        categories = [
+            {"name": f"Category {i}", "description": f"Benchmark category {i}"}
+            for i in range(self.categories)
+        ]
+        products: List[Dict[str, Any]] = [
+            {
+                "name": f"Product {i} {rng.choice(['phone', 'laptop', 'kettle', 'chair'])}",
+                "description": f"Benchmark product number {i}",
+                "sku": f"BENCH-{i:07d}",
+                "price": round(rng.uniform(1, 2000), 2),
+                "quantity": rng.randint(0, 100),
+                "category_id": rng.randint(1, self.categories),
+                "is_active": rng.random() > 0.1,
+            }
+            for i in range(self.products)
+        ]
+        async with self.session_factory() as session:
+            await session.execute(insert(Category), categories)
+            await session.execute(insert(Product), products)
+            await session.commit()
+            # Bulk inserts bypass the incremental category stats
+            await ProductService(session).reconcile_category_stats()
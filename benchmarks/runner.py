@@ -0,0 +1,198 @@
+"""
+Load benchmarks for the product API
+
+Runs the app in-process against aiosqlite and fakeredis and drives each
+scenario with a fixed number of requests at every concurrency level:
+
+    python -m benchmarks --out results.json
+    python -m benchmarks --scenario hot_reads --concurrency 1 16 --requests 5000
+    python -m benchmarks --baseline benchmarks/baseline.json
+
+Results are JSON with p50/p99 latency (ms), requests/s and error counts per
+scenario and concurrency. With --baseline, the run is compared against a
+previous results file and exits with status 1 when p99 latency or
+throughput regressed beyond the thresholds. Baselines only compare
+meaningfully on the same machine; record one with --out before a change.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.app import BenchmarkApp
+from benchmarks.scenarios import SCENARIOS, Catalog, operations
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of unsorted samples, q in [0, 100]"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run_level(
+    client: httpx.AsyncClient,
+    catalog: Catalog,
+    weights: Dict[str, float],
+    concurrency: int,
+    requests: int,
+    seed: int
+) -> Dict[str, Any]:
+    """Issue requests from concurrency closed-loop workers and summarize"""
+    ops = operations(catalog)
+    names = list(weights)
+    shares = list(weights.values())
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker(index: int):
+        nonlocal errors, remaining
+        rng = random.Random(seed * 1000 + index)
+        state: Dict[str, Any] = {"worker": index}
+        while remaining > 0:
+            remaining -= 1
+            op = ops[rng.choices(names, shares)[0]]
+            started = time.perf_counter()
+            try:
+                response = await op(client, rng, state)
+                failed = response.status_code >= 400
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            if failed:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in args.scenario:
+        # Fresh data and cache per scenario, so writes do not leak into reads
+        bench = BenchmarkApp(products=args.products, categories=args.categories, seed=args.seed)
+        client = await bench.start()
+        catalog = Catalog(args.products, args.categories)
+        try:
+            if args.warmup:
+                await run_level(client, catalog, SCENARIOS[name], 1, args.warmup, args.seed - 1)
+            results[name] = {}
+            for concurrency in args.concurrency:
+                summary = await run_level(
+                    client, catalog, SCENARIOS[name], concurrency, args.requests,
+                    args.seed + concurrency
+                )
+                results[name][str(concurrency)] = summary
+                print(f"{name:<12} c={concurrency:<4} {json.dumps(summary)}", file=sys.stderr)
+        finally:
+            await client.aclose()
+            await bench.stop()
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "products": args.products,
+            "categories": args.categories,
+            "requests": args.requests,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+
+def compare(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    max_latency_regression: float,
+    max_throughput_regression: float
+) -> List[str]:
+    """List regressions of current against baseline; levels missing from either are skipped"""
+    regressions = []
+    for scenario, levels in current["results"].items():
+        for concurrency, now in levels.items():
+            before = baseline.get("results", {}).get(scenario, {}).get(concurrency)
+            if not before:
+                continue
+            label = f"{scenario} c={concurrency}"
+            if before["p99_ms"] and now["p99_ms"] > before["p99_ms"] * (1 + max_latency_regression):
+                regressions.append(
+                    f"{label}: p99 {now['p99_ms']}ms vs baseline {before['p99_ms']}ms"
+                )
+            if before["rps"] and now["rps"] < before["rps"] * (1 - max_throughput_regression):
+                regressions.append(
+                    f"{label}: {now['rps']} req/s vs baseline {before['rps']} req/s"
+                )
+            if now["errors"] > before["errors"]:
+                regressions.append(
+                    f"{label}: {now['errors']} errors vs baseline {before['errors']}"
+                )
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=200, help="unrecorded requests before each scenario")
+    parser.add_argument("--products", type=int, default=10000)
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write results JSON here instead of stdout")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--max-latency-regression", type=float, default=0.2,
+                        help="allowed relative p99 increase (default 0.2)")
+    parser.add_argument("--max-throughput-regression", type=float, default=0.2,
+                        help="allowed relative req/s decrease (default 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    # SQL echo and per-request logs would dominate the measurements
+    logging.disable(logging.WARNING)
+    report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(
+            report, baseline, args.max_latency_regression, args.max_throughput_regression
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("No regressions against baseline", file=sys.stderr)
+    return 0
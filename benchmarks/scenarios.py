@@ -0,0 +1,108 @@
+"""Request mixes driven by the runner"""
+import itertools
+import random
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+
+API = "/api/v1/products"
+
+Operation = Callable[[httpx.AsyncClient, random.Random, Dict[str, Any]], Awaitable[httpx.Response]]
+
+
+class Catalog:
+    """Size of the seeded catalog, shared by operations to pick targets"""
+
+    def __init__(self, products: int, categories: int):
+        self.products = products
+        self.categories = categories
+        # A small hot set takes most reads, like a real storefront
+        self.hot = max(1, products // 100)
+        # Unique SKUs for created products across workers and levels
+        self.created = itertools.count(1)
+
+    def hot_product(self, rng: random.Random) -> int:
+        if rng.random() < 0.8:
+            return rng.randint(1, self.hot)
+        return rng.randint(1, self.products)
+
+
+def operations(catalog: Catalog) -> Dict[str, Operation]:
+    async def get_hot_product(client, rng, state):
+        return await client.get(f"{API}/products/{catalog.hot_product(rng)}")
+
+    async def first_page(client, rng, state):
+        return await client.get(f"{API}/products/", params={"limit": 100})
+
+    async def category_page(client, rng, state):
+        return await client.get(f"{API}/products/", params={
+            "limit": 50,
+            "category_id": rng.randint(1, catalog.categories),
+            "sort": rng.choice(["id", "price", "-price"]),
+        })
+
+    async def next_page(client, rng, state):
+        # Each worker walks the catalog by cursor and starts over at the end
+        params = {"limit": 100}
+        if state.get("cursor"):
+            params["after"] = state["cursor"]
+        response = await client.get(f"{API}/products/", params=params)
+        state["cursor"] = response.headers.get("x-next-cursor")
+        return response
+
+    async def search(client, rng, state):
+        return await client.get(f"{API}/products/search", params={
+            "q": rng.choice(["phone", "laptop", "kettle", "BENCH-00001", "chair"]),
+        })
+
+    async def batch(client, rng, state):
+        ids = [catalog.hot_product(rng) for _ in range(50)]
+        return await client.post(f"{API}/products/batch", json={"ids": ids})
+
+    async def create_product(client, rng, state):
+        return await client.post(f"{API}/products/", json={
+            "name": "Benchmark write",
+            "sku": f"BENCH-W{next(catalog.created):07d}",
+            "price": round(rng.uniform(1, 2000), 2),
+            "quantity": rng.randint(0, 100),
+            "category_id": rng.randint(1, catalog.categories),
+        })
+
+    async def update_product(client, rng, state):
+        product_id = catalog.hot_product(rng)
+        return await client.put(f"{API}/products/{product_id}", json={
+            "name": f"Product {product_id} updated",
+            "sku": f"BENCH-{product_id - 1:07d}",
+            "price": round(rng.uniform(1, 2000), 2),
+            "quantity": rng.randint(0, 100),
+            "category_id": rng.randint(1, catalog.categories),
+        })
+
+    return {
+        "get_hot_product": get_hot_product,
+        "first_page": first_page,
+        "category_page": category_page,
+        "next_page": next_page,
+        "search": search,
+        "batch": batch,
+        "create_product": create_product,
+        "update_product": update_product,
+    }
+
+
+# Scenario name -> operation weights
+SCENARIOS: Dict[str, Dict[str, float]] = {
+    "hot_reads": {"get_hot_product": 0.9, "batch": 0.1},
+    "list_pages": {"first_page": 0.3, "category_page": 0.7},
+    "deep_pages": {"next_page": 1.0},
+    "writes": {"create_product": 0.5, "update_product": 0.5},
+    "mixed": {
+        "get_hot_product": 0.6,
+        "category_page": 0.15,
+        "next_page": 0.1,
+        "search": 0.05,
+        "batch": 0.05,
+        "update_product": 0.04,
+        "create_product": 0.01,
+    },
+}
@@ -15,28 +15,157 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "product_service"
     POSTGRES_PORT: str = "5432"
     SQL_ECHO: bool = False
+    # Full URLs override the POSTGRES_* parts, e.g. two local databases in tests
+    DATABASE_URL: Optional[str] = None
+    DATABASE_READ_URL: Optional[str] = None
+    POSTGRES_REPLICA_SERVER: Optional[str] = None
+    POSTGRES_REPLICA_PORT: Optional[str] = None
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_READ_POOL_SIZE: int = 20
+    DB_READ_MAX_OVERFLOW: int = 20
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    DB_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    DB_COMMAND_TIMEOUT_SECONDS: Optional[float] = 30.0
+    # After a write, the client's reads stay on the primary this long
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    READ_YOUR_WRITES_COOKIE: str = "read_primary_until"
     
     # Redis
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: Optional[str] = None
+    # Tight timeouts: a slow Redis is skipped rather than waited on
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 0.25
+    REDIS_CONNECT_TIMEOUT_SECONDS: float = 0.5
+    # After this many consecutive failures Redis is bypassed for the reset
+    # interval, then one request probes it again
+    REDIS_BREAKER_FAILURE_THRESHOLD: int = 5
+    REDIS_BREAKER_RESET_SECONDS: float = 5.0
     CACHE_EXPIRE_IN_SECONDS: int = 3600
+    CACHE_SCAN_COUNT: int = 500
+    CACHE_CODEC: str = "json"  # json | msgpack
+    CACHE_COMPRESSION: str = "gzip"  # none | gzip | zstd
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+    SEARCH_CACHE_EXPIRE_SECONDS: int = 300
+    COUNT_CACHE_EXPIRE_SECONDS: int = 60
+    
+    # Cache freshness per key family: values are fresh for the TTL, then
+    # served stale for up to the stale window while one task refreshes them
+    CACHE_TTL_JITTER: float = 0.1
+    CACHE_EARLY_REFRESH_BETA: float = 1.0
+    PRODUCT_CACHE_TTL_SECONDS: int = 3600
+    PRODUCT_CACHE_STALE_SECONDS: int = 300
+    PRODUCTS_CACHE_TTL_SECONDS: int = 600
+    PRODUCTS_CACHE_STALE_SECONDS: int = 120
+    CATEGORIES_CACHE_TTL_SECONDS: int = 3600
+    CATEGORIES_CACHE_STALE_SECONDS: int = 300
+    
+    # In-process cache tier in front of Redis
+    LOCAL_CACHE_ENABLED: bool = False
+    LOCAL_CACHE_MAX_SIZE: int = 10000
+    LOCAL_CACHE_TTL_SECONDS: int = 30
+    CACHE_INVALIDATION_CHANNEL: str = "cache:invalidate"
+    
+    # Cross-process coalescing of cache misses
+    CACHE_LOCK_ENABLED: bool = False
+    CACHE_LOCK_TIMEOUT_MS: int = 5000
+    CACHE_LOCK_WAIT_MS: int = 3000
+    CACHE_LOCK_POLL_INTERVAL_MS: int = 25
+    
+    # Cache warm-up at startup and on demand
+    WARMUP_ENABLED: bool = True
+    WARMUP_TOP_PRODUCTS: int = 1000
+    WARMUP_MAX_CATEGORIES: int = 500
+    WARMUP_PAGE_LIMIT: int = 100
+    WARMUP_CATEGORY_BATCH_SIZE: int = 50
+    WARMUP_CONCURRENCY: int = 4
+    WARMUP_TIMEOUT_SECONDS: float = 60.0
+    
+    # Category stats: maintained incrementally, recomputed this often
+    # to correct drift (0 disables the background job)
+    CATEGORY_STATS_RECONCILE_INTERVAL_SECONDS: float = 3600.0
+    
+    # Batch endpoints
+    BATCH_MAX_IDS: int = 500
+    BULK_IMPORT_BATCH_SIZE: int = 1000
+    BULK_IMPORT_MAX_ERRORS: int = 1000
+    # Bulk updates: items per request, and per UPDATE statement and commit
+    BULK_UPDATE_MAX_ITEMS: int = 10000
+    BULK_UPDATE_BATCH_SIZE: int = 1000
+    EXPORT_FETCH_SIZE: int = 2000
+    
+    # Stock adjustments: concurrent changes to one product within the
+    # window are merged into one UPDATE when aggregation is on
+    STOCK_AGGREGATION_ENABLED: bool = False
+    STOCK_AGGREGATION_WINDOW_MS: int = 5
+    STOCK_AGGREGATION_MAX_BATCH: int = 100
     
     # RabbitMQ
     RABBITMQ_HOST: str = "localhost"
     RABBITMQ_PORT: int = 5672
     RABBITMQ_USER: str = "guest"
     RABBITMQ_PASS: str = "guest"
+    RABBITMQ_CHANNEL_POOL_SIZE: int = 4
+    RABBITMQ_MAX_IN_FLIGHT: int = 1000
+    RABBITMQ_PUBLISH_TIMEOUT: float = 10.0
+    RABBITMQ_LOG_PAYLOADS: bool = False
+    RABBITMQ_CONNECT_TIMEOUT: float = 5.0
+    # Reconnect backoff cap when the broker is down at startup
+    RABBITMQ_RECONNECT_MAX_SECONDS: float = 30.0
+    
+    # Event consumers
+    CONSUMERS_ENABLED: bool = True
+    CONSUMER_PREFETCH_COUNT: int = 200
+    CONSUMER_CONCURRENCY: int = 4
+    CONSUMER_BATCH_SIZE: int = 100
+    CONSUMER_BATCH_WAIT_MS: int = 10
+    # Shared by all replicas, so each event is applied once
+    CACHE_INVALIDATION_QUEUE: str = "product_service.cache_invalidation"
+    
+    # Monitoring
+    METRICS_ENABLED: bool = True
+    HEALTH_CHECK_TIMEOUT_SECONDS: float = 1.0
+    LOG_LEVEL: str = "INFO"
+    LOG_JSON: bool = True
+    # Per-request SQL profiling: query count and database time are logged,
+    # and returned as X-DB-* response headers when DEBUG is on
+    SQL_PROFILING_ENABLED: bool = True
+    SQL_SLOW_QUERY_MS: float = 100.0
+    # The same statement this often in one request is logged as a likely N+1
+    SQL_REPEATED_QUERY_THRESHOLD: int = 10
+    
+    # Transactional outbox
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    # Failed publishes before an event moves to outbox_dead_letters
+    OUTBOX_MAX_ATTEMPTS: int = 10
     
     @property
     def get_db_url(self) -> str:
         """Get async database URL."""
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return (
             f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
             f"@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
     
+    @property
+    def get_read_db_url(self) -> Optional[str]:
+        """Get async read replica URL, None when reads use the primary."""
+        if self.DATABASE_READ_URL:
+            return self.DATABASE_READ_URL
+        if self.POSTGRES_REPLICA_SERVER:
+            return (
+                f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+                f"@{self.POSTGRES_REPLICA_SERVER}:{self.POSTGRES_REPLICA_PORT or self.POSTGRES_PORT}"
+                f"/{self.POSTGRES_DB}"
+            )
+        return None
+    
     @property
     def get_redis_url(self) -> str:
         """Get Redis URL."""
@@ -7,9 +7,10 @@ from sqlalchemy.orm import sessionmaker
 import fakeredis.aioredis
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_read_db
 from app.utils.redis_cache import cache
 from app.utils.rabbitmq import rabbitmq
+from app.utils import sql_profiler
 
 # Create test database
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -19,6 +20,9 @@ engine = create_async_engine(
     echo=True
 )
 
+# Lets tests assert query budgets with sql_profiler.query_budget
+sql_profiler.instrument(engine)
+
 AsyncTestingSessionLocal = sessionmaker(
     engine,
     class_=AsyncSession,
@@ -47,6 +51,7 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[TestClient, None]:
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     with TestClient(app) as test_client:
         yield test_client
@@ -56,7 +61,9 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[TestClient, None]:
 @pytest.fixture(scope="function")
 async def redis_mock() -> AsyncGenerator[fakeredis.aioredis.FakeRedis, None]:
     """Create Redis mock"""
-    fake_redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    fake_redis = fakeredis.aioredis.FakeRedis()
+    # Instances share one fake server, so start every test empty
+    await fake_redis.flushall()
     original_redis = cache._redis
     cache._redis = fake_redis
     yield fake_redis
@@ -0,0 +1,27 @@
+from benchmarks.runner import compare, percentile, summarize
+
+def _report(p99_ms, rps, errors=0):
+    return {"results": {"hot_reads": {"8": {
+        "requests": 100, "errors": errors, "p50_ms": 1.0, "p99_ms": p99_ms, "rps": rps
+    }}}}
+
+def test_percentile_nearest_rank():
+    samples = [float(i) for i in range(100, 0, -1)]
+    assert percentile(samples, 50) == 50.0
+    assert percentile(samples, 99) == 99.0
+    assert percentile(samples, 100) == 100.0
+    assert percentile([], 99) == 0.0
+
+def test_summarize():
+    summary = summarize([0.001, 0.002, 0.004], errors=1, elapsed=0.5)
+    assert summary == {"requests": 3, "errors": 1, "p50_ms": 2.0, "p99_ms": 4.0, "rps": 6.0}
+
+def test_compare_flags_regressions_beyond_thresholds():
+    baseline = _report(p99_ms=10.0, rps=1000.0)
+
+    assert compare(_report(11.9, 810.0), baseline, 0.2, 0.2) == []
+    regressions = compare(_report(12.5, 700.0, errors=3), baseline, 0.2, 0.2)
+    assert len(regressions) == 3
+    assert regressions[0].startswith("hot_reads c=8: p99 12.5ms")
+    # Levels missing from the baseline are not compared
+    assert compare(_report(50.0, 1.0), {"results": {}}, 0.2, 0.2) == []
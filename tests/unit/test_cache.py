@@ -1,5 +1,11 @@
+import asyncio
 import pytest
 import json
+import time
+
+from app.utils import codecs
+from app.utils.redis_cache import CachePolicy, cache, policy_for
+from config.settings import settings
 
 # Добавляем параметр loop_scope к декоратору
 @pytest.mark.asyncio(loop_scope="function")
@@ -65,4 +71,133 @@ async def test_cache_invalidate_pattern(redis_mock):
     # Verify product keys are deleted but category remains
     assert await redis_mock.get("product:1") is None
     assert await redis_mock.get("product:2") is None
-    assert await redis_mock.get("category:1") is not None
\ No newline at end of file
+    assert await redis_mock.get("category:1") is not None
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_get_many_set_many(redis_mock):
+    await cache.set_many({
+        "product:1": {"name": "Product 1", "price": 100},
+        "product:2": {"name": "Product 2", "price": 200}
+    })
+
+    found = await cache.get_many(["product:1", "product:2", "product:3"])
+    assert found == {
+        "product:1": {"name": "Product 1", "price": 100},
+        "product:2": {"name": "Product 2", "price": 200}
+    }
+    entry, _, _ = codecs.unstamp(await redis_mock.get("product:2"))
+    assert codecs.decode(entry) == {"name": "Product 2", "price": 200}
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_generation_bump(redis_mock):
+    key = await cache.versioned_key("products", "skip=0:limit=100")
+    assert key == "products:g0:skip=0:limit=100"
+    await cache.set(key, [{"name": "Product 1"}])
+
+    await cache.bump_generation("products")
+
+    new_key = await cache.versioned_key("products", "skip=0:limit=100")
+    assert new_key == "products:g1:skip=0:limit=100"
+    assert await cache.get(new_key) is None
+    assert await cache.versioned_key("categories", "x") == "categories:g0:x"
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_invalidate_in_one_pipeline(redis_mock, mocker):
+    await cache.set("product:g0:1", {"id": 1})
+    await cache.set("product:g0:2", {"id": 2})
+    pipeline = mocker.spy(redis_mock, "pipeline")
+
+    await cache.invalidate(["product:g0:1", "product:g0:2"], ["products", "categories"])
+
+    assert pipeline.call_count == 1
+    assert await cache.get("product:g0:1") is None
+    assert await cache.generation("products") == 1
+    assert await cache.generation("categories") == 1
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_invalidate_pattern_with_scan(redis_mock, mocker):
+    mocker.patch.object(settings, "CACHE_SCAN_COUNT", 2)
+    for i in range(5):
+        await redis_mock.set(f"product:g0:{i}", "{}")
+    await redis_mock.set("category:1", "{}")
+    keys_spy = mocker.spy(redis_mock, "keys")
+
+    await cache.invalidate_pattern("product:*")
+
+    keys_spy.assert_not_called()
+    assert await redis_mock.keys("product:*") == []
+    assert await redis_mock.get("category:1") is not None
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_compresses_large_values(redis_mock):
+    value = [{"name": f"Product {i}", "price": i} for i in range(200)]
+    await cache.set("products:g0:big", value)
+
+    stored, _, _ = codecs.unstamp(await redis_mock.get("products:g0:big"))
+    assert stored[2] == codecs.COMPRESSION_GZIP
+    assert len(stored) < len(json.dumps(value))
+    assert await cache.get("products:g0:big") == value
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_unknown_format_is_a_miss(redis_mock):
+    await redis_mock.set("product:g0:1", json.dumps({"name": "legacy"}))
+    await redis_mock.set("product:g0:2", b"\x09\x01\x00{}")
+
+    assert await cache.get("product:g0:1") is None
+    assert await cache.get_many(["product:g0:1", "product:g0:2"]) == {}
+
+    loaded = await cache.get_or_set("product:g0:1", _load_fresh)
+    assert loaded == {"name": "fresh"}
+    assert await cache.get("product:g0:1") == {"name": "fresh"}
+
+async def _load_fresh():
+    return {"name": "fresh"}
+
+def test_policy_for_key_family(mocker):
+    mocker.patch.object(settings, "PRODUCTS_CACHE_TTL_SECONDS", 100)
+    mocker.patch.object(settings, "PRODUCTS_CACHE_STALE_SECONDS", 20)
+
+    policy = policy_for("products:g3:skip=0:limit=100")
+    assert (policy.ttl, policy.stale) == (100, 20)
+    explicit = policy_for("products:x", expire=60)
+    assert (explicit.ttl, explicit.stale) == (60, 0)
+    assert policy_for("other:1").ttl == settings.CACHE_EXPIRE_IN_SECONDS
+
+def test_policy_jitter_and_early_refresh():
+    policy = CachePolicy(ttl=100, jitter=0.1)
+    ttls = {policy.fresh_for() for _ in range(50)}
+    assert all(90 <= ttl <= 110 for ttl in ttls)
+    assert len(ttls) > 1
+
+    now = time.time()
+    assert policy.should_refresh(now - 1, 0.5)
+    assert not policy.should_refresh(now + 60, 0.5)
+    # A slow load close to its soft expiry is almost always refreshed early
+    eager = CachePolicy(ttl=100, beta=1.0)
+    assert eager.should_refresh(now + 0.01, 100.0)
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_or_set_serves_stale_while_refreshing(redis_mock):
+    policy = CachePolicy(ttl=60, stale=60)
+    loads = []
+
+    async def loader():
+        loads.append(len(loads) + 1)
+        await asyncio.sleep(0.01)
+        return {"version": len(loads)}
+
+    assert await cache.get_or_set("product:g0:1", loader, policy=policy) == {"version": 1}
+
+    # Mark the entry stale without waiting for it to go stale
+    entry, _, compute_time = codecs.unstamp(await redis_mock.get("product:g0:1"))
+    await redis_mock.set("product:g0:1", codecs.stamp(entry, time.time() - 1, compute_time), ex=60)
+
+    results = await asyncio.gather(
+        *(cache.get_or_set("product:g0:1", loader, policy=policy) for _ in range(5))
+    )
+    assert results == [{"version": 1}] * 5
+
+    await asyncio.sleep(0.05)
+    assert loads == [1, 2]
+    assert await cache.get("product:g0:1") == {"version": 2}
+    assert 0 < await redis_mock.ttl("product:g0:1") <= 120
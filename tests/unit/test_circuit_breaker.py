@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.redis_cache import cache
+
+def test_breaker_opens_and_probes_after_reset(mocker):
+    clock = mocker.patch("app.utils.circuit_breaker.time.monotonic", return_value=100.0)
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=5)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.return_value = 105.0
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.return_value = 110.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.closed and breaker.allow()
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_degrades_while_redis_is_down(redis_mock, mocker):
+    mocker.patch.object(cache, "breaker", CircuitBreaker("redis", failure_threshold=2, reset_timeout=60))
+    await cache.set("product:g0:1", "cached")
+    get = mocker.patch.object(redis_mock, "get", side_effect=RedisConnectionError("down"))
+    mocker.patch.object(redis_mock, "set", side_effect=RedisConnectionError("down"))
+
+    calls = []
+    async def loader():
+        calls.append(1)
+        return "loaded"
+
+    # Misses are served by the loader and writes are skipped, without raising
+    assert await cache.get_or_set("product:g0:1", loader) == "loaded"
+    await cache.delete("product:g0:1")
+    assert cache.breaker.state == "open"
+
+    # While open, Redis is not called at all
+    get.reset_mock()
+    assert await cache.get("product:g0:1") is None
+    assert get.call_count == 0
+    assert not await cache.ping()
+    # Generations are unknown, and keys built from them bypass the cache
+    assert await cache.generation("products") is None
+    key = await cache.versioned_key("products", "x")
+    assert key == "products:g?:x" and not cache.is_versioned(key)
+
+    # Back up: the first successful call flushes what may have missed
+    # invalidations during the outage
+    mocker.stopall()
+    cache.breaker.record_success()
+    assert await cache.get("product:g0:1") == "cached"
+    await asyncio.gather(*cache._tasks)
+    assert await cache.generation("product") == 1
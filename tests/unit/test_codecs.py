@@ -0,0 +1,36 @@
+import pytest
+
+from app.utils import codecs
+
+VALUE = {"items": [{"id": i, "name": f"Product {i}"} for i in range(100)]}
+
+@pytest.mark.parametrize("codec", [codecs.CODEC_JSON, codecs.CODEC_MSGPACK])
+@pytest.mark.parametrize("compression", [
+    codecs.COMPRESSION_NONE, codecs.COMPRESSION_GZIP, codecs.COMPRESSION_ZSTD
+])
+def test_encode_decode_roundtrip(codec, compression):
+    if codec == codecs.CODEC_MSGPACK and codecs.msgpack is None:
+        pytest.skip("msgpack is not installed")
+    if compression == codecs.COMPRESSION_ZSTD and codecs.zstandard is None:
+        pytest.skip("zstandard is not installed")
+
+    entry = codecs.encode(VALUE, codec, compression, min_compress_size=64)
+
+    assert entry[:3] == bytes((codecs.FORMAT_VERSION, codec, compression))
+    assert codecs.decode(entry) == VALUE
+
+def test_small_payloads_are_not_compressed():
+    entry = codecs.encode({"id": 1}, codecs.CODEC_JSON, codecs.COMPRESSION_GZIP)
+    assert entry[2] == codecs.COMPRESSION_NONE
+    assert codecs.decode(entry) == {"id": 1}
+
+def test_raw_entries_keep_bytes():
+    entry = codecs.encode(b"\n[1,2]", codecs.CODEC_RAW)
+    assert codecs.decode(entry) == b"\n[1,2]"
+
+@pytest.mark.parametrize("entry", [
+    None, b"", b'{"id":1}', b"\x02\x01\x00{}", b"\x01\x07\x00{}", b"\x01\x01\x01not gzip"
+])
+def test_unreadable_entries_raise(entry):
+    with pytest.raises(codecs.CodecError):
+        codecs.decode(entry)
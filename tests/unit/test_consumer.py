@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+
+from app.services.invalidation import invalidate_for_events
+from app.utils.cache_keys import product_keys
+from app.utils.consumer import BatchConsumer
+from app.utils.redis_cache import cache
+from app.utils.serialization import dumps
+
+class FakeChannel:
+    is_closed = False
+
+CHANNEL = FakeChannel()
+
+class FakeMessage:
+    def __init__(self, delivery_tag, routing_key="product.updated", data=None, body=None, redelivered=False, channel=CHANNEL):
+        self.delivery_tag = delivery_tag
+        self.channel = channel
+        self.routing_key = routing_key
+        self.body = body if body is not None else dumps({"event": routing_key, "data": data})
+        self.redelivered = redelivered
+        self.log = None
+
+    async def ack(self, multiple=False):
+        self.log.append(("ack", self.delivery_tag, multiple))
+
+    async def nack(self, multiple=False, requeue=True):
+        self.log.append(("nack", self.delivery_tag, requeue))
+
+def _consumer(handler, **options):
+    consumer = BatchConsumer(["product.*"], handler, batch_wait=0.01, **options)
+    log = []
+
+    async def deliver(*messages):
+        for message in messages:
+            message.log = log
+            await consumer._on_message(message)
+    return consumer, deliver, log
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_consumer_batches_and_acks_in_order():
+    batches = []
+    first_started = asyncio.Event()
+    release_first = asyncio.Event()
+
+    async def handler(events):
+        batches.append([data["id"] for _, data in events])
+        if len(batches) == 1:
+            first_started.set()
+            await release_first.wait()
+
+    consumer, deliver, log = _consumer(handler, batch_size=2)
+    await deliver(*(FakeMessage(tag, data={"id": tag}) for tag in (1, 2, 3, 4)))
+    await first_started.wait()
+    await asyncio.sleep(0.02)
+
+    # The second batch finished first but must not ack past the first
+    assert batches == [[1, 2], [3, 4]]
+    assert log == []
+    release_first.set()
+    await asyncio.gather(*consumer._tasks)
+    assert log == [("ack", 4, True)]
+
+    # A partial batch goes out once batch_wait has passed
+    await deliver(FakeMessage(5, data={"id": 5}))
+    await asyncio.sleep(0.05)
+    assert batches[-1] == [5]
+    assert log[-1] == ("ack", 5, True)
+    assert consumer.stats()["consumed"] == 5 and consumer.stats()["unacked"] == 0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_consumer_requeues_failed_batch_once():
+    async def handler(events):
+        raise RuntimeError("cache is down")
+
+    consumer, deliver, log = _consumer(handler, batch_size=3)
+    await deliver(
+        FakeMessage(1, data={"id": 1}),
+        FakeMessage(2, data={"id": 2}, redelivered=True),
+        FakeMessage(3, body=b"not json")
+    )
+    await asyncio.gather(*consumer._tasks)
+
+    assert sorted(log) == [("nack", 1, True), ("nack", 2, False), ("nack", 3, False)]
+    assert consumer.stats()["failed"] == 2 and consumer.stats()["unacked"] == 0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_invalidate_for_events(redis_mock):
+    keys = await product_keys([1, 2, 3])
+    for key in keys.values():
+        await cache.set(key, "cached")
+
+    await invalidate_for_events([
+        ("product.stock_changed", {"id": 1, "quantity": 4, "delta": -1}),
+        ("product.stock_reserved", {"items": [{"id": 2, "quantity": 1}]}),
+    ])
+    assert await cache.get(keys[1]) is None and await cache.get(keys[2]) is None
+    assert await cache.get(keys[3]) == "cached"
+    assert await cache.generation("products") == 0
+
+    await invalidate_for_events([
+        ("product.stock_changed", {"id": 3, "quantity": 0, "delta": -1}),
+        ("product.updated", {"id": 3}),
+        ("category.created", {"id": 1}),
+    ])
+    assert await cache.get(keys[3]) is None
+    assert await cache.generation("products") == 1
+    assert await cache.generation("categories") == 1
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_consumer_acks_per_channel_after_reconnect():
+    release = asyncio.Event()
+
+    async def handler(events):
+        if events[0][1]["id"] == "old":
+            await release.wait()
+
+    consumer, deliver, log = _consumer(handler, batch_size=1)
+    old, new = FakeChannel(), FakeChannel()
+    await deliver(FakeMessage(1, data={"id": "old"}, channel=old))
+    # The connection recovers with a new channel; its tags start over
+    old.is_closed = True
+    await deliver(*(FakeMessage(tag, data={"id": tag}, channel=new) for tag in (1, 2)))
+    await asyncio.sleep(0.02)
+
+    # The old delivery no longer holds back the new channel's acks
+    assert log == [("ack", 1, True), ("ack", 2, True)]
+    release.set()
+    await asyncio.gather(*consumer._tasks)
+    assert len(log) == 2
+    assert consumer.stats()["unacked"] == 0 and not consumer._settled
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_invalidate_for_events_skips_malformed_events(redis_mock):
+    keys = await product_keys([1, 2])
+    for key in keys.values():
+        await cache.set(key, "cached")
+
+    await invalidate_for_events([
+        ("product.stock_changed", {"id": 2, "quantity": 4}),
+        ("product.stock_reserved", {"items": [{"quantity": 1}]}),
+        ("product.bulk_updated", {"items": "oops"}),
+        ("product.updated", {"id": "1"}),
+        ("product.updated", {"id": 1}),
+    ])
+    assert await cache.get(keys[1]) is None
+    assert await cache.get(keys[2]) == "cached"
+    assert await cache.generation("products") == 1
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from fastapi import Response
+from sqlalchemy import text
+from starlette.requests import Request
+
+from app.core import database
+from config.settings import settings
+
+def _request(cookie: str = None) -> Request:
+    headers = []
+    if cookie is not None:
+        headers.append((b"cookie", f"{settings.READ_YOUR_WRITES_COOKIE}={cookie}".encode()))
+    return Request({"type": "http", "headers": headers})
+
+@pytest.fixture
+async def primary_and_replica(tmp_path, monkeypatch):
+    """Two local databases standing in for a primary and its replica"""
+    engines = {}
+    for role in ("primary", "replica"):
+        engine = database.create_engine(f"sqlite+aiosqlite:///{tmp_path / role}.db", role=role)
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE role (name TEXT)"))
+            await conn.execute(text("INSERT INTO role VALUES (:name)"), {"name": role})
+        engines[role] = engine
+    monkeypatch.setattr(database, "engine", engines["primary"])
+    monkeypatch.setattr(database, "read_engine", engines["replica"])
+    monkeypatch.setattr(database, "AsyncSessionLocal", database._session_factory(engines["primary"]))
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", database._session_factory(engines["replica"]))
+    yield
+    for engine in engines.values():
+        await engine.dispose()
+
+async def _role(dependency) -> str:
+    async for session in dependency:
+        role = await _role_of(session)
+    return role
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_reads_go_to_replica(primary_and_replica):
+    assert await _role(database.get_read_db(_request())) == "replica"
+    assert await _role(database.get_db(Response())) == "primary"
+    assert await database.with_new_session(_role_of, read_only=True)() == "replica"
+    assert await database.with_new_session(_role_of)() == "primary"
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_read_your_writes_window(primary_and_replica):
+    response = Response()
+    await _role(database.get_db(response))
+    cookie = response.headers["set-cookie"]
+    assert cookie.startswith(f"{settings.READ_YOUR_WRITES_COOKIE}=")
+    until = cookie.split(";")[0].split("=", 1)[1]
+
+    assert await _role(database.get_read_db(_request(until))) == "primary"
+    assert await _role(database.get_read_db(_request(str(time.time() - 1)))) == "replica"
+    assert await _role(database.get_read_db(_request("garbage"))) == "replica"
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_no_cookie_without_replica(primary_and_replica, monkeypatch):
+    monkeypatch.setattr(database, "read_engine", database.engine)
+    response = Response()
+    await _role(database.get_db(response))
+    assert "set-cookie" not in response.headers
+
+async def _role_of(session) -> str:
+    return (await session.execute(text("SELECT name FROM role"))).scalar_one()
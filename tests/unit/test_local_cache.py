@@ -0,0 +1,90 @@
+import asyncio
+import pytest
+import fakeredis
+import fakeredis.aioredis
+
+from app.utils.redis_cache import LocalCache, RedisCache, _MISSING
+from config.settings import settings
+
+def test_local_cache_lru_eviction():
+    local = LocalCache(max_size=2, ttl=60)
+    local.set("a", 1)
+    local.set("b", 2)
+    local.get("a")
+    local.set("c", 3)
+
+    # "b" was least recently used
+    assert local.get("b") is _MISSING
+    assert local.get("a") == 1
+    assert local.get("c") == 3
+    assert local.stats()["evictions"] == 1
+
+def test_local_cache_ttl(mocker):
+    clock = mocker.patch("app.utils.redis_cache.time.monotonic", return_value=100.0)
+    local = LocalCache(max_size=10, ttl=5)
+    local.set("a", 1)
+    clock.return_value = 106.0
+    assert local.get("a") is _MISSING
+
+def test_local_cache_invalidate_pattern():
+    local = LocalCache(max_size=10, ttl=60)
+    local.set("product:1", 1)
+    local.set("product:2", 2)
+    local.set("category:1", 3)
+    local.invalidate("product:*")
+    assert local.get("product:1") is _MISSING
+    assert local.get("category:1") == 3
+
+def _replica(server):
+    replica = RedisCache()
+    replica.local = LocalCache(max_size=100, ttl=60)
+    replica._redis = fakeredis.aioredis.FakeRedis(server=server)
+    replica._pubsub_redis = fakeredis.aioredis.FakeRedis(server=server)
+    return replica
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_local_tier_serves_without_redis():
+    replica = _replica(fakeredis.FakeServer())
+    await replica.set("product:1", {"name": "Test Product"})
+    await replica._redis.flushall()
+
+    assert await replica.get("product:1") == {"name": "Test Product"}
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_invalidation_reaches_other_replicas():
+    server = fakeredis.FakeServer()
+    writer, reader = _replica(server), _replica(server)
+    await reader.start_invalidation_listener()
+    await asyncio.sleep(0.05)
+
+    await writer.set("product:1", {"name": "Old"})
+    assert await reader.get("product:1") == {"name": "Old"}
+
+    await writer.delete("product:1")
+    await asyncio.sleep(0.05)
+    assert reader.local.get("product:1") is _MISSING
+
+    await reader.close()
+    await writer.close()
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_idle_invalidation_listener_keeps_local_tier(mocker):
+    mocker.patch.object(settings, "REDIS_SOCKET_TIMEOUT_SECONDS", 0.01)
+    # The subscription has no socket timeout, so quiet periods are not errors
+    subscriber = RedisCache()._subscriber()
+    assert subscriber.connection_pool.connection_kwargs["socket_timeout"] is None
+    await subscriber.aclose()
+
+    server = fakeredis.FakeServer()
+    writer, reader = _replica(server), _replica(server)
+    await reader.start_invalidation_listener()
+    await writer.set("product:1", {"name": "Cached"})
+    assert await reader.get("product:1") == {"name": "Cached"}
+    invalidate = mocker.spy(reader.local, "invalidate")
+
+    await asyncio.sleep(0.1)
+    assert invalidate.call_count == 0
+    assert reader.local.get("product:1") == {"name": "Cached"}
+
+    await reader.close()
+    await writer.close()
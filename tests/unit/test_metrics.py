@@ -0,0 +1,75 @@
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI
+from prometheus_client import REGISTRY
+
+from app.utils import metrics
+from app.utils.redis_cache import cache
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_middleware_labels_requests_by_route_template():
+    app = FastAPI()
+    app.add_middleware(metrics.PrometheusMiddleware)
+    router = APIRouter(prefix="/api/v1/shop")
+
+    @router.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app.include_router(router)
+    labels = {"method": "GET", "route": "/api/v1/shop/items/{item_id}"}
+    before = _sample("http_requests_total", status="200", **labels)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+        await client.get("/api/v1/shop/items/1")
+        await client.get("/api/v1/shop/items/2")
+        await client.get("/nowhere")
+
+    assert _sample("http_requests_total", status="200", **labels) == before + 2
+    assert _sample("http_request_duration_seconds_count", **labels) >= 2
+    assert _sample("http_requests_total", method="GET", route="unmatched", status="404") >= 1
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_hits_and_misses_by_family(redis_mock):
+    hits = _sample("cache_requests_total", family="categories", result="hit")
+    misses = _sample("cache_requests_total", family="categories", result="miss")
+
+    await cache.set("categories:g0:skip=0:limit=100", [])
+    await cache.get("categories:g0:skip=0:limit=100")
+    await cache.get_many(["categories:g0:a", "categories:g0:skip=0:limit=100"])
+
+    assert _sample("cache_requests_total", family="categories", result="hit") == hits + 2
+    assert _sample("cache_requests_total", family="categories", result="miss") == misses + 1
+    assert _sample("cache_operation_duration_seconds_count", family="categories", operation="set") >= 1
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_errors_are_counted(redis_mock, mocker):
+    errors = _sample("cache_errors_total", family="product", operation="get")
+    mocker.patch.object(redis_mock, "get", side_effect=ConnectionError("down"))
+
+    # Failures degrade to a miss instead of failing the request
+    assert await cache.get("product:g0:1") is None
+    assert _sample("cache_errors_total", family="product", operation="get") == errors + 1
+    cache.breaker.record_success()
+
+def test_pool_collector_reads_pool_at_scrape_time():
+    class FakePool:
+        def size(self): return 5
+        def checkedout(self): return 3
+        def checkedin(self): return 2
+        def overflow(self): return -2
+
+    collector = metrics.PoolCollector()
+    collector.pools["primary"] = FakePool()
+    samples = {
+        family.name: (family.samples[0].labels, family.samples[0].value)
+        for family in collector.collect()
+    }
+    assert samples == {
+        "db_pool_size": ({"engine": "primary"}, 5),
+        "db_pool_checked_out": ({"engine": "primary"}, 3),
+        "db_pool_checked_in": ({"engine": "primary"}, 2),
+        "db_pool_overflow": ({"engine": "primary"}, -2),
+    }
@@ -0,0 +1,127 @@
+import pytest
+from sqlalchemy import select
+
+from app.models.outbox import OutboxDeadLetter, OutboxEvent
+from app.schemas.product import CategoryCreate, ProductCreate
+from app.services.outbox import OutboxRelay
+from app.services.product import ProductService
+from tests.conftest import AsyncTestingSessionLocal
+
+async def _outbox(db_session):
+    return (await db_session.execute(
+        select(OutboxEvent).order_by(OutboxEvent.id)
+    )).scalars().all()
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_writes_queue_events_in_same_transaction(db_session):
+    service = ProductService(db_session)
+    category = await service.create_category(CategoryCreate(name="Test Category"))
+    product = await service.create_product(ProductCreate(
+        name="Test Product", sku="TEST-001", price=100.0, quantity=5,
+        category_id=category.id
+    ))
+
+    events = await _outbox(db_session)
+    assert [e.routing_key for e in events] == ["category.created", "product.created"]
+    assert events[1].payload["id"] == product.id
+    assert events[1].payload["created_at"] is not None
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_relay_keeps_failed_events_for_retry(db_session, mocker):
+    service = ProductService(db_session)
+    await service.create_category(CategoryCreate(name="First"))
+    await service.create_category(CategoryCreate(name="Second"))
+    await service.create_category(CategoryCreate(name="Third"))
+
+    published = []
+    failures = ["Second"]
+    async def publish_events(events):
+        results = []
+        for routing_key, data, partition in events:
+            if data["name"] in failures:
+                failures.remove(data["name"])
+                results.append(ConnectionError("broker down"))
+            else:
+                published.append(data["name"])
+                results.append(None)
+        return results
+    mocker.patch("app.services.outbox.publish_events", publish_events)
+
+    relay = OutboxRelay(session_factory=AsyncTestingSessionLocal)
+    assert await relay.drain_once() == 2
+    assert await relay.drain_once() == 1
+    assert published == ["First", "Third", "Second"]
+    db_session.expire_all()
+    assert await _outbox(db_session) == []
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_relay_holds_back_events_behind_a_failure(db_session, mocker):
+    service = ProductService(db_session)
+    category = await service.create_category(CategoryCreate(name="Test Category"))
+    product = ProductCreate(name="A", sku="A", price=1.0, quantity=1, category_id=category.id)
+    await service.create_product(product)
+    await service.update_product(1, product.model_copy(update={"price": 2.0}))
+    await service.create_product(product.model_copy(update={"sku": "B"}))
+    await service.adjust_stock(2, [1])
+    service._add_event("product.bulk_imported", {"ids": [3]})
+    await db_session.commit()
+
+    published = []
+    failures = ["product.created"]
+    async def publish_events(events):
+        results = []
+        for routing_key, data, partition in events:
+            if routing_key in failures and data.get("id") == 1:
+                failures.remove(routing_key)
+                results.append(ConnectionError("broker down"))
+            else:
+                published.append((routing_key, data.get("id")))
+                results.append(None)
+        return results
+    mocker.patch("app.services.outbox.publish_events", publish_events)
+
+    relay = OutboxRelay(session_factory=AsyncTestingSessionLocal)
+    # The update of product 1 went out but is kept, and the bulk event
+    # waits behind the failed create
+    assert await relay.drain_once() == 3
+    assert ("product.bulk_imported", None) not in published
+    published.clear()
+    assert await relay.drain_once() == 3
+    assert published == [
+        ("product.created", 1), ("product.updated", 1), ("product.bulk_imported", None)
+    ]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_relay_dead_letters_events_that_keep_failing(db_session, mocker):
+    service = ProductService(db_session)
+    category = await service.create_category(CategoryCreate(name="Test Category"))
+    product = ProductCreate(name="A", sku="A", price=1.0, quantity=1, category_id=category.id)
+    await service.create_product(product)
+    await service.update_product(1, product.model_copy(update={"price": 2.0}))
+
+    published = []
+    async def publish_events(events):
+        results = []
+        for routing_key, data, partition in events:
+            if routing_key == "product.created":
+                results.append(TypeError("not serializable"))
+            else:
+                published.append(routing_key)
+                results.append(None)
+        return results
+    mocker.patch("app.services.outbox.publish_events", publish_events)
+
+    relay = OutboxRelay(session_factory=AsyncTestingSessionLocal, max_attempts=2)
+    # The update went out but is kept behind the failed create
+    assert await relay.drain_once() == 1
+    assert published == ["category.created", "product.updated"]
+    # The second failure moves the create aside and releases the update
+    published.clear()
+    assert await relay.drain_once() == 1
+    assert published == ["product.updated"]
+    db_session.expire_all()
+    assert await _outbox(db_session) == []
+    dead = (await db_session.execute(select(OutboxDeadLetter))).scalars().all()
+    assert [(d.routing_key, d.attempts, d.error) for d in dead] == [
+        ("product.created", 2, "not serializable")
+    ]
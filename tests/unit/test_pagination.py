@@ -0,0 +1,45 @@
+import pytest
+
+from app.models.product import Category, Product
+from app.services.product import ProductService
+from app.utils.pagination import decode_cursor, encode_cursor, next_cursor
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor({"id": 42})
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"id": 42}
+
+def test_decode_invalid_cursor():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+def test_next_cursor_only_on_full_page():
+    items = [{"id": 1}, {"id": 2}]
+    assert next_cursor(items, limit=3) is None
+    assert decode_cursor(next_cursor(items, limit=2)) == {"id": 2}
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_products_keyset(db_session):
+    category = Category(name="Test Category")
+    db_session.add(category)
+    await db_session.flush()
+    for i in range(5):
+        db_session.add(Product(
+            name=f"Product {i}",
+            sku=f"SKU-{i}",
+            price=10.0,
+            quantity=1,
+            category_id=category.id
+        ))
+    await db_session.commit()
+
+    service = ProductService(db_session)
+    first_page = await service.get_products(limit=2)
+    assert [p.sku for p in first_page] == ["SKU-0", "SKU-1"]
+
+    second_page = await service.get_products(limit=2, after_id=first_page[-1].id)
+    assert [p.sku for p in second_page] == ["SKU-2", "SKU-3"]
+
+    # Keyset and offset pages agree
+    offset_page = await service.get_products(skip=2, limit=2)
+    assert [p.id for p in offset_page] == [p.id for p in second_page]
@@ -0,0 +1,242 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.models.outbox import OutboxEvent
+from app.models.product import Category, CategoryStats, Product
+from app.schemas.product import CategoryCreate, ProductCreate, ProductFilter, ProductPatch
+from app.services.product import ProductService
+from app.utils.sql_profiler import profile
+
+async def _create_products(db_session, count: int) -> Category:
+    category = Category(name="Test Category")
+    db_session.add(category)
+    await db_session.flush()
+    for i in range(count):
+        db_session.add(Product(
+            name=f"Product {i}",
+            sku=f"SKU-{i}",
+            price=10.0 * (i + 1),
+            quantity=i,
+            category_id=category.id
+        ))
+    await db_session.commit()
+    return category
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_products_by_ids(db_session):
+    await _create_products(db_session, 3)
+    service = ProductService(db_session)
+
+    products = await service.get_products_by_ids([3, 1, 42])
+    assert sorted(p.id for p in products) == [1, 3]
+    assert await service.get_products_by_ids([]) == []
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_import_products(db_session):
+    category = await _create_products(db_session, 1)
+
+    async def rows():
+        yield 1, {"name": "A", "sku": "A", "price": 1, "quantity": 1, "category_id": category.id}
+        yield 2, {"name": "B", "sku": "SKU-0", "price": 1, "quantity": 1, "category_id": category.id}
+        yield 3, {"name": "C", "sku": "C", "price": 1, "quantity": 1, "category_id": 999}
+        yield 4, {"name": "D", "sku": "A", "price": 1, "quantity": 1, "category_id": category.id}
+        yield 5, {"name": "E"}
+        yield 6, {"name": "F", "sku": "F", "price": "2.5", "quantity": "3", "category_id": str(category.id)}
+
+    service = ProductService(db_session)
+    batches = [batch async for batch in service.import_products(rows(), batch_size=3)]
+
+    assert len(batches) == 2
+    imported = [product_id for ids, _ in batches for product_id in ids]
+    errors = [e.row for _, batch_errors in batches for e in batch_errors]
+    assert len(imported) == 2
+    assert errors == [2, 3, 4, 5]
+    assert (await service.get_product(imported[-1])).price == 2.5
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_stream_products(db_session):
+    category = await _create_products(db_session, 3)
+    service = ProductService(db_session)
+
+    rows = [row async for row in service.stream_products(category_id=category.id, fetch_size=2)]
+    assert [row["sku"] for row in rows] == ["SKU-0", "SKU-1", "SKU-2"]
+    assert [row async for row in service.stream_products(category_id=999)] == []
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_search_products_ranking(db_session):
+    category = await _create_products(db_session, 0)
+    for name, sku, description in [
+        ("Headphones", "HP-1", None),
+        ("Phone case", "CASE-1", None),
+        ("Laptop", "LAP-1", "Pairs with any phone"),
+        ("Smartphone", "SP-1", None),
+    ]:
+        db_session.add(Product(
+            name=name, sku=sku, description=description,
+            price=1.0, quantity=1, category_id=category.id
+        ))
+    await db_session.commit()
+    service = ProductService(db_session)
+
+    results = await service.search_products("phone")
+    assert [p.name for p in results] == ["Phone case", "Headphones", "Smartphone", "Laptop"]
+    assert [p.sku for p in await service.search_products("SP-1")] == ["SP-1"]
+    assert await service.search_products("%") == []
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_products_filtered_keyset(db_session):
+    category = await _create_products(db_session, 6)
+    service = ProductService(db_session)
+    filters = ProductFilter(category_id=category.id, in_stock=True, sort="-price")
+
+    # quantity is 0 for SKU-0, so it is filtered out; prices descend
+    first_page = await service.get_products(limit=3, filters=filters)
+    assert [p.sku for p in first_page] == ["SKU-5", "SKU-4", "SKU-3"]
+
+    last = first_page[-1]
+    second_page = await service.get_products(
+        limit=3, filters=filters, after_id=last.id, after_value=last.price
+    )
+    assert [p.sku for p in second_page] == ["SKU-2", "SKU-1"]
+
+    assert await service.count_products(filters) == 5
+    assert await service.count_products(ProductFilter(min_price=20, max_price=40)) == 3
+
+def test_product_filter_cache_suffix():
+    assert ProductFilter(in_stock=True, category_id=3).cache_suffix() == \
+        ProductFilter(category_id=3, in_stock=True).cache_suffix() == \
+        "category_id=3:in_stock=True:sort=id"
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_adjust_stock_is_conditional(db_session):
+    await _create_products(db_session, 3)
+    service = ProductService(db_session)
+
+    # Product 3 holds 2: the sum fits, so all apply, increments first
+    assert await service.adjust_stock(3, [-3, 2, -1]) == [1, 4, 0]
+    # The sum does not fit; deltas are tried one by one instead
+    assert await service.adjust_stock(3, [-5, 2]) == [None, 2]
+    assert await service.adjust_stock(3, [-9]) == [None]
+    assert (await service.get_product(3)).quantity == 2
+
+    events = (await db_session.execute(
+        select(OutboxEvent).where(OutboxEvent.routing_key == "product.stock_changed")
+    )).scalars().all()
+    assert [(e.payload["quantity"], e.payload["delta"]) for e in events] == [(0, -2), (2, 2)]
+
+    with pytest.raises(HTTPException) as e:
+        await service.adjust_stock(42, [1])
+    assert e.value.status_code == 404
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_reserve_stock_all_or_nothing(db_session):
+    await _create_products(db_session, 3)
+    service = ProductService(db_session)
+
+    assert await service.reserve_stock({3: 1, 2: 1}) == {2: 0, 3: 1}
+
+    with pytest.raises(HTTPException) as e:
+        await service.reserve_stock({3: 1, 2: 1})
+    assert e.value.status_code == 409
+    assert e.value.detail["product_ids"] == [2]
+    assert (await service.get_product(3)).quantity == 1
+
+    with pytest.raises(HTTPException) as e:
+        await service.reserve_stock({3: 1, 42: 1})
+    assert e.value.status_code == 404
+    assert e.value.detail["product_ids"] == [42]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_update_products_in_chunks(db_session):
+    category_id = (await _create_products(db_session, 3)).id
+    service = ProductService(db_session)
+    created_at = (await service.get_product(1)).created_at
+    await service.reconcile_category_stats()
+
+    patches = [
+        ProductPatch(id=1, price=15.0),
+        ProductPatch(sku="SKU-1", price=25.0, quantity=0),
+        ProductPatch(id=42, price=1.0),
+        ProductPatch(id=1, is_active=False),
+        ProductPatch(sku="SKU-2", category_id=999),
+    ]
+    batches = [batch async for batch in service.update_products(patches, batch_size=3)]
+
+    assert [ids for ids, _ in batches] == [[1, 2], [1]]
+    assert [(e.index, e.error) for _, errors in batches for e in errors] == \
+        [(2, "Product not found"), (4, "Category not found")]
+    db_session.expire_all()
+    first, second = await service.get_products_by_ids([1, 2])
+    assert (first.price, first.is_active, first.created_at) == (15.0, False, created_at)
+    assert (second.price, second.quantity) == (25.0, 0)
+    assert await _stats(service, category_id) == (3, 2, 1, 15.0, 30.0)
+    assert await service.reconcile_category_stats() == 0
+
+    events = (await db_session.execute(
+        select(OutboxEvent).where(OutboxEvent.routing_key == "product.bulk_updated")
+    )).scalars().all()
+    assert [e.payload["items"] for e in events] == [
+        [{"id": 1, "price": 15.0}, {"id": 2, "price": 25.0, "quantity": 0}],
+        [{"id": 1, "is_active": False}],
+    ]
+
+def test_product_patch_validation():
+    with pytest.raises(ValueError):
+        ProductPatch(price=1.0)
+    with pytest.raises(ValueError):
+        ProductPatch(id=1)
+    with pytest.raises(ValueError):
+        ProductPatch(id=1, price=None)
+    assert ProductPatch(sku="A", description=None).changes() == {"description": None}
+
+async def _stats(service, category_id):
+    stats = await service.get_category_stats(category_id)
+    return (stats.product_count, stats.active_count, stats.in_stock_count, stats.min_price, stats.max_price)
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_category_stats_follow_writes(db_session):
+    service = ProductService(db_session)
+    first = await service.create_category(CategoryCreate(name="First"))
+    second = await service.create_category(CategoryCreate(name="Second"))
+    assert await _stats(service, first.id) == (0, 0, 0, None, None)
+
+    def product(sku, **overrides):
+        values = dict(name=sku, sku=sku, price=10.0, quantity=1, category_id=first.id)
+        values.update(overrides)
+        return ProductCreate(**values)
+
+    cheap = await service.create_product(product("A", price=5.0))
+    dear = await service.create_product(product("B", price=50.0, is_active=False))
+    await service.create_product(product("C", quantity=0))
+    assert await _stats(service, first.id) == (3, 2, 2, 5.0, 50.0)
+
+    await service.update_product(dear.id, product("B", price=50.0, category_id=second.id))
+    await service.delete_product(cheap.id)
+    await service.adjust_stock(3, [2])
+    assert await _stats(service, first.id) == (1, 1, 1, 10.0, 10.0)
+    assert await _stats(service, second.id) == (1, 1, 1, 50.0, 50.0)
+
+    # Stored rows match a recount, so reconciliation has nothing to fix
+    assert await service.reconcile_category_stats() == 0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_reconcile_category_stats(db_session):
+    category = await _create_products(db_session, 3)
+    service = ProductService(db_session)
+
+    # Rows inserted directly have no stats row until reconciled
+    assert await db_session.get(CategoryStats, category.id) is None
+    assert await _stats(service, category.id) == (3, 3, 2, 10.0, 30.0)
+    assert await service.reconcile_category_stats() == 1
+    assert await db_session.get(CategoryStats, category.id) is not None
+
+    stats = await db_session.get(CategoryStats, category.id)
+    stats.product_count = 42
+    await db_session.commit()
+    # Stats rows are read (locked on PostgreSQL) before products are counted
+    with profile() as queries:
+        assert await service.reconcile_category_stats() == 1
+    assert list(queries.statements)[0].startswith("SELECT category_stats.")
+    assert await _stats(service, category.id) == (3, 3, 2, 10.0, 30.0)
+    assert len(await service.get_categories(with_stats=True)) == 1
@@ -0,0 +1,146 @@
+import httpx
+import pytest
+
+from app.core.database import get_db, get_read_db
+from app.main import app
+from app.utils.circuit_breaker import CircuitBreaker
+from app.utils.pagination import encode_cursor
+from app.utils.redis_cache import cache
+from config.settings import settings
+from tests.conftest import AsyncTestingSessionLocal, engine
+
+PRODUCTS = "/api/v1/products"
+
+@pytest.fixture
+async def api(db_session, redis_mock, mocker):
+    async def override_get_db():
+        yield db_session
+
+    # Cache loaders open sessions of their own
+    mocker.patch("app.core.database.AsyncSessionLocal", AsyncTestingSessionLocal)
+    mocker.patch("app.core.database.AsyncReadSessionLocal", AsyncTestingSessionLocal)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+        await client.post(f"{PRODUCTS}/categories/", json={"name": "A"})
+        await client.post(f"{PRODUCTS}/products/", json={
+            "name": "P", "sku": "P", "price": 1, "quantity": 5, "category_id": 1
+        })
+        yield client
+    app.dependency_overrides.clear()
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_listing_etag_follows_stock_changes(api, redis_mock):
+    first = await api.get(f"{PRODUCTS}/products/")
+    etag = first.headers["etag"]
+    assert (await api.get(f"{PRODUCTS}/products/", headers={"if-none-match": etag})).status_code == 304
+
+    # Not crossing zero keeps the page key; once the entry expires the
+    # reloaded page must not match the old tag
+    await api.post(f"{PRODUCTS}/products/1/stock/decrement", json={"quantity": 2})
+    await redis_mock.delete(*await redis_mock.keys("products:*"))
+    second = await api.get(f"{PRODUCTS}/products/", headers={"if-none-match": etag})
+    assert second.status_code == 200
+    assert second.json()[0]["quantity"] == 3
+    assert second.headers["etag"] != etag
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_listing_has_no_etag_while_generation_is_unknown(api, mocker):
+    etag = (await api.get(f"{PRODUCTS}/products/")).headers["etag"]
+    breaker = CircuitBreaker("redis", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    mocker.patch.object(cache, "breaker", breaker)
+
+    await api.post(f"{PRODUCTS}/products/", json={
+        "name": "Q", "sku": "Q", "price": 1, "quantity": 1, "category_id": 1
+    })
+    response = await api.get(f"{PRODUCTS}/products/", headers={"if-none-match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert "etag" not in response.headers
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_malformed_cursor_values_are_rejected(api):
+    for sort, value in [("created_at", "not-a-date"), ("price", "1.0"), ("price", None)]:
+        cursor = encode_cursor({"id": 1, "v": value})
+        response = await api.get(f"{PRODUCTS}/products/", params={"sort": sort, "after": cursor})
+        assert response.status_code == 400
+    response = await api.get(f"{PRODUCTS}/products/", params={"after": encode_cursor({"id": "1"})})
+    assert response.status_code == 400
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_total_count_is_shared_across_sorts_and_versioned(api, redis_mock):
+    params = {"include_total": True, "category_id": 1}
+    await api.get(f"{PRODUCTS}/products/", params=params)
+    await api.get(f"{PRODUCTS}/products/", params={**params, "sort": "-price"})
+    assert len(await redis_mock.keys("products:g*:count:*")) == 1
+
+    await api.post(f"{PRODUCTS}/products/", json={
+        "name": "Q", "sku": "Q", "price": 1, "quantity": 1, "category_id": 1
+    })
+    response = await api.get(f"{PRODUCTS}/products/", params=params)
+    assert response.headers["x-total-count"] == "2"
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_misses_after_a_write_read_from_the_primary(api, db_session, mocker):
+    # The request's session stands for the replica
+    mocker.patch("app.core.database.read_engine", engine)
+    mocker.patch("app.core.database.engine", object())
+    primary = []
+
+    def with_new_session(load, read_only=False):
+        primary.append(not read_only)
+        return lambda: load(db_session)
+
+    mocker.patch("app.api.products.with_new_session", side_effect=with_new_session)
+    await api.get(f"{PRODUCTS}/products/1")
+    assert True not in primary
+
+    await api.post(f"{PRODUCTS}/products/1/stock/decrement", json={"quantity": 1})
+    response = await api.get(f"{PRODUCTS}/products/1")
+    assert response.json()["quantity"] == 4
+    assert True in primary
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_product_answers_matching_etag_with_304(api):
+    first = await api.get(f"{PRODUCTS}/products/1", headers={"accept-encoding": "gzip"})
+    etag = first.headers["etag"]
+    # A small entry is sent uncompressed, so the tag has no gzip suffix
+    assert "content-encoding" not in first.headers and not etag.endswith('-gzip"')
+
+    for accept_encoding in ("gzip", "identity"):
+        response = await api.get(f"{PRODUCTS}/products/1", headers={
+            "accept-encoding": accept_encoding, "if-none-match": etag
+        })
+        assert response.status_code == 304
+        assert response.headers["etag"] == etag
+
+    await api.post(f"{PRODUCTS}/products/1/stock/decrement", json={"quantity": 1})
+    response = await api.get(f"{PRODUCTS}/products/1", headers={"if-none-match": etag})
+    assert response.status_code == 200
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_listing_answers_matching_etag_with_304(api):
+    first = await api.get(f"{PRODUCTS}/products/", headers={"accept-encoding": "gzip"})
+    etag = first.headers["etag"]
+    assert not etag.endswith('-gzip"')
+
+    response = await api.get(f"{PRODUCTS}/products/", headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_cache_loaders_do_not_use_the_request_session(api, mocker):
+    # A shared load may outlive the request that started it
+    request_session = mocker.Mock(bind=engine)
+    request_session.execute.side_effect = AssertionError("request session used")
+
+    async def override_get_read_db():
+        yield request_session
+
+    app.dependency_overrides[get_read_db] = override_get_read_db
+    assert (await api.get(f"{PRODUCTS}/products/1")).status_code == 200
+    assert (await api.get(f"{PRODUCTS}/products/")).status_code == 200
+    assert (await api.get(f"{PRODUCTS}/categories/1/stats")).status_code == 200
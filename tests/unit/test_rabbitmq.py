@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+
+from app.utils.rabbitmq import RabbitMQ
+from app.utils.serialization import loads
+
+class FakeExchange:
+    def __init__(self, fail_keys=()):
+        self.messages = []
+        self.fail_keys = fail_keys
+
+    async def publish(self, message, routing_key, timeout=None):
+        if routing_key in self.fail_keys:
+            raise ConnectionError("nack")
+        self.messages.append((routing_key, loads(message.body)))
+
+def _publisher(*exchanges):
+    publisher = RabbitMQ()
+    publisher._connection = object()
+    publisher._exchange = exchanges[0]
+    publisher._pool = list(exchanges)
+    return publisher
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_publish_many_spreads_over_pool():
+    first, second = FakeExchange(), FakeExchange(fail_keys=("product.deleted",))
+    publisher = _publisher(first, second)
+
+    results = await publisher.publish_many([
+        ("product.created", {"id": 1}, None),
+        ("product.deleted", {"id": 2}, None),
+        ("product.created", {"id": 3}, None),
+    ])
+
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], ConnectionError)
+    assert len(first.messages) == 2 and second.messages == []
+    assert first.messages[0][1]["data"] == {"id": 1}
+    stats = publisher.stats()
+    assert stats["published"] == 2 and stats["failed"] == 1 and stats["in_flight"] == 0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_partition_pins_channel():
+    exchanges = [FakeExchange() for _ in range(4)]
+    publisher = _publisher(*exchanges)
+
+    await publisher.publish_many([
+        ("product.updated", {"id": 7, "version": v}, "product:7") for v in range(5)
+    ])
+
+    used = [e for e in exchanges if e.messages]
+    assert len(used) == 1
+    assert [m[1]["data"]["version"] for m in used[0].messages] == list(range(5))
+
+class FakeChannel:
+    async def declare_exchange(self, name, type_, durable=False):
+        return FakeExchange()
+
+    async def get_exchange(self, name, ensure=True):
+        return FakeExchange()
+
+class FakeConnection:
+    async def channel(self, publisher_confirms=True):
+        return FakeChannel()
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_concurrent_connects_open_one_connection(mocker):
+    opened = []
+
+    async def connect_robust(url, timeout=None):
+        opened.append(url)
+        await asyncio.sleep(0.01)
+        return FakeConnection()
+
+    mocker.patch("app.utils.rabbitmq.aio_pika.connect_robust", connect_robust)
+    publisher = RabbitMQ()
+    await asyncio.gather(publisher.connect(), publisher.connect())
+    assert len(opened) == 1 and publisher.connected
@@ -0,0 +1,130 @@
+import gzip
+import json
+import pytest
+from datetime import datetime
+from typing import List
+from fastapi.encoders import jsonable_encoder
+
+from app.models.product import Product as ProductModel
+from app.schemas.product import Product
+from app.utils.codecs import COMPRESSION_NONE
+from app.utils.redis_cache import cache
+from app.utils.response_cache import (
+    accepts_gzip,
+    cached_response,
+    encode_body,
+    etag_matches,
+    make_etag,
+    not_modified,
+    pack,
+    plain_body,
+    representation_etag,
+    unpack
+)
+
+def _product(**overrides):
+    values = dict(
+        id=1, name="Чайник", description=None, sku="KT-1", price=19.99,
+        quantity=3, category_id=1, is_active=True,
+        created_at=datetime(2024, 1, 2, 3, 4, 5, 678000), updated_at=None
+    )
+    values.update(overrides)
+    return ProductModel(**values)
+
+def test_encode_body_matches_response_model():
+    products = [_product(), _product(id=2, sku="KT-2", description="Стеклянный")]
+
+    body = encode_body(products, List[Product])
+
+    # Same payload FastAPI would produce through response_model
+    expected = jsonable_encoder([Product.model_validate(p) for p in products])
+    assert json.loads(body) == expected
+    assert "Чайник".encode() in body
+
+def test_encode_body_rejects_invalid_rows():
+    with pytest.raises(ValueError):
+        encode_body(_product(created_at=None), Product)
+
+def test_pack_unpack_roundtrip():
+    entry = pack(b'[{"id":1}]', {"X-Next-Cursor": "abc"})
+    assert unpack(entry) == (b'[{"id":1}]', {"X-Next-Cursor": "abc"})
+    assert unpack(entry.decode()) == (b'[{"id":1}]', {"X-Next-Cursor": "abc"})
+    assert unpack(pack(b"{}")) == (b"{}", {})
+
+def test_cached_response_replays_headers():
+    response = cached_response(pack(b"[]", {"X-Next-Cursor": "abc"}))
+    assert response.body == b"[]"
+    assert response.headers["x-next-cursor"] == "abc"
+    assert response.media_type == "application/json"
+
+def test_large_bodies_are_served_gzipped():
+    body = encode_body([_product(id=i, sku=f"KT-{i}") for i in range(50)], List[Product])
+    entry = pack(body, {"X-Next-Cursor": "abc"})
+    assert len(entry) < len(body)
+    assert plain_body(entry) == body
+
+    gzipped = cached_response(entry, "gzip, deflate")
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    assert gzip.decompress(gzipped.body) == body
+
+    plain = cached_response(entry)
+    assert "content-encoding" not in plain.headers
+    assert plain.body == body
+    assert plain.headers["x-next-cursor"] == "abc"
+
+def test_compression_follows_cache_setting(mocker):
+    body = encode_body([_product(id=i, sku=f"KT-{i}") for i in range(50)], List[Product])
+    mocker.patch.object(cache, "compression", COMPRESSION_NONE)
+    entry = pack(body)
+    assert unpack(entry) == (body, {})
+    assert "content-encoding" not in cached_response(entry, "gzip").headers
+
+def test_accepts_gzip_honours_q_values():
+    assert accepts_gzip("gzip, deflate")
+    assert accepts_gzip("deflate, GZIP;q=0.5")
+    assert accepts_gzip("*")
+    assert not accepts_gzip("gzip;q=0, deflate")
+    assert not accepts_gzip("gzip; q=0.0")
+    assert not accepts_gzip("*;q=0")
+    assert not accepts_gzip("br, gzip;q=0, *")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
+
+def test_etag_depends_on_inputs_and_encoding():
+    etag = make_etag("product:g1:1", datetime(2024, 1, 2))
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == make_etag("product:g1:1", datetime(2024, 1, 2))
+    assert etag != make_etag("product:g1:1", datetime(2024, 1, 3))
+    assert representation_etag(etag) == etag
+    assert representation_etag(etag, gzipped=True) == etag[:-1] + '-gzip"'
+
+def test_etag_matches_if_none_match_lists():
+    assert etag_matches('"a", "b"', '"b"')
+    assert etag_matches('W/"b"', '"b"')
+    assert etag_matches("*", '"b"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"b"')
+
+def test_cached_response_answers_matching_etag_with_304():
+    etag = make_etag("product:g1:1", 1)
+    body = encode_body([_product(id=i, sku=f"KT-{i}") for i in range(50)], List[Product])
+    entry = pack(body, {"ETag": etag})
+
+    gzipped = cached_response(entry, "gzip")
+    assert gzipped.headers["etag"] == representation_etag(etag, gzipped=True)
+    assert cached_response(entry).headers["etag"] == etag
+
+    unchanged = cached_response(entry, "gzip", if_none_match=gzipped.headers["etag"])
+    assert unchanged.status_code == 304
+    assert unchanged.body == b""
+    assert unchanged.headers["etag"] == gzipped.headers["etag"]
+    # The gzip tag does not validate the identity variant
+    assert cached_response(entry, if_none_match=gzipped.headers["etag"]).status_code == 200
+    assert not_modified(etag, etag).status_code == 304
+    assert not_modified(etag, '"other"') is None
+
+    # Small entries are stored and sent uncompressed, under the plain tag
+    small = pack(b"[]", {"ETag": etag})
+    assert cached_response(small, "gzip").headers["etag"] == etag
+    assert cached_response(small, "gzip", if_none_match=etag).status_code == 304
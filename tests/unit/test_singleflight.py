@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+import fakeredis
+import fakeredis.aioredis
+
+from app.utils.decorators import cached
+from app.utils.redis_cache import RedisCache
+from app.utils.singleflight import SingleFlight
+from config.settings import settings
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_single_flight_coalesces_calls():
+    flights = SingleFlight()
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flights.do("key", loader) for _ in range(10)))
+    assert results == [1] * 10
+    assert flights.in_flight() == 0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_single_flight_propagates_errors():
+    flights = SingleFlight()
+
+    async def loader():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flights.do("key", loader), flights.do("key", loader),
+        return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_or_set_loads_once(redis_mock):
+    calls = 0
+
+    @cached("product:{product_id}")
+    async def load_product(product_id: int):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"id": product_id}
+
+    results = await asyncio.gather(*(load_product(product_id=1) for _ in range(10)))
+    assert results == [{"id": 1}] * 10
+    assert calls == 1
+    assert await load_product(product_id=1) == {"id": 1}
+    assert calls == 1
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_or_set_lock_across_processes(mocker):
+    mocker.patch.object(settings, "CACHE_LOCK_ENABLED", True)
+    server = fakeredis.FakeServer()
+    replicas = []
+    for _ in range(3):
+        replica = RedisCache()
+        replica._redis = fakeredis.aioredis.FakeRedis(server=server)
+        replicas.append(replica)
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"id": 1}
+
+    results = await asyncio.gather(
+        *(replica.get_or_set("product:1", loader) for replica in replicas)
+    )
+    assert results == [{"id": 1}] * 3
+    assert calls == 1
+    assert not await replicas[0]._redis.exists("lock:product:1")
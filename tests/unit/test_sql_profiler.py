@@ -0,0 +1,72 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.database import get_db, get_read_db
+from app.main import app
+from app.utils.sql_profiler import SQLProfilingMiddleware, query_budget
+from config.settings import settings
+from tests.conftest import AsyncTestingSessionLocal
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_endpoint_query_budgets(db_session, redis_mock, mocker):
+    async def override_get_db():
+        yield db_session
+
+    # Cache loaders open sessions of their own
+    mocker.patch("app.core.database.AsyncSessionLocal", AsyncTestingSessionLocal)
+    mocker.patch("app.core.database.AsyncReadSessionLocal", AsyncTestingSessionLocal)
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    product = {"name": "P", "sku": "P", "price": 1, "quantity": 1, "category_id": 1}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            # Insert, stats row, outbox event
+            with query_budget(3):
+                await client.post("/api/v1/products/categories/", json={"name": "A"})
+            # Category lookup, insert, stats update, outbox event
+            with query_budget(4):
+                await client.post("/api/v1/products/products/", json=product)
+            with query_budget(1):
+                assert (await client.get("/api/v1/products/products/1")).status_code == 200
+            # Categories and their stats, without one query per category
+            with query_budget(2):
+                await client.get("/api/v1/products/categories/")
+            with query_budget(0):
+                await client.get("/api/v1/products/products/1")
+                await client.get("/api/v1/products/categories/")
+    finally:
+        app.dependency_overrides.clear()
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_query_budget_lists_statements(db_session):
+    with pytest.raises(AssertionError, match=r"at most 1 queries, ran 2:\n  1x SELECT 1"):
+        with query_budget(1):
+            await db_session.execute(text("SELECT 1"))
+            await db_session.execute(text("SELECT 2"))
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_middleware_reports_queries(db_session, mocker, caplog):
+    mocker.patch.object(settings, "DEBUG", True)
+    mocker.patch.object(settings, "SQL_REPEATED_QUERY_THRESHOLD", 3)
+    profiled = FastAPI()
+    profiled.add_middleware(SQLProfilingMiddleware)
+
+    @profiled.get("/items")
+    async def items():
+        async with AsyncTestingSessionLocal() as session:
+            for i in range(3):
+                await session.execute(text("SELECT :i"), {"i": i})
+        return []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=profiled), base_url="http://t") as client:
+        response = await client.get("/items")
+
+    assert response.headers["x-db-query-count"] == "3"
+    assert float(response.headers["x-db-time-ms"]) >= 0
+    record = next(r for r in caplog.records if r.name == "app.utils.sql_profiler")
+    assert record.levelname == "WARNING"
+    assert (record.route, record.db_query_count) == ("/items", 3)
+    assert record.db_repeated_queries[0]["count"] == 3
@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+
+from app.models.product import Category, Product
+from app.services.stock import StockAggregator
+from tests.conftest import AsyncTestingSessionLocal
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_aggregator_merges_concurrent_adjustments(db_session):
+    category = Category(name="Flash sale")
+    db_session.add(category)
+    await db_session.flush()
+    db_session.add(Product(name="Hot", sku="HOT", price=1, quantity=5, category_id=category.id))
+    await db_session.commit()
+
+    aggregator = StockAggregator(session_factory=AsyncTestingSessionLocal, window=0.01)
+    results = await asyncio.gather(*(aggregator.adjust(1, -1) for _ in range(7)))
+
+    # Five buyers get stock, two are turned away, nobody oversells
+    assert sorted(r for r in results if r is not None) == [0, 1, 2, 3, 4]
+    assert results.count(None) == 2
+    async with AsyncTestingSessionLocal() as session:
+        assert (await session.get(Product, 1)).quantity == 0
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_aggregator_propagates_errors(db_session):
+    aggregator = StockAggregator(session_factory=AsyncTestingSessionLocal, window=0.01)
+    results = await asyncio.gather(
+        *(aggregator.adjust(42, 1) for _ in range(3)), return_exceptions=True
+    )
+    assert [getattr(r, "status_code", None) for r in results] == [404, 404, 404]
+    assert not aggregator._pending
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_aggregator_cancellation_releases_callers(db_session):
+    aggregator = StockAggregator(session_factory=AsyncTestingSessionLocal, window=60)
+    callers = [asyncio.create_task(aggregator.adjust(42, 1)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for task in list(aggregator._tasks):
+        task.cancel()
+    _, waiting = await asyncio.wait(callers, timeout=1)
+    assert not waiting and all(task.cancelled() for task in callers)
+    assert not aggregator._pending
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_aggregator_stop_applies_pending_batches(db_session):
+    category = Category(name="Flash sale")
+    db_session.add(category)
+    await db_session.flush()
+    db_session.add(Product(name="Hot", sku="HOT", price=1, quantity=5, category_id=category.id))
+    await db_session.commit()
+
+    aggregator = StockAggregator(session_factory=AsyncTestingSessionLocal, window=0.05)
+    caller = asyncio.create_task(aggregator.adjust(1, -2))
+    # A caller that went away leaves its outcome unclaimed
+    gone = asyncio.create_task(aggregator.adjust(42, 1))
+    await asyncio.sleep(0)
+    gone.cancel()
+    await aggregator.stop()
+    assert caller.done() and caller.result() == 3
+    assert not aggregator._tasks
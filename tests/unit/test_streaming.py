@@ -0,0 +1,56 @@
+import gzip
+import json
+import pytest
+from datetime import datetime
+
+from app.utils.streaming import (
+    batched,
+    encode_ndjson,
+    gzip_chunks,
+    iter_lines,
+    parse_csv,
+    parse_ndjson
+)
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+async def _collect(items):
+    return [item async for item in items]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_iter_lines_across_chunks():
+    lines = await _collect(iter_lines(_chunks(b"fir", b"st\r\nsec", "ond\nтр".encode(), "етий".encode())))
+    assert lines == ["first", "second", "третий"]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_parse_ndjson_reports_bad_lines():
+    rows = await _collect(parse_ndjson(_chunks(b'{"sku": "A"}\n\n{oops\n\xff\xfe\n{"sku": "B"}')))
+    assert rows[0] == (1, {"sku": "A"})
+    assert rows[1][0] == 2 and isinstance(rows[1][1], ValueError)
+    assert rows[2][0] == 3 and "UTF-8" in str(rows[2][1])
+    assert rows[3] == (4, {"sku": "B"})
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_parse_csv_skips_empty_cells():
+    rows = await _collect(parse_csv(_chunks(b"sku,description\nA,\n\"B,1\",text\nC\n")))
+    assert rows[0] == (1, {"sku": "A"})
+    assert rows[1] == (2, {"sku": "B,1", "description": "text"})
+    assert isinstance(rows[2][1], ValueError)
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_batched():
+    batches = await _collect(batched(_chunks(*range(5)), 2))
+    assert batches == [[0, 1], [2, 3], [4]]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_encode_ndjson_gzip():
+    async def rows():
+        for i in range(100):
+            yield {"id": i, "created_at": datetime(2024, 1, 1)}
+
+    chunks = await _collect(gzip_chunks(encode_ndjson(rows(), chunk_size=256)))
+    lines = gzip.decompress(b"".join(chunks)).decode().splitlines()
+    assert len(lines) == 100
+    assert json.loads(lines[-1]) == {"id": 99, "created_at": "2024-01-01T00:00:00"}
@@ -0,0 +1,112 @@
+import pytest
+
+from app.models.product import Category, Product
+from app.schemas.product import ProductFilter
+from app.services.product import ProductService
+from app.services.warmup import CacheWarmer
+from app.utils.cache_keys import page_key, product_keys
+from app.utils.redis_cache import cache
+from app.utils.response_cache import plain_body
+from app.utils.serialization import loads
+from config.settings import settings
+from tests.conftest import AsyncTestingSessionLocal
+
+async def _create_catalog(db_session):
+    categories = [Category(name="Phones"), Category(name="Laptops"), Category(name="Empty")]
+    db_session.add_all(categories)
+    await db_session.flush()
+    for i in range(5):
+        db_session.add(Product(
+            name=f"Product {i}", sku=f"SKU-{i}", price=10.0, quantity=1,
+            category_id=categories[i % 2].id
+        ))
+    await db_session.commit()
+    return categories
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_get_first_pages(db_session):
+    phones, laptops, empty = await _create_catalog(db_session)
+
+    pages = await ProductService(db_session).get_first_pages([phones.id, laptops.id, empty.id], limit=2)
+    assert {c: [p.id for p in items] for c, items in pages.items()} == {
+        phones.id: [1, 3], laptops.id: [2, 4], empty.id: []
+    }
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_warmer_fills_route_keys(db_session, redis_mock, mocker):
+    mocker.patch.object(settings, "WARMUP_CATEGORY_BATCH_SIZE", 2)
+    phones, laptops, _ = await _create_catalog(db_session)
+    warmer = CacheWarmer(session_factory=AsyncTestingSessionLocal)
+    assert not warmer.ready
+
+    await warmer.run()
+
+    status = warmer.status()
+    assert status["state"] == "done" and status["ready"]
+    # 5 products, categories page, products page and one page per category
+    assert status["entries"] == 10
+
+    keys = await product_keys([1, 5])
+    assert loads(plain_body(await cache.get(keys[1], raw=True)))["sku"] == "SKU-0"
+    suffix = ProductFilter(category_id=laptops.id).cache_suffix()
+    page = await cache.get(await page_key("products", 0, 100, None, suffix), raw=True)
+    assert [p["id"] for p in loads(plain_body(page))] == [2, 4]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_warmer_reads_generations_before_querying(db_session, redis_mock, mocker):
+    await _create_catalog(db_session)
+    get_first_pages = ProductService.get_first_pages
+
+    async def write_meanwhile(self, *args, **kwargs):
+        pages = await get_first_pages(self, *args, **kwargs)
+        # A write commits and bumps after the rows were read
+        await cache.bump_generation("products")
+        return pages
+    mocker.patch.object(ProductService, "get_first_pages", write_meanwhile)
+
+    await CacheWarmer(session_factory=AsyncTestingSessionLocal).run()
+
+    # The pre-write pages went under the old generation only
+    assert await redis_mock.keys("products:g1:category_id=*") == []
+    assert await redis_mock.keys("products:g0:category_id=*") != []
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_warmer_reports_failures(redis_mock):
+    def broken_session():
+        raise RuntimeError("database is down")
+
+    warmer = CacheWarmer(session_factory=broken_session)
+    await warmer.run()
+
+    assert warmer.status()["state"] == "failed"
+    assert warmer.ready
+    assert "database is down" in warmer.status()["error"]
+
+@pytest.mark.asyncio(loop_scope="function")
+async def test_warmer_does_not_restore_products_updated_meanwhile(db_session, redis_mock, mocker):
+    await _create_catalog(db_session)
+    keys = await product_keys([1, 2])
+    get_products = ProductService.get_products
+
+    async def update_meanwhile(self, *args, **kwargs):
+        products = await get_products(self, *args, **kwargs)
+        if kwargs["filters"].sort == "-created_at":
+            # An update commits and deletes the product keys after the
+            # warmer read the rows
+            product = await db_session.get(Product, 1)
+            product.price = 99.0
+            await db_session.commit()
+            await cache.delete(keys[1])
+        return products
+    mocker.patch.object(ProductService, "get_products", update_meanwhile)
+
+    await CacheWarmer(session_factory=AsyncTestingSessionLocal).run()
+    assert await cache.get(keys[1], raw=True) is None
+
+    # Entries filled meanwhile by a route are not overwritten either
+    mocker.stopall()
+    await redis_mock.delete("written:product")
+    await cache.set(keys[2], "fresh")
+    await CacheWarmer(session_factory=AsyncTestingSessionLocal).run()
+    assert await cache.get(keys[2]) == "fresh"
+    assert await cache.get(keys[1], raw=True) is not None